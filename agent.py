@@ -6,9 +6,18 @@ from tools import fetch_option_info, calculate_implied_volatility
 import itertools
 from py_vollib.black_scholes.implied_volatility import implied_volatility as bs_iv  # Alias to avoid name clash
 from datetime import datetime  # Import datetime for date calculations
+import pytz
 from sentiment_alpha import fetch_sentiment_info
 from autogen.agentchat.contrib.web_surfer import WebSurferAgent 
 import functions
+from services.condor_validation import make_validation_reply
+from services.speaker_policy import TurnPolicy, llm_call_report
+from services.model_router import ModelRouter, llm_reply_position
+from services.condor_candidates import build_candidates
+from services.result_store import get_result_store
+from services.bar_series import BarSeries
+from services.rate_limiter import scheduler
+from services.trading_calendar import calendar_for
 
 load_dotenv()
 
@@ -18,14 +27,14 @@ polygon_api_key = os.getenv("POLYGON_API_KEY")
 client = RESTClient(api_key=polygon_api_key)
 from prompts import Prompts
 
-llm_config = {
-    "seed": 42,
-    "config_list": [{"model": "gpt-4o", "api_key": open_ai_api_key}]
-}
+# Models per agent role (services.model_router.ROLE_TIERS) are chosen per analysis by a ModelRouter.
+
+# "rules" uses the deterministic TurnPolicy; "auto" restores autogen's LLM speaker selector.
+speaker_selection = os.getenv("SPEAKER_SELECTION", "rules")
 
 def get_stock_sentiment(ticker):
     # Fetch news sentiment data from Polygon
-    sentiment = client.list_ticker_news(ticker, order="desc", limit=10)
+    sentiment = scheduler.call("polygon", lambda: list(client.list_ticker_news(ticker, order="desc", limit=10)))
     positive = neutral = negative = 0
     breakpoint()
     for article in sentiment:
@@ -39,7 +48,7 @@ def get_stock_sentiment(ticker):
 
 def get_alpha_signals(ticker):
     # Fetch additional data for alpha signals
-    aggs = client.get_aggs(ticker, 1, "day", limit=30)
+    aggs = scheduler.call("polygon", lambda: client.get_aggs(ticker, 1, "day", limit=30))
     sma_20 = sum(agg.close for agg in aggs[-20:]) / 20
     current_price = aggs[-1].close
     rsi = calculate_rsi(aggs)
@@ -63,15 +72,15 @@ def calculate_rsi(aggs, period=14):
     return 100 - (100 / (1 + rs))
 
 # Function to calculate implied volatility and option information
-def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-09'):
+def build_analysis_context(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-09'):
+    """Fetch market data, chain IVs and candidate spreads and assemble the agents' context."""
 
     implied_volatility = ""
     # Retrieve current price data for the ticker
-    current_price_data = client.get_last_trade(ticker)
+    current_price_data = scheduler.call("polygon", lambda: client.get_last_trade(ticker))
 
     # Retrieve quotes for bid/ask prices
-    quotes_data = client.list_quotes(ticker, limit=1)
-    quotes_list = list(itertools.islice(quotes_data, 20))
+    quotes_list = scheduler.call("polygon", lambda: list(itertools.islice(client.list_quotes(ticker, limit=1), 20)))
 
     sentiment=fetch_sentiment_info(ticker,date)
     # Check if there are any quotes available
@@ -88,22 +97,19 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
 
     # Retrieve options chain for the ticker and expiration date
     try:
-        options_data = client.list_options_contracts(underlying_ticker=ticker, expiration_date=expiry)
-
         # Limit to the first 10 options for inspection to prevent freezing
-        limited_options = list(itertools.islice(options_data, 20))
+        limited_options = scheduler.call("polygon", lambda: list(itertools.islice(
+            client.list_options_contracts(underlying_ticker=ticker, expiration_date=expiry), 20)))
 
         if limited_options:
             first_option = limited_options[0]
             strike_price = first_option.strike_price
         
 
-            # Use today's date to calculate days to expiry
-            today = datetime.today()
-            expiration_date = datetime.strptime(expiry, "%Y-%m-%d")
-            days_to_expiry = (expiration_date - today).days
+            # Time to the expiry's session close on the underlying's exchange calendar
+            T = float(calendar_for(ticker).year_fraction(expiry, datetime.now(pytz.utc)))
         else:
-            strike_price = days_to_expiry = None
+            strike_price = T = None
             print("No options data available for this ticker and expiration date.")
             return
     except Exception as e:
@@ -113,7 +119,7 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     # Define the Black-Scholes parameters
     S = current_price_data.price  # Current underlying price
     K = strike_price  # Strike price of the option
-    T = days_to_expiry / 365  # Time to expiration in years
+    # T, time to expiration in years, is set above
     r = 0.0398  # Risk-free interest rate
     option_type = 'c'  # 'c' for call, 'p' for put (can be adjusted based on the option type)
 
@@ -128,25 +134,10 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     split_multiplier = 4
 
 # Fetch daily aggregated data for the given date range
-    aggs = client.get_aggs(ticker, multiplier=1, timespan="day", from_=start_date, to=end_date)
-
-# Create a new list to hold the adjusted price data
-    adjusted_aggs = []
-
-# Process each aggregation entry and adjust prices
-    for agg in aggs:
-    # Multiply OHLC prices by the split multiplier
-        # breakpoint()
-        adjusted_agg = {
-            "date": datetime.utcfromtimestamp(agg.timestamp / 1000).strftime('%Y-%m-%d'),
-            "open": agg.open * split_multiplier,
-            "high": agg.high * split_multiplier,
-            "low": agg.low * split_multiplier,
-            "close": agg.close * split_multiplier,
-            "volume": agg.volume,
-        }
-    # Add the adjusted entry to the new list
-        adjusted_aggs.append(adjusted_agg)
+    aggs = scheduler.call("polygon", lambda: client.get_aggs(ticker, multiplier=1, timespan="day", from_=start_date, to=end_date))
+
+# Keep the bars columnar; the split adjustment is applied lazily on read
+    bars = BarSeries.from_polygon_aggs(aggs).scaled(split_multiplier)
     # Calculate implied volatility
     # try:
     #     breakpoint()
@@ -162,6 +153,10 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     # # Get alpha signals
     # alpha_signals = get_alpha_signals(ticker)
 
+    # Underlying price on the chain's date, in the chain's (pre-split) terms
+    spot = bars.last_close() or S
+    candidates = build_candidates(contract_data or [], spot)
+
     # Create the context dictionary
     option_context = {
         "ticker": ticker,
@@ -178,24 +173,37 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     context_str = f"""
         Ticker: {option_context['ticker']}
         Contract Data : {option_context['contract_data']}
-        Aggregated History: {adjusted_aggs}
+        Aggregated History: {bars.to_records(include_time=False)}
+        Candidate Spreads (ranked by credit / max loss): {candidates}
         
 
     """
+    return {**option_context, "as_of": date, "expiry": expiry, "spot": spot, "candidates": candidates, "context_str": context_str}
 
 
+def run_group_chat(context: dict, stream: bool = False, on_turn=None, should_stop=None):
+    """Run the analyst / critic / planner group chat over a context from `build_analysis_context`.
+
+    :param context: Analysis context
+    :param stream: Request streamed LLM completions (tokens are printed through autogen's IOStream)
+    :param on_turn: Called with (last message, next speaker name or None) after every turn
+    :param should_stop: Polled before every turn; returning True ends the chat
+    :return: The finished autogen GroupChat
+    """
+    context_str = context["context_str"]
+    router = ModelRouter(stream=stream)
 
     # Continue with the autogen integration using the created option_context
     user_proxy = autogen.AssistantAgent(
         name="user_proxy",
-        llm_config=llm_config,
+        llm_config=router.llm_config("summarizer"),
         description="User proxy agent",
         system_message="user_proxy",
     )
 
     planner = autogen.AssistantAgent(
         name="Planner",
-        llm_config=llm_config,
+        llm_config=router.llm_config("planner"),
         description="Planner agent for trade analysis", 
         system_message=f"{Prompts.planner_prompt()}"
     )
@@ -203,14 +211,14 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     # Add context to Stock Analyst using system message
     engineer = autogen.AssistantAgent(
         name="StockAnalyst",
-        llm_config=llm_config,
+        llm_config=router.llm_config("analyst"),
         description="Stock Analyst specialized in option trading strategies",
-        system_message=f"{Prompts.analyst_prompt()}\nHere is the context information for analysis:\n{context_str}"
+        system_message=f"{Prompts.analyst_prompt()}{Prompts.proposal_format()}\nHere is the context information for analysis:\n{context_str}"
     )
 
     critic = autogen.AssistantAgent(
         name="Critic",
-        llm_config=llm_config,
+        llm_config=router.llm_config("critic"),
         description="Critic to evaluate the stock analysis provided. . ",  
         system_message=f"{Prompts.critic_prompt()}- {Prompts.iron()}Ensure that the spread would currently be in the money \nHere is the context information:\n{context_str}"
     )
@@ -230,14 +238,74 @@ def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-
     #     system_message=f"You are the iron condor expert. Help evaluate proposed spreads.Here is information: {Prompts.iron()}\nHere is the context:\n{context_str}"
     # )
 
+    # Mechanical checks (strikes exist, inner strikes straddle spot, wing order) run in code
+    # before the critic's LLM is consulted; an approved proposal goes straight to the planner.
+    # Registered before the router so it sits between the termination checks and the routed LLM reply.
+    critic.register_reply(
+        [autogen.Agent, None], make_validation_reply(context["contract_data"] or [], context["spot"]), position=llm_reply_position(critic)
+    )
+
+    router.attach(engineer, "analyst")
+    router.attach(critic, "critic")
+    router.attach(planner, "planner")
+
+    rule_based = speaker_selection == "rules"
+    policy = TurnPolicy()
+
+    def select_speaker(last_speaker, groupchat):
+        if router.budget.exhausted() or (should_stop and should_stop()):
+            return None
+        speaker = policy.select_speaker(last_speaker, groupchat)
+        if on_turn:
+            on_turn(groupchat.messages[-1], speaker.name if speaker else None)
+        return speaker
+
     group_chat = autogen.GroupChat(
         agents=[user_proxy, engineer, critic, planner],
         messages=[],
         max_round=12,
+        speaker_selection_method=select_speaker if rule_based else "auto",
     )
 
-    manager = autogen.GroupChatManager(groupchat=group_chat, llm_config=llm_config)
+    manager = autogen.GroupChatManager(
+        groupchat=group_chat,
+        llm_config=router.llm_config("selector"),
+        is_termination_msg=lambda message: "TERMINATE" in (message.get("content") or ""),
+    )
     user_proxy.initiate_chat(recipient=manager, message="Analyze the provided ticker to recommend an Iron Condor options buy")
+    report = llm_call_report(group_chat.messages, {"StockAnalyst", "Critic", "Planner"}, rule_based)
+    print(f"Analysis finished after {len(group_chat.messages)} messages; LLM calls: {report}")
+    print(f"Model usage by role: {router.report()}")
+    return group_chat
+
+
+def save_analysis(context: dict, group_chat) -> str:
+    """Persist a finished analysis (candidates, transcript, final recommendation) to the result store.
+
+    :return: The stored analysis id
+    """
+    final = group_chat.messages[-1] if group_chat.messages else {}
+    return get_result_store().save_analysis({
+        "ticker": context["ticker"],
+        "as_of": context["as_of"],
+        "expiry": context["expiry"],
+        "spot": context["spot"],
+        "context": context["context_str"],
+        "recommendation": final.get("content"),
+        "candidates": context["candidates"],
+        "transcript": group_chat.messages,
+    })
+
+
+def main(ticker: str = 'AAPL', expiry: str = '2024-10-18', date: str = '2019-02-09'):
+    context = build_analysis_context(ticker, expiry, date)
+    if context is None:
+        return None
+    group_chat = run_group_chat(context)
+    save_analysis(context, group_chat)
+    return group_chat
+
 
+if __name__ == "__main__":
+    main()
 
-main()
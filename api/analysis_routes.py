@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from services.analysis_stream import analysis_events
+
+router = APIRouter()
+
+@router.get("/analysis/{ticker}/stream")
+async def stream_analysis(ticker: str, expiry: str = '2024-10-18', date: str = '2019-02-09') -> StreamingResponse:
+    """Start an iron condor analysis and stream its progress as server-sent events."""
+    return StreamingResponse(
+        analysis_events(ticker.upper(), expiry, date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
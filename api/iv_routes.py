@@ -0,0 +1,47 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from services.iv_analytics import backfill, screen
+from services.result_store import get_result_store
+
+router = APIRouter()
+
+class BackfillRequest(BaseModel):
+    start: Optional[str] = None
+    end: Optional[str] = None
+    source: str = "snapshots"  # or "store" for chains saved by the condor workflow
+
+# Routes are plain `def`: SQLite calls run on FastAPI's threadpool, keeping the event loop free.
+@router.get("/iv/screen")
+def screen_iv(tickers: Optional[str] = None, sort_by: str = "rank_252", min_value: Optional[float] = None,
+              max_value: Optional[float] = None, limit: Optional[int] = None, descending: bool = True) -> list:
+    """Latest IV rank/percentile, term structure and skew per ticker, e.g. ?sort_by=pct_90&min_value=80."""
+    try:
+        return screen(tickers.split(",") if tickers else None, sort_by, min_value, max_value, limit, descending)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/iv/{ticker}")
+def latest_iv(ticker: str) -> dict:
+    latest = get_result_store().latest_iv([ticker.upper()], term_structure=True)
+    if not latest:
+        raise HTTPException(status_code=404, detail="No IV history for this ticker")
+    return latest[0]
+
+@router.get("/iv/{ticker}/history")
+def iv_history(ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> list:
+    return get_result_store().iv_days(ticker.upper(), start, end)
+
+@router.get("/iv/{ticker}/term_structure")
+def term_structure(ticker: str, as_of: str) -> dict:
+    days = get_result_store().iv_days(ticker.upper(), as_of, as_of, term_structure=True)
+    if not days:
+        raise HTTPException(status_code=404, detail="No IV summary for this date")
+    return {"ticker": ticker.upper(), "as_of": as_of, "expiries": days[0]["term_structure"]}
+
+@router.post("/iv/{ticker}/backfill")
+def backfill_iv(ticker: str, request: BackfillRequest) -> dict:
+    try:
+        return backfill(ticker, request.start, request.end, request.source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
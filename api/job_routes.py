@@ -0,0 +1,66 @@
+from datetime import date as Date
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from services.job_queue import get_job_queue, JOB_HANDLERS, DEFAULT_TIMEOUT, DEFAULT_MAX_ATTEMPTS, MAX_TIMEOUT, MAX_ATTEMPTS
+
+router = APIRouter()
+
+# Validated at submit, so a bad payload is a 422 rather than a job failing in every worker attempt
+class AnalysisPayload(BaseModel):
+    ticker: str = Field(pattern=r"^[A-Za-z0-9.\-]{1,10}$")
+    expiry: Date = Date(2024, 10, 18)
+    date: Date = Date(2019, 2, 9)
+
+class JobRequest(BaseModel):
+    kind: str = "analysis"
+    payload: AnalysisPayload
+    timeout: float = Field(DEFAULT_TIMEOUT, gt=0, le=MAX_TIMEOUT)
+    max_attempts: int = Field(DEFAULT_MAX_ATTEMPTS, gt=0, le=MAX_ATTEMPTS)
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+def _status(job: dict) -> JobStatus:
+    return JobStatus(job_id=job["id"], **{k: job[k] for k in JobStatus.model_fields if k in job and k != "job_id"})
+
+def _get_or_404(job_id: str) -> dict:
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Routes are plain `def`: SQLite calls run on FastAPI's threadpool, keeping the event loop free.
+@router.post("/jobs")
+def submit_job(request: JobRequest) -> dict:
+    if request.kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail="Invalid job kind")
+    queue = get_job_queue()
+    job_id, deduplicated = queue.submit(request.kind, request.payload.model_dump(mode="json"), request.timeout, request.max_attempts)
+    return {"job_id": job_id, "deduplicated": deduplicated, "status": queue.get(job_id)["status"]}
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str) -> JobStatus:
+    return _status(_get_or_404(job_id))
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str) -> dict:
+    job = _get_or_404(job_id)
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str) -> JobStatus:
+    queue = get_job_queue()
+    if queue.cancel(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _status(queue.get(job_id))
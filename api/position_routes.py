@@ -0,0 +1,114 @@
+import asyncio
+from typing import Annotated, Optional, Union
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from models.model_option_leg import OptionLeg
+from services.market_data_provider import market_data, ProviderError
+from services.position_book import position_book
+from services.scenario_engine import historical_shocks, legs_from_book, pnl_cube, shock_set_pnl, DEFAULT_SPOT_SHOCKS, DEFAULT_VOL_SHOCKS, DEFAULT_DAYS
+
+router = APIRouter()
+
+# Non-positive (or NaN) prices and vols give NaN greeks, which would make every risk response unserializable
+Positive = Annotated[float, Field(gt=0, allow_inf_nan=False)]
+
+class PositionRequest(BaseModel):
+    name: str
+    legs: list[OptionLeg]
+    volatility: Union[Positive, list[Positive]]
+    spot: Optional[Union[Positive, dict[str, Positive]]] = None  # one price, or prices keyed by underlying
+    multiplier: Positive = 1.0
+
+class TickRequest(BaseModel):
+    underlying: str
+    spot: Optional[Positive] = None
+    volatility: Optional[Positive] = None
+    vol_shift: float = Field(0.0, allow_inf_nan=False)
+
+class ScenarioRequest(BaseModel):
+    # Shock ranges (spot shocks above -1, days >= 0) are checked by the engine and answered with 400
+    spot_shocks: list[float] = DEFAULT_SPOT_SHOCKS.tolist()
+    vol_shocks: list[float] = DEFAULT_VOL_SHOCKS.tolist()
+    days: list[float] = DEFAULT_DAYS.tolist()
+    skew_shocks: Optional[list[float]] = None
+    worst: int = 10
+    include_cube: bool = False
+    shocks: list[dict] = []  # named shocks: {"name", "spot", "vol", "days"}
+    history_ticker: Optional[str] = None  # add the largest 1-day moves of this ticker as named shocks
+    history_start: Optional[str] = None
+    history_end: Optional[str] = None
+    history_count: int = 10
+
+# Book routes are plain `def`: repricing runs on FastAPI's threadpool, keeping the event loop free.
+@router.post("/positions")
+def add_position(request: PositionRequest):
+    if isinstance(request.volatility, list) and len(request.volatility) != len(request.legs):
+        raise HTTPException(status_code=400, detail="Provide one volatility, or one per leg")
+    try:
+        added = position_book.add_strategy(request.name, request.legs, request.volatility, request.spot, multiplier=request.multiplier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": request.name, "legs_added": added}
+
+@router.delete("/positions/{name}")
+def close_position(name: str):
+    removed = position_book.remove_strategy(name)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    return {"name": name, "legs_removed": removed}
+
+@router.post("/positions/ticks")
+def apply_tick(request: TickRequest):
+    try:
+        return position_book.on_tick(request.underlying, request.spot, request.volatility, request.vol_shift)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/positions/risk")
+def book_risk():
+    return position_book.risk()
+
+@router.get("/positions/risk/strategies")
+def strategy_risk():
+    return position_book.strategy_risk()
+
+@router.get("/positions/risk/{underlying}")
+def underlying_risk(underlying: str):
+    try:
+        return position_book.underlying_risk(underlying)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+# Async for the history fetch; the scenario grids are priced on worker threads, off the event loop.
+@router.post("/positions/scenarios")
+async def book_scenarios(request: ScenarioRequest):
+    legs = await asyncio.to_thread(legs_from_book, position_book)
+    try:
+        result = await asyncio.to_thread(
+            pnl_cube, legs, request.spot_shocks, request.vol_shocks, request.days, request.skew_shocks, request.worst,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    shocks = list(request.shocks)
+    if request.history_ticker:
+        if not (request.history_start and request.history_end):
+            raise HTTPException(status_code=400, detail="history_start and history_end are required with history_ticker")
+        try:
+            bars = await market_data.daily_bars(request.history_ticker, request.history_start, request.history_end)
+        except ProviderError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        shocks += historical_shocks(bars, count=request.history_count)
+    try:
+        shock_pnl = await asyncio.to_thread(shock_set_pnl, legs, shocks)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid shock: {e}")
+    response = {
+        "legs": len(legs["strike"]), "base_value": result["base_value"], "worst": result["worst"],
+        "elapsed_ms": result["elapsed_ms"], "shocks": shock_pnl,
+    }
+    if request.include_cube:
+        response["grid"] = {axis: result[axis].tolist() for axis in ("spot_shocks", "vol_shocks", "skew_shocks", "days")}
+        response["pnl"] = result["pnl"].tolist()
+    return response
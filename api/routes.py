@@ -1,35 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.models.long_straddle import LongStraddle
-from app.models.long_put import LongPut
-from app.services.data_fetcher import fetch_eth_price
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import JSONResponse
+from typing import Optional
+from models.model_strategy_request import StrategyRequest, STRATEGIES
+from services.market_data_provider import market_data, ProviderError
+from services.options_pricing import PRICING_MODELS
+from services.pricing_cache import option_price_cache, strategy_cache, etag_for, PRICING_CACHE_TTL
 
 router = APIRouter()
 
-class StrategyRequest(BaseModel):
-    strategy: str
-    strike_price: float
-    time_to_expiry: float
-    volatility: float
-
 @router.post("/execute_strategy")
-async def execute_strategy(request: StrategyRequest):
-    eth_price = await fetch_eth_price()
+async def execute_strategy(request: StrategyRequest, if_none_match: Optional[str] = Header(default=None)):
+    if request.pricing_model and request.pricing_model not in PRICING_MODELS:
+        raise HTTPException(status_code=400, detail="Invalid pricing model")
+    if request.strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail="Invalid strategy")
+    try:
+        eth_price = await market_data.spot("ETH-USD")
+    except ProviderError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     strategy_params = {
         "underlying_price": eth_price,
         "strike_price": request.strike_price,
         "time_to_expiry": request.time_to_expiry,
         "risk_free_rate": 0.01,  # Assume a fixed risk-free rate for simplicity
-        "volatility": request.volatility
+        "volatility": request.volatility,
+        "underlying": "ETH",
+        "pricing_model": request.pricing_model,
+        "futures_price": request.futures_price,
     }
+    strategy = STRATEGIES[request.strategy](**strategy_params)
 
-    if request.strategy == "long_straddle":
-        strategy = LongStraddle(**strategy_params)
-    elif request.strategy == "long_put":
-        strategy = LongPut(**strategy_params)
-    else:
-        raise HTTPException(status_code=400, detail="Invalid strategy")
+    # Results are pure functions of the quantized inputs, so the ETag is known before pricing
+    etag = etag_for(strategy.cache_key())
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={int(PRICING_CACHE_TTL)}"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(strategy.execute_cached(), headers=headers)
 
-    result = strategy.execute_strategy()
-    return result
+@router.get("/pricing_cache")
+async def pricing_cache_stats():
+    return {"options": option_price_cache.stats(), "strategies": strategy_cache.stats()}
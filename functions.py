@@ -1,5 +1,4 @@
-import requests
-from datetime import timedelta, datetime
+from datetime import datetime
 import pytz
 from dotenv import load_dotenv
 import os
@@ -8,6 +7,18 @@ from scipy.stats import norm
 import os
 from math import log, sqrt, exp
 import json
+import hashlib
+from services.data_fetch_dolthub import DolthubError, fetch_option_chain, stream_option_chain
+from services.chain_stream import concat_expiries
+from services.chain_analytics import contracts_to_arrays, analyze_chain
+from services.chain_quality import screen_contracts
+from services.result_store import chain_rows, get_result_store
+from services.iv_analytics import record_chain
+from services.rate_limiter import scheduler
+from services.chain_snapshot import columns_to_contracts, open_snapshot, write_snapshot, snapshot_path
+from services.trading_calendar import NYSE
+from services.chain_updates import get_chain_updater
+import numpy as np
 
 # Load environment variables
 load_dotenv()
@@ -20,7 +31,7 @@ print(f"Using Polygon API Key: {polygon_api_key}")
 def get_historical_price(ticker, date):
     """Get the historical price for a given ticker at a specific date and time."""
     url = f"https://api.polygon.io/v1/open-close/{ticker}/{date}?adjusted=true&apiKey={polygon_api_key}"
-    response = requests.get(url)
+    response = scheduler.request("polygon", "GET", url)
     if response.status_code == 200:
         return response.json()
     else:
@@ -28,45 +39,21 @@ def get_historical_price(ticker, date):
         return None
     
 
-def get_past_monday(target_date):
-    """Calculate the date of the most recent Monday relative to a target date."""
-    days_since_monday = target_date.weekday()  # Monday is 0, Sunday is 6
-    past_monday = target_date - timedelta(days=days_since_monday)
-    return past_monday
-
-
-def get_next_friday(start_date):
-    """Calculate the next Friday after the given date."""
-    next_friday = start_date + timedelta((4 - start_date.weekday()) % 7)
-    return next_friday
-
-
 def get_day():
-    """Calculate the target dates (past Monday at 11:00 AM and next Friday)."""
-    today = datetime.now(pytz.timezone("US/Eastern"))
-    one_month_ago = today - timedelta(days=60)  # Avoid Labor Day
-    past_monday = get_past_monday(one_month_ago)
-
-    # Calculate the next Friday
-    next_friday = get_next_friday(past_monday)
-    print(f"Past Monday: {past_monday.strftime('%Y-%m-%d')}, Next Friday: {next_friday.strftime('%Y-%m-%d')}")
-    expiration = next_friday.strftime('%Y-%m-%d')
-    monday = past_monday.strftime('%Y-%m-%d')
-
-    # Define the date and time of 11:00 AM EST on that past Monday
-    past_monday_11am = past_monday.replace(hour=11, minute=0, second=0, microsecond=0)
+    """Entry and expiry of the weekly setup about a month back: (11:00 AM ET entry as UTC, expiry, entry date).
 
-    # Convert to UTC (Polygon API uses UTC timestamps)
-    utc_past_monday_11am = past_monday_11am.astimezone(pytz.utc)
-    utc_past_monday_11am_str = utc_past_monday_11am.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-    return utc_past_monday_11am_str, expiration, monday
+    Holidays are handled by the NYSE calendar (services.trading_calendar): a holiday Monday enters on
+    the next session and a holiday Friday expires on the previous one.
+    """
+    entry, expiration, monday = NYSE.weekly_setup(datetime.now(pytz.timezone("US/Eastern")), weeks_back=4)
+    print(f"Entry: {monday}, Expiration: {expiration}")
+    return entry, expiration, monday
 
 
 def get_historical_price(ticker, date):
     """Get the historical price for a given ticker at a specific date and time."""
     url = f"https://api.polygon.io/v1/open-close/{ticker}/{date}?adjusted=true&apiKey={polygon_api_key}"
-    response = requests.get(url)
+    response = scheduler.request("polygon", "GET", url)
     if response.status_code == 200:
         return response.json()
     else:
@@ -77,7 +64,7 @@ def get_historical_price(ticker, date):
 def get_intraday_price_at_time(ticker, date, time):
     """Retrieve minute-level intraday data for a specific ticker and time."""
     url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/minute/{date}/{date}?adjusted=true&apiKey={polygon_api_key}"
-    response = requests.get(url)
+    response = scheduler.request("polygon", "GET", url)
     if response.status_code == 200:
         data = response.json().get('results', [])
         for bar in data:
@@ -88,27 +75,43 @@ def get_intraday_price_at_time(ticker, date, time):
 
 
 # Define the function to get historical option data from Dolthub
-def get_option_contracts_from_dolthub(ticker, date):
-    """Retrieve AAPL option contracts data from Dolthub for the given date."""
-    # Construct the query to get options data for a specific ticker and date
-   # query = f"SELECT * FROM `option_chain` WHERE act_symbol='{ticker}' AND date='{date}'"
-    # url = f"{dolthub_url}?q={query}"
-
-    response = requests.get('https://www.dolthub.com/api/v1alpha1/post-no-preference/options/master?q=SELECT+*+FROM+%60option_chain%60+WHERE+act_symbol=%27AAPL%27+AND+date=%272019-02-09%27')
-    if response.status_code == 200:
-        data = response.json()
-        if 'rows' in data:
-            return data['rows']  # Return the list of rows containing option contracts
-        else:
-            print(f"No data found in response: {data}")
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-    return None
+def get_option_contracts_from_dolthub(ticker, date, **filters):
+    """Retrieve option contracts data from Dolthub for the given ticker and date.
+
+    :param ticker: Underlying symbol
+    :param date: Quote date, YYYY-MM-DD
+    :param filters: Pushed-down filters (expiry_from, expiry_to, spot, band, call_put, columns),
+        see services.data_fetch_dolthub.fetch_option_chain
+    :return: List of option contract rows, or None on error
+    """
+    return fetch_option_chain(ticker, date, **filters)
 
 # Modify the function to use Dolthub data for a specific date
-def get_option_contracts_for_day(ticker, date):
-    """Retrieve all available option contracts for the given ticker and date using Dolthub."""
-    return get_option_contracts_from_dolthub(ticker, date)
+def get_option_contracts_for_day(ticker, date, **filters):
+    """Retrieve all available option contracts for the given ticker and date using Dolthub.
+
+    Full chains are written once as a local snapshot (services.chain_snapshot) and read back from it afterwards.
+    The download is parsed as it streams, straight into the snapshot's columns (services.chain_stream).
+
+    :param filters: Pushed-down filters (expiry_from, expiry_to, spot, band, call_put), see
+        services.data_fetch_dolthub.stream_option_chain; filtered chains are not snapshotted
+    :return: List of option contract rows, or None on error
+    """
+    snapshot = None if filters else open_snapshot(ticker, date)
+    if snapshot is not None:
+        return snapshot.to_contracts()
+    try:
+        # Consume the whole stream before writing anything, so a failed page never leaves a partial snapshot
+        columns = concat_expiries(stream_option_chain(ticker, date, **filters))
+    except DolthubError as e:
+        print(f"Error fetching option chain for {ticker} on {date}: {e}")
+        return None
+    if not columns:
+        return []
+    if filters:
+        return columns_to_contracts(columns, ticker.upper(), date)
+    write_snapshot(snapshot_path(ticker, date), ticker, date, columns, source="dolthub")
+    return open_snapshot(ticker, date).to_contracts()
 
 
 
@@ -118,7 +121,7 @@ def get_option_contracts_for_day_old(ticker, date):
     all_contracts = []
     
     while url:
-        response = requests.get(url)
+        response = scheduler.request("polygon", "GET", url)
         if response.status_code == 200:
             data = response.json()
             contracts = data.get('results', [])
@@ -226,12 +229,13 @@ def filter_contracts(contracts, current_price, expiration_date, width):
     return filtered
 
 # Calculate implied volatility for each of the filtered contracts
-# Calculate implied volatility for each of the filtered contracts
-def calculate_iv_for_contracts(contracts, current_price):
+def calculate_iv_for_contracts(contracts, current_price, workers=None, model=None):
     """Calculate implied volatility for each contract in the list.
     
     :param contracts: List of option contracts retrieved from Dolthub.
     :param current_price: The current price of the underlying asset.
+    :param workers: Process count for the chain solver; defaults to CHAIN_WORKERS, <= 1 runs serially.
+    :param model: Pricing model name (services.options_pricing.PRICING_MODELS); defaults to the ticker's model.
     :return: A list of contracts with their respective implied volatilities.
     """
     # Risk-free rate (e.g., use the current yield on a 1-month US Treasury bond)
@@ -240,50 +244,85 @@ def calculate_iv_for_contracts(contracts, current_price):
     # Set the reference date to February 9, 2019
     reference_date = datetime(2019, 2, 9, tzinfo=pytz.utc)  # Use February 9, 2019 in UTC
 
-    # Calculate IV for each contract
-    contracts_with_iv = []
-    for contract in contracts:
-        strike_price = float(contract['strike'])  # Use 'strike' from the contract
-        option_type = contract['call_put'].lower()  # Determine if it's a call or put
-
-        # Use the expiration date from the contract to calculate time to expiration (T)
-        expiration_date = contract['expiration']
-        expiration_date_dt = datetime.strptime(expiration_date, "%Y-%m-%d").replace(tzinfo=pytz.utc)  # Make expiration_date UTC aware
-
-        # Calculate time to expiration in years, using reference date instead of current date
-        T = (expiration_date_dt - reference_date).days / 365.0
-
-        # Use the 'ask' price as the market price if available, otherwise skip
-        market_price = float(contract.get('ask', 0))
-        if market_price > 0 and strike_price > 0:
-            # Calculate implied volatility using the Black-Scholes model
-            iv = implied_volatility(market_price, current_price, strike_price, T, risk_free_rate, option_type)
-            if iv is not None:
-                # Add the IV to the contract details
-                contract_with_iv = {**contract, 'implied_volatility': iv}
-                contracts_with_iv.append(contract_with_iv)
-                print(f"Calculated IV for {option_type} option with strike {strike_price} and expiration {expiration_date}: {iv:.4f}")
-        else:
-            print(f"Skipping contract due to missing or invalid market/strike price: {contract}")
-
+    # Drop quotes that break parity, bounds, monotonicity or convexity before they reach the solver (and the LLM)
+    contracts, quality = screen_contracts(contracts, current_price * 4, reference_date)
+    if quality['dropped']:
+        print(f"Dropped {quality['dropped']} of {quality['contracts']} contracts failing quality checks: {quality['by_check']}")
+
+    # Use the 'ask' price as the market price if available, otherwise skip
+    priced = [c for c in contracts if float(c.get('ask') or 0) > 0 and float(c['strike']) > 0]
+    if len(priced) < len(contracts):
+        print(f"Skipping {len(contracts) - len(priced)} contracts due to missing or invalid market/strike price")
+    if not priced:
+        return []
+
+    # AAPL split 4 to 1 in 2020, polygon prices reflect adjusted
+    chain = contracts_to_arrays(priced, current_price * 4, reference_date)
+    chain['row'] = np.arange(len(priced))
+    chain = analyze_chain(chain, risk_free_rate, workers, model=model)
+
+    # Add the IV to the contract details, keeping the input order
+    order = np.argsort(chain['row'])
+    contracts_with_iv = [
+        {**priced[row], 'implied_volatility': float(iv)}
+        for row, iv in zip(chain['row'][order], chain['implied_volatility'][order])
+        if np.isfinite(iv)
+    ]
+    print(f"Calculated IV for {len(contracts_with_iv)} of {len(priced)} contracts")
     return contracts_with_iv
 
 
+def refresh_iv_for_contracts(ticker, contracts, current_price, as_of, workers=None, model=None):
+    """Incremental `calculate_iv_for_contracts` for repeated refreshes of one ticker's chain.
+
+    Only contracts whose quotes moved (or all of them, after a spot move) are re-solved,
+    see services.chain_updates.ChainUpdater.
+
+    :param ticker: Underlying symbol; each ticker keeps its own last solved chain
+    :param contracts: Latest option contracts retrieved from Dolthub.
+    :param current_price: The current price of the underlying asset.
+    :param as_of: Time of the refresh.
+    :param model: Pricing model name; each (ticker, model) pair keeps its own solved chain.
+    :return: A list of contracts with their implied volatilities and greeks.
+    """
+    # Same quality screen as calculate_iv_for_contracts
+    contracts, quality = screen_contracts(contracts, current_price * 4, as_of)
+    if quality['dropped']:
+        print(f"Dropped {quality['dropped']} of {quality['contracts']} contracts failing quality checks: {quality['by_check']}")
+
+    updater = get_chain_updater(ticker, workers=workers, model=model)
+    # AAPL split 4 to 1 in 2020, polygon prices reflect adjusted
+    report = updater.update(contracts, current_price * 4, as_of)
+    print(f"Recomputed {report['recomputed']} of {report['contracts']} contracts in {report['update_ms']} ms")
+    return updater.contracts_with_iv()
+
+
+def chain_inputs_digest(contracts, current_price):
+    """Digest of the quotes and spot a chain is solved from; equal digests give the same solved chain."""
+    payload = json.dumps([current_price, contracts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
-def analyze_iron_condor_setup(ticker):
-    """Analyze the iron condor setup for a given ticker on February 9, 2019."""
+
+def analyze_iron_condor_setup(ticker, use_store=True):
+    """Analyze the iron condor setup for a given ticker on February 9, 2019.
+
+    The chain is always re-fetched and refreshed through the ticker's ChainUpdater, so only
+    contracts whose quotes moved are re-solved. With the store, a chain stored from the
+    same inputs is returned as is, and a newly solved one is saved and recorded in the IV history.
+
+    :param use_store: Read the chain from / write it to the result store (services.result_store).
+    :return: Contracts with IV and greeks as `services.result_store.chain_rows` dicts.
+    """
     # Set the specific date for analysis: February 9, 2019
     monday = "2019-02-08"
-    
-    
+    as_of = "2019-02-09"
+
     # Get the historical price of the underlying asset at 11:00 AM EST on February 9, 2019
     intraday_price = get_intraday_price_at_time(ticker, monday, datetime(2019, 2, 8, 16, 0, tzinfo=pytz.utc).time())  # 11:00 AM EST is 16:00 UTC
     if not intraday_price:
         print(f"Could not retrieve intraday price for {ticker} on {monday} at 11:00 AM EST.")
         return None
-    
 
-    
     print(f"Underlying price at 11:00 AM EST on {monday}: {intraday_price}")
     
     # Get all option contracts for the given expiration date from Dolthub
@@ -304,9 +343,17 @@ def analyze_iron_condor_setup(ticker):
     
 
 
-    # Return the filtered contracts for further analysis or IV calculation
-    iv = calculate_iv_for_contracts(contracts, intraday_price)
-    return iv
+    # The store is a cache: a chain solved from these exact quotes and spot is read back, not re-solved
+    inputs = chain_inputs_digest(contracts, intraday_price)
+    if use_store and get_result_store().chain_inputs(ticker, as_of) == inputs:
+        return get_result_store().get_chain(ticker, as_of)
+
+    iv = refresh_iv_for_contracts(ticker, contracts, intraday_price, datetime(2019, 2, 9, tzinfo=pytz.utc))
+    if use_store:
+        get_result_store().save_chain(ticker, as_of, iv, inputs=inputs)
+        # Keep the IV rank/term-structure history current as chains are solved
+        record_chain(ticker, as_of, iv, spot=intraday_price * 4)
+    return chain_rows(ticker, as_of, iv)
 
 # Test the function to ensure everything is working
 def test():
@@ -324,6 +371,7 @@ def test():
 # print('Options Contracts FUNCTIONS:')
 # print(json.dumps(options_contracts, indent=4))  # Pretty print the JSON
 
-intraday_price = get_intraday_price_at_time("AAPL", "2024-10-01", "11:00:00")
-print('Intraday Price FUNCTIONS:')
-print(json.dumps(intraday_price, indent=4))  # Pretty print the JSON
\ No newline at end of file
+if __name__ == "__main__":
+    intraday_price = get_intraday_price_at_time("AAPL", "2024-10-01", "11:00:00")
+    print('Intraday Price FUNCTIONS:')
+    print(json.dumps(intraday_price, indent=4))  # Pretty print the JSON
\ No newline at end of file
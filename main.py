@@ -1,13 +1,45 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from api.analysis_routes import router as analysis_router
+from api.job_routes import router as job_router
+from api.routes import router as strategy_router
+from api.position_routes import router as position_router
+from api.iv_routes import router as iv_router
+from services.job_queue import WorkerPool, JOB_WORKERS
+from services.rate_limiter import scheduler
+from services.market_data_provider import market_data
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Analysis jobs run in separate worker processes so API latency is unaffected by their load
+    pool = WorkerPool(workers=JOB_WORKERS)
+    pool.start()
+    yield
+    pool.stop()
 
 # Create a FastAPI instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.include_router(analysis_router)
+app.include_router(job_router)
+app.include_router(strategy_router)
+app.include_router(position_router)
+app.include_router(iv_router)
 
 # Define a root endpoint
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to your FastAPI application!"}
 
+# Outbound data-provider queues: depth, in-flight calls, 429s and queue wait per provider
+@app.get("/rate-limits")
+async def rate_limits():
+    return scheduler.stats()
+
+# Market data providers: outcomes, hedges and p50/p95 latency per provider and data kind
+@app.get("/market-data/providers")
+async def market_data_providers():
+    return market_data.stats()
+
 # Define a sample endpoint
 @app.get("/items/{item_id}")
 async def read_item(item_id: int, q: str = None):
@@ -1,5 +1,11 @@
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
+from typing import ClassVar, Optional
+from pydantic import BaseModel, model_validator
+from services.options_pricing import get_pricing_model, model_for_underlying
+from services.monte_carlo import simulate_strategy
+from services.scenario_engine import legs_from_strategy, pnl_cube
+from services.pricing_cache import option_price_cache, strategy_cache, pricing_key, snap
+from models.model_option_leg import OptionLeg
 
 class OptionsStrategy(ABC, BaseModel):
     underlying_price: float
@@ -7,11 +13,96 @@ class OptionsStrategy(ABC, BaseModel):
     time_to_expiry: float
     risk_free_rate: float
     volatility: float
+    underlying: str = "ETH"
+    pricing_model: Optional[str] = None
+    # Quoted futures price for futures-settled options (ETH); selects Black-76 when no model is given
+    futures_price: Optional[float] = None
+
+    # Option types priced for the strategy, at its strike
+    option_types: ClassVar[tuple] = ()
+
+    @model_validator(mode="after")
+    def check_futures_price(self):
+        if self.model_name() == "black_76" and self.futures_price is None:
+            raise ValueError("black_76 prices from the futures price; futures_price is required")
+        return self
+
+    def model_name(self) -> str:
+        if self.pricing_model:
+            return self.pricing_model
+        if self.futures_price is not None:
+            return "black_76"
+        return model_for_underlying(self.underlying)
+
+    def pricing_inputs(self) -> dict:
+        return {
+            "underlying_price": self.underlying_price, "strike_price": self.strike_price,
+            "time_to_expiry": self.time_to_expiry, "risk_free_rate": self.risk_free_rate,
+            "volatility": self.volatility, "futures_price": self.futures_price,
+        }
+
+    def model_price(self, inputs: dict) -> float:
+        """Price the model is evaluated at: the futures price under Black-76, spot otherwise."""
+        return inputs["futures_price"] if self.model_name() == "black_76" else inputs["underlying_price"]
+
+    def cache_key(self) -> tuple:
+        """Quantized key for this strategy's inputs (see services.pricing_cache)."""
+        return pricing_key(type(self).__name__, *self.pricing_inputs().values(), self.model_name())
+
+    def price_option(self, option_type: str) -> float:
+        """Price one leg with `pricing_model`, or the underlying's configured model when unset.
+
+        Inputs are snapped to the pricing cache ticks and the price is memoized.
+        """
+        key = pricing_key("option", *self.pricing_inputs().values(), self.model_name(), option_type)
+
+        def compute() -> float:
+            inputs = snap(self.pricing_inputs())
+            model = get_pricing_model(self.model_name())
+            return float(model(
+                self.model_price(inputs), inputs["strike_price"], inputs["time_to_expiry"],
+                inputs["risk_free_rate"], inputs["volatility"], option_type == 'call'
+            ))
+
+        return option_price_cache.get_or_compute(key, compute)
+
+    def execute_cached(self) -> dict:
+        """`execute_strategy` memoized on `cache_key`, evaluated at the snapped inputs."""
+        return strategy_cache.get_or_compute(
+            self.cache_key(), lambda: type(self)(**{**self.model_dump(), **snap(self.pricing_inputs())}).execute_strategy()
+        )
+
+    def leg(self, option_type: str, quantity: float = 1.0) -> OptionLeg:
+        """Build an OptionLeg at this strategy's strike, priced with `price_option`."""
+        return OptionLeg(
+            option_type=option_type, strike=self.strike_price, quantity=quantity,
+            premium=self.price_option(option_type), time_to_expiry=self.time_to_expiry,
+            underlying=self.underlying
+        )
+
+    def simulate_profit_loss(self, n_paths: int = 1_000_000, seed: Optional[int] = None, **kwargs) -> dict:
+        """Monte Carlo P&L distribution of the strategy held to expiry, see services.monte_carlo."""
+        return simulate_strategy(
+            self.legs(), self.underlying_price, self.time_to_expiry,
+            self.risk_free_rate, self.volatility, n_paths=n_paths, seed=seed, **kwargs
+        )
+
+    def stress_test(self, **grid) -> dict:
+        """P&L of the strategy over a spot/vol/time shock grid, see services.scenario_engine.pnl_cube."""
+        return pnl_cube(legs_from_strategy(self), **grid)
+
+    @abstractmethod
+    def legs(self) -> list[OptionLeg]:
+        pass
 
     @abstractmethod
     def calculate_profit_loss(self) -> float:
         pass
 
     @abstractmethod
-    def execute_strategy(self) -> dict:
+    def summarize(self, prices: dict) -> dict:
+        """Strategy result from its leg prices, {option_type: price}."""
         pass
+
+    def execute_strategy(self) -> dict:
+        return self.summarize({option_type: self.price_option(option_type) for option_type in self.option_types})
@@ -1,19 +1,18 @@
-from app.models.base import OptionsStrategy
-from app.services.options_pricing import black_scholes_merton
+from models.model_base import OptionsStrategy
+from models.model_option_leg import OptionLeg
 
 class LongPut(OptionsStrategy):
+    option_types = ('put',)
+
+    def legs(self) -> list[OptionLeg]:
+        return [self.leg('put')]
+
     def calculate_profit_loss(self) -> float:
-        put_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'put'
-        )
+        put_price = self.price_option('put')
         return max(self.strike_price - self.underlying_price, 0) - put_price
 
-    def execute_strategy(self) -> dict:
-        put_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'put'
-        )
+    def summarize(self, prices: dict) -> dict:
+        put_price = prices['put']
         return {
             "strategy": "Long Put",
             "put_price": put_price,
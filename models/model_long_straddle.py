@@ -1,28 +1,21 @@
-from app.models.base import OptionsStrategy
-from app.services.options_pricing import black_scholes_merton
+from models.model_base import OptionsStrategy
+from models.model_option_leg import OptionLeg
 
 class LongStraddle(OptionsStrategy):
+    option_types = ('call', 'put')
+
+    def legs(self) -> list[OptionLeg]:
+        return [self.leg('call'), self.leg('put')]
+
     def calculate_profit_loss(self) -> float:
-        call_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'call'
-        )
-        put_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'put'
-        )
+        call_price = self.price_option('call')
+        put_price = self.price_option('put')
         total_cost = call_price + put_price
         return self.underlying_price - self.strike_price - total_cost
 
-    def execute_strategy(self) -> dict:
-        call_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'call'
-        )
-        put_price = black_scholes_merton(
-            self.underlying_price, self.strike_price, self.time_to_expiry,
-            self.risk_free_rate, self.volatility, 'put'
-        )
+    def summarize(self, prices: dict) -> dict:
+        call_price = prices['call']
+        put_price = prices['put']
         return {
             "strategy": "Long Straddle",
             "call_price": call_price,
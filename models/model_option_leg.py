@@ -0,0 +1,10 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+class OptionLeg(BaseModel):
+    option_type: Literal['call', 'put']
+    strike: float = Field(gt=0, allow_inf_nan=False)
+    quantity: float = 1.0  # positive for long, negative for short
+    premium: float = 0.0  # price per unit paid (long) or received (short) at entry
+    time_to_expiry: Optional[float] = None  # years; None expires at the evaluation horizon
+    underlying: str = "ETH"
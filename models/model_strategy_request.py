@@ -0,0 +1,25 @@
+from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from models.model_long_straddle import LongStraddle
+from models.model_long_put import LongPut
+
+class StrategyRequest(BaseModel):
+    strategy: str
+    # Non-positive (or NaN) inputs would price to NaN, which is not valid JSON
+    strike_price: float = Field(gt=0, allow_inf_nan=False)
+    time_to_expiry: float = Field(gt=0, allow_inf_nan=False)
+    volatility: float = Field(gt=0, allow_inf_nan=False)
+    pricing_model: Optional[str] = None
+    # Quoted futures price of the expiry; prices with Black-76 (futures-settled ETH options)
+    futures_price: Optional[float] = Field(default=None, gt=0, allow_inf_nan=False)
+
+    @model_validator(mode="after")
+    def check_futures_price(self):
+        if self.pricing_model == "black_76" and self.futures_price is None:
+            raise ValueError("black_76 prices from the futures price; futures_price is required")
+        return self
+
+STRATEGIES = {
+    "long_straddle": LongStraddle,
+    "long_put": LongPut,
+}
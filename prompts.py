@@ -1,3 +1,4 @@
+from services.condor_validation import proposal_block_example
 
 class Prompts(): 
     @staticmethod
@@ -91,6 +92,14 @@ class Prompts():
 
 
         
+        """
+    @staticmethod
+    def proposal_format(): 
+        return f"""
+        End every proposal with this block, filled in with strikes and the expiration exactly as they appear
+        in the contract data. It is checked automatically against the chain:
+
+        {proposal_block_example()}
         """
     @staticmethod
     def planner_prompt(): 
@@ -1,4 +1,4 @@
-import requests
+from services.rate_limiter import scheduler
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
@@ -8,7 +8,7 @@ alpha_v_api_key = os.getenv("ALPHAVANTAGE_API_KEY")
 
 def get_sentiment_analysis(symbol, time_from, time_to):
     url = f'https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={symbol}&time_from={time_from}&time_to={time_to}&apikey={alpha_v_api_key}'
-    response = requests.get(url)
+    response = scheduler.request("alphavantage", "GET", url)
     data = response.json()
     return data
 
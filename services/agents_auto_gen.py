@@ -1,51 +1,85 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import autogen
 
+from services.model_router import ModelRouter
+
+# Maximum number of LLM conversations running at once per StrategyAnalysisAgent.
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", 4))
+
+
 class StrategyAnalysisAgent:
-    def __init__(self):
-        self.config_list = autogen.config_list_from_json(
-            "OAI_CONFIG_LIST",
-            filter_dict={
-                "model": ["gpt-4", "gpt-3.5-turbo", "gpt-3.5-turbo-16k"],
-            },
-        )
-        self.assistant = autogen.AssistantAgent(
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_ANALYSES):
+        # Conversations block on network I/O, so they run on a dedicated thread pool
+        # sized to the concurrency limit instead of on the event loop.
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="strategy-analysis")
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight: dict = {}
+
+    def _build_agents(self, router: ModelRouter) -> tuple:
+        """Create a fresh assistant / user proxy pair so no chat state is shared between requests."""
+        assistant = autogen.AssistantAgent(
             name="Strategy_Analyst",
-            llm_config={
-                "config_list": self.config_list,
-            },
+            llm_config=router.llm_config("summarizer"),
         )
-        self.user_proxy = autogen.UserProxyAgent(
+        router.attach(assistant, "summarizer")
+        user_proxy = autogen.UserProxyAgent(
             name="User_Proxy",
             human_input_mode="NEVER",
             max_consecutive_auto_reply=10,
             is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
             code_execution_config={"work_dir": "coding"},
         )
+        return assistant, user_proxy
+
+    def _run_chat(self, prompt: str) -> str:
+        """Run one blocking conversation; called on the executor."""
+        router = ModelRouter()
+        assistant, user_proxy = self._build_agents(router)
+        user_proxy.initiate_chat(assistant, message=prompt)
+        print(f"Strategy analysis model usage: {router.report()}")
+
+        # Extract the last message from the assistant
+        last_message = user_proxy.chat_messages[assistant][-1]["content"]
+
+        # Remove the TERMINATE string from the end of the message
+        return last_message.replace("TERMINATE", "").strip()
+
+    async def _analyze(self, prompt: str) -> str:
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run_chat, prompt)
 
     async def analyze_strategy(self, strategy_data: dict) -> str:
         """
         Analyze the given strategy data and provide recommendations.
+
+        Identical `strategy_data` requests that arrive while one is in flight
+        share that conversation instead of starting a new one. A caller that is
+        cancelled does not cancel the shared conversation for the others.
         """
+        key = json.dumps(strategy_data, sort_keys=True, default=str)
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
         prompt = f"""
         Analyze the following options strategy data and provide recommendations:
         {strategy_data}
-        
+
         Please consider:
         1. The potential profit and loss scenarios
         2. The break-even points
         3. The maximum risk and reward
         4. Any market conditions that would favor this strategy
-        
+
         Provide a concise analysis and recommendation in 3-5 sentences.
         End your response with TERMINATE.
         """
-        
-        self.user_proxy.initiate_chat(self.assistant, message=prompt)
-        
-        # Extract the last message from the assistant
-        last_message = self.user_proxy.chat_messages[self.assistant][-1]["content"]
-        
-        # Remove the TERMINATE string from the end of the message
-        analysis = last_message.replace("TERMINATE", "").strip()
-        
-        return analysis
+
+        task = asyncio.ensure_future(self._analyze(prompt))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
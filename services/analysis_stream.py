@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable
+
+from autogen.io.base import IOStream
+
+from services.rate_limiter import scheduler, LIVE
+
+# Maximum number of streamed analyses running at once; each holds one worker thread.
+MAX_STREAMING_ANALYSES = int(os.getenv("MAX_STREAMING_ANALYSES", 4))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_STREAMING_ANALYSES, thread_name_prefix="analysis-stream")
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside the analysis thread once its client has gone away."""
+
+
+class _EventIOStream:
+    """
+    autogen IOStream that turns streamed completion chunks into 'token' events.
+
+    autogen prints each streamed chunk with end=""; every other print is
+    console chatter and is dropped. Raising from print aborts an in-flight
+    completion as soon as the client disconnects.
+    """
+
+    def __init__(self, emit: Callable, cancelled: threading.Event):
+        self.emit = emit
+        self.cancelled = cancelled
+        self.speaker = None
+
+    def print(self, *objects, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        if self.cancelled.is_set():
+            raise AnalysisCancelled()
+        if end != "":
+            return
+        text = _ANSI_RE.sub("", sep.join(str(o) for o in objects))
+        if text:
+            self.emit("token", {"agent": self.speaker, "text": text})
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return ""
+
+
+def format_sse(event: str, data) -> str:
+    """Serialize one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _run_analysis(ticker: str, expiry: str, date: str, emit: Callable, cancelled: threading.Event) -> None:
+    """Blocking analysis pipeline, run on the executor, reporting progress through `emit`."""
+    # A client is waiting on this analysis, so its data requests go ahead of queued backfill
+    with scheduler.priority(LIVE):
+        _run_live_analysis(ticker, expiry, date, emit, cancelled)
+
+
+def _run_live_analysis(ticker: str, expiry: str, date: str, emit: Callable, cancelled: threading.Event) -> None:
+    import agent
+
+    # Queued behind other streams; a client that already left should not cost a LIVE-priority fetch
+    if cancelled.is_set():
+        return
+    context = agent.build_analysis_context(ticker, expiry, date)
+    if context is None:
+        emit("error", {"detail": f"No market or option data available for {ticker}"})
+        return
+    emit("data", {"ticker": ticker, "spot": context["spot"], "contracts": len(context["contract_data"] or [])})
+    emit("candidates", context["candidates"])
+    if cancelled.is_set():
+        return
+
+    stream = _EventIOStream(emit, cancelled)
+
+    def on_turn(message: dict, next_speaker):
+        emit("message", {"agent": message.get("name"), "content": message.get("content")})
+        stream.speaker = next_speaker
+
+    stream.speaker = "StockAnalyst"
+    with IOStream.set_default(stream):
+        group_chat = agent.run_group_chat(context, stream=True, on_turn=on_turn, should_stop=cancelled.is_set)
+    final = group_chat.messages[-1] if group_chat.messages else {}
+    emit("final", {"analysis_id": agent.save_analysis(context, group_chat), "agent": final.get("name"), "recommendation": final.get("content")})
+
+
+async def analysis_events(ticker: str, expiry: str, date: str) -> AsyncIterator[str]:
+    """
+    Run an analysis on a worker thread and yield its progress as server-sent events.
+
+    Emits 'accepted' immediately, then 'data', 'candidates', 'token' (streamed
+    completion chunks), 'message' (each finished turn) and 'final', or 'error'.
+    'accepted' carries a `stream_id` for this stream only; the stored analysis id
+    arrives as `analysis_id` in 'final'.
+    Closing the generator (e.g. on client disconnect) cancels the analysis at
+    its next token or turn.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        if not cancelled.is_set():
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def run():
+        try:
+            _run_analysis(ticker, expiry, date, emit, cancelled)
+        except AnalysisCancelled:
+            pass
+        except Exception as e:
+            print(f"Streaming analysis for {ticker} failed: {e}")
+            emit("error", {"detail": str(e)})
+        finally:
+            emit(None, None)
+
+    yield format_sse("accepted", {"stream_id": uuid.uuid4().hex, "ticker": ticker})
+    loop.run_in_executor(_executor, run)
+    try:
+        while True:
+            event, data = await queue.get()
+            if event is None:
+                break
+            yield format_sse(event, data)
+    finally:
+        cancelled.set()
@@ -0,0 +1,183 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+_SECONDS_PER_DAY = 86400
+_MINUTE_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)])
+
+
+class BarSeries:
+    """
+    Columnar OHLCV candles: int64 unix-second timestamps plus float64 price and volume arrays.
+
+    Adjustments are stored as factors and applied when a column is read, and
+    date/time strings are formatted for the whole series at once, so the raw
+    arrays are never copied or exploded into per-bar objects. Use `to_records`
+    only where rows are actually needed (JSON responses, prompts).
+    """
+
+    __slots__ = ("t", "_raw", "_price_factor", "_volume_factor", "_dates", "_times")
+
+    def __init__(
+        self,
+        t: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        price_factor=1.0,
+        volume_factor=1.0,
+    ):
+        self.t = np.asarray(t, dtype=np.int64)
+        self._raw = {
+            "open": np.asarray(open, dtype=float),
+            "high": np.asarray(high, dtype=float),
+            "low": np.asarray(low, dtype=float),
+            "close": np.asarray(close, dtype=float),
+            "volume": np.asarray(volume, dtype=float),
+        }
+        self._price_factor = price_factor
+        self._volume_factor = volume_factor
+        self._dates = None
+        self._times = None
+
+    @classmethod
+    def empty(cls) -> "BarSeries":
+        return cls(*(np.empty(0) for _ in range(6)))
+
+    @classmethod
+    def from_market_data(cls, data: dict) -> "BarSeries":
+        """Wrap a Market Data candles response (`t`, `o`, `h`, `l`, `c`, `v` arrays) without copying per bar."""
+        if not all(key in data for key in ("t", "o", "h", "l", "c", "v")):
+            return cls.empty()
+        return cls(data["t"], data["o"], data["h"], data["l"], data["c"], data["v"])
+
+    @classmethod
+    def from_polygon_aggs(cls, aggs: Iterable) -> "BarSeries":
+        """Build from Polygon `Agg` objects (millisecond timestamps)."""
+        aggs = list(aggs)
+        n = len(aggs)
+        t = np.fromiter((agg.timestamp for agg in aggs), dtype=np.int64, count=n) // 1000
+        columns = [np.fromiter((getattr(agg, name) or 0.0 for agg in aggs), dtype=float, count=n) for name in (*PRICE_FIELDS, "volume")]
+        return cls(t, *columns)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def _derive(self, t: np.ndarray, raw: dict, price_factor, volume_factor) -> "BarSeries":
+        series = BarSeries.__new__(BarSeries)
+        series.t = t
+        series._raw = raw
+        series._price_factor = price_factor
+        series._volume_factor = volume_factor
+        series._dates = None
+        series._times = None
+        return series
+
+    # --- Columns ----------------------------------------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """Adjusted values of one column ('open', 'high', 'low', 'close' or 'volume')."""
+        raw = self._raw[name]
+        factor = self._volume_factor if name == "volume" else self._price_factor
+        if np.isscalar(factor) and factor == 1.0:
+            return raw
+        return raw * factor
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.column("open")
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.column("high")
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.column("low")
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.column("close")
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.column("volume")
+
+    @property
+    def nbytes(self) -> int:
+        return self.t.nbytes + sum(values.nbytes for values in self._raw.values())
+
+    def last_close(self) -> Optional[float]:
+        if len(self) == 0:
+            return None
+        factor = self._price_factor if np.isscalar(self._price_factor) else self._price_factor[-1]
+        return float(self._raw["close"][-1] * factor)
+
+    # --- Adjustments ------------------------------------------------------
+
+    def scaled(self, price_multiplier: float, volume_multiplier: float = 1.0) -> "BarSeries":
+        """Series whose prices (and optionally volumes) are multiplied on read; the raw arrays are shared."""
+        return self._derive(self.t, self._raw, self._price_factor * price_multiplier, self._volume_factor * volume_multiplier)
+
+    def split_adjusted(self, splits: Iterable[tuple]) -> "BarSeries":
+        """
+        Back-adjust for splits: bars before each split's date are divided by its ratio.
+
+        Args:
+            splits (Iterable[tuple]): (effective date YYYY-MM-DD, ratio) pairs, e.g. [("2020-08-31", 4)]
+
+        Returns:
+            BarSeries: Adjusted view sharing the raw arrays
+        """
+        day = self.t // _SECONDS_PER_DAY
+        factor = np.ones(len(self))
+        for date, ratio in splits:
+            effective = np.datetime64(date, "D").astype(np.int64)
+            factor[day < effective] /= ratio
+        return self._derive(self.t, self._raw, self._price_factor * factor, self._volume_factor / factor)
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> "BarSeries":
+        """Bars with start <= date <= end (YYYY-MM-DD), as views of the same arrays."""
+        lo = 0 if start is None else int(np.searchsorted(self.t, np.datetime64(start, "s").astype(np.int64), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.t, (np.datetime64(end, "D") + 1).astype("datetime64[s]").astype(np.int64), side="left"))
+        rows = slice(lo, hi)
+        price_factor = self._price_factor if np.isscalar(self._price_factor) else self._price_factor[rows]
+        volume_factor = self._volume_factor if np.isscalar(self._volume_factor) else self._volume_factor[rows]
+        return self._derive(self.t[rows], {name: values[rows] for name, values in self._raw.items()}, price_factor, volume_factor)
+
+    # --- Formatting -------------------------------------------------------
+
+    @property
+    def dates(self) -> np.ndarray:
+        """UTC dates as 'YYYY-MM-DD' strings, formatted once per distinct day."""
+        if self._dates is None:
+            days, index = np.unique(self.t // _SECONDS_PER_DAY, return_inverse=True)
+            self._dates = np.datetime_as_string(days.astype("datetime64[D]"))[index]
+        return self._dates
+
+    @property
+    def times(self) -> np.ndarray:
+        """UTC times of day as 'HH:MM' strings, looked up from the 1440 minutes of a day."""
+        if self._times is None:
+            self._times = _MINUTE_LABELS[(self.t % _SECONDS_PER_DAY) // 60]
+        return self._times
+
+    # --- Serialization edge -----------------------------------------------
+
+    def to_columns(self, include_time: bool = True) -> dict:
+        """Column name to list, the compact form for JSON responses."""
+        columns = {"date": self.dates.tolist()}
+        if include_time:
+            columns["time"] = self.times.tolist()
+        for name in (*PRICE_FIELDS, "volume"):
+            columns[name] = self.column(name).tolist()
+        return columns
+
+    def to_records(self, include_time: bool = True) -> list:
+        """One dict per bar, in the shape `rename_market_data` used to return."""
+        columns = self.to_columns(include_time)
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
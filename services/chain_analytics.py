@@ -0,0 +1,178 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from services.options_pricing import implied_volatility_vectorized, model_for_underlying
+from services.trading_calendar import calendar_for
+
+# Default worker count for parallel chain analytics; 0 or 1 forces the serial path.
+CHAIN_WORKERS = int(os.getenv("CHAIN_WORKERS", os.cpu_count() or 1))
+
+# Below this many contracts the pool start-up costs more than it saves.
+MIN_PARALLEL_ROWS = 20000
+
+_INPUT_COLUMNS = ("spot", "strike", "time_to_expiry", "price", "is_call", "model_code")
+
+
+def contracts_to_arrays(contracts: list, spot: float, reference_date: datetime, underlying: str = "") -> dict:
+    """
+    Convert Dolthub-style contract dicts into the columnar layout used by the analytics.
+
+    Args:
+        contracts (list): Rows with 'strike', 'call_put', 'expiration' and 'ask'
+        spot (float): Underlying price for every row
+        reference_date (datetime): Time time-to-expiry is measured from (UTC when naive)
+        underlying (str): Underlying symbol, defaults to each row's 'act_symbol'
+
+    Returns:
+        dict: Column name to numpy array
+    """
+    expiration = np.array([c["expiration"] for c in contracts], dtype="datetime64[D]")
+    calendar = calendar_for(underlying or (contracts[0].get("act_symbol", "") if contracts else ""))
+    return {
+        "underlying": np.array([underlying or c.get("act_symbol", "") for c in contracts]),
+        "expiration": expiration,
+        "spot": np.full(len(contracts), float(spot)),
+        "strike": np.array([float(c["strike"]) for c in contracts]),
+        "time_to_expiry": calendar.year_fraction(expiration, reference_date),
+        "price": np.array([float(c.get("ask") or 0) for c in contracts]),
+        "is_call": np.array([c["call_put"].lower() == "call" for c in contracts]),
+    }
+
+
+def concat_chains(chains: list) -> dict:
+    """Concatenate several columnar chains into one."""
+    return {key: np.concatenate([chain[key] for chain in chains]) for key in chains[0]}
+
+
+def partition_chain(chain: dict, n_tasks: int) -> tuple:
+    """
+    Sort a chain by (underlying, expiration) and split it into contiguous tasks.
+
+    Task boundaries always fall between expiries, and expiries are packed
+    greedily so each task holds roughly the same number of contracts.
+
+    Returns:
+        tuple: (sorted chain, list of (start, stop) row ranges)
+    """
+    order = np.lexsort((chain["expiration"], chain["underlying"]))
+    chain = {key: values[order] for key, values in chain.items()}
+    n_rows = len(order)
+    if n_rows == 0:
+        return chain, []
+
+    changed = (chain["underlying"][1:] != chain["underlying"][:-1]) | (chain["expiration"][1:] != chain["expiration"][:-1])
+    bounds = np.concatenate(([0], np.nonzero(changed)[0] + 1, [n_rows]))
+    target = max(n_rows // max(n_tasks, 1), 1)
+
+    ranges = []
+    start = 0
+    for stop in bounds[1:]:
+        if stop - start >= target or stop == n_rows:
+            ranges.append((start, int(stop)))
+            start = int(stop)
+    return chain, ranges
+
+
+def _solve_range(chain: dict, start: int, stop: int, risk_free_rate: float, models: dict) -> np.ndarray:
+    """Solve implied volatility for rows [start, stop) of a columnar chain, one model per underlying."""
+    rows = slice(start, stop)
+    iv = np.full(stop - start, np.nan)
+    codes = chain["model_code"][rows]
+    for code, model in models.items():
+        mask = codes == code
+        if not mask.any():
+            continue
+        iv[mask] = implied_volatility_vectorized(
+            chain["price"][rows][mask], chain["spot"][rows][mask], chain["strike"][rows][mask],
+            chain["time_to_expiry"][rows][mask], risk_free_rate, chain["is_call"][rows][mask], model=model,
+        )
+    return iv
+
+
+def _attach(specs: dict) -> tuple:
+    """Attach to shared memory blocks described by {name: (shm_name, dtype, length)}."""
+    blocks = {name: shared_memory.SharedMemory(name=shm_name) for name, (shm_name, _, _) in specs.items()}
+    arrays = {
+        name: np.ndarray((length,), dtype=dtype, buffer=blocks[name].buf)
+        for name, (_, dtype, length) in specs.items()
+    }
+    return blocks, arrays
+
+
+def _worker(specs: dict, start: int, stop: int, risk_free_rate: float, models: dict) -> int:
+    """Process-pool entry point: read inputs from and write IVs to shared memory."""
+    blocks, arrays = _attach(specs)
+    try:
+        arrays["implied_volatility"][start:stop] = _solve_range(arrays, start, stop, risk_free_rate, models)
+        return stop - start
+    finally:
+        del arrays
+        for block in blocks.values():
+            block.close()
+
+
+def analyze_chain(
+    chain: dict,
+    risk_free_rate: float = 0.0398,
+    workers: Optional[int] = None,
+    min_parallel_rows: int = MIN_PARALLEL_ROWS,
+    model: Optional[str] = None,
+) -> dict:
+    """
+    Compute implied volatility for a columnar chain, in parallel across (underlying, expiry) partitions.
+
+    Inputs are copied once into shared memory; workers receive only block
+    names and row ranges, so no array data is pickled.
+
+    Args:
+        chain (dict): Columnar chain as produced by `contracts_to_arrays`
+        risk_free_rate (float): Risk-free interest rate
+        workers (int): Process count, defaults to CHAIN_WORKERS; <= 1 runs serially
+        min_parallel_rows (int): Chains smaller than this always run serially
+        model (str): Pricing model for every row; defaults to each underlying's configured model
+
+    Returns:
+        dict: The chain sorted by (underlying, expiration) with an added 'implied_volatility' column
+    """
+    workers = CHAIN_WORKERS if workers is None else workers
+    chain, ranges = partition_chain(chain, n_tasks=max(workers, 1) * 4)
+    n_rows = len(chain["strike"])
+
+    underlyings, inverse = np.unique(chain["underlying"], return_inverse=True)
+    model_names = [model or model_for_underlying(str(u)) for u in underlyings]
+    unique_models = sorted(set(model_names))
+    models = dict(enumerate(unique_models))
+    chain["model_code"] = np.array([unique_models.index(m) for m in model_names], dtype=np.int8)[inverse]
+
+    if workers <= 1 or n_rows < min_parallel_rows or len(ranges) < 2:
+        chain["implied_volatility"] = _solve_range(chain, 0, n_rows, risk_free_rate, models)
+        return chain
+
+    columns = {name: np.ascontiguousarray(chain[name]) for name in _INPUT_COLUMNS}
+    columns["implied_volatility"] = np.full(n_rows, np.nan)
+    blocks = {}
+    try:
+        specs = {}
+        for name, values in columns.items():
+            blocks[name] = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=blocks[name].buf)[:] = values
+            specs[name] = (blocks[name].name, values.dtype.str, n_rows)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_worker, specs, start, stop, risk_free_rate, models) for start, stop in ranges]
+            for future in futures:
+                future.result()
+
+        result = np.ndarray((n_rows,), dtype=float, buffer=blocks["implied_volatility"].buf)
+        chain["implied_volatility"] = result.copy()
+        del result
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    return chain
@@ -0,0 +1,295 @@
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from services.chain_snapshot import ChainSnapshot
+from services.chain_updates import contract_keys
+from services.trading_calendar import calendar_for, NYSE
+
+# Price slack (option price units) before a parity, monotonicity, convexity or bound check fails.
+QUALITY_TOLERANCE = float(os.getenv("CHAIN_QUALITY_TOLERANCE", 0.01))
+# Spread beyond this share of the mid (and MIN_WIDE_SPREAD in price) is flagged as wide.
+MAX_RELATIVE_SPREAD = float(os.getenv("CHAIN_MAX_RELATIVE_SPREAD", 0.5))
+MIN_WIDE_SPREAD = 0.10
+# Spot move between snapshots beyond which unchanged near-the-money quotes count as stale.
+STALE_SPOT_MOVE = float(os.getenv("CHAIN_STALE_SPOT_MOVE", 0.005))
+STALE_MONEYNESS = 0.1
+
+# Per-contract flag bits
+NO_QUOTE = 1        # no ask, so nothing to solve against
+CROSSED = 2         # bid above ask
+OUT_OF_BOUNDS = 4   # ask below intrinsic value or above the no-arbitrage cap: no IV exists
+PARITY = 8          # off put-call parity by more than the spreads allow, and the outlier leg of its pair
+MONOTONIC = 16      # call prices rising / put prices falling with strike
+CONVEXITY = 32      # priced above the straight line between its strike neighbours
+WIDE = 64           # spread wide relative to the mid
+STALE = 128         # quote unchanged since the previous snapshot while spot moved
+
+FLAG_NAMES = {
+    NO_QUOTE: "no_quote", CROSSED: "crossed", OUT_OF_BOUNDS: "out_of_bounds", PARITY: "parity",
+    MONOTONIC: "monotonic", CONVEXITY: "convexity", WIDE: "wide", STALE: "stale",
+}
+# Flags that drop a contract before IV solving; wide and stale quotes are only reported.
+DROP_FLAGS = NO_QUOTE | CROSSED | OUT_OF_BOUNDS | PARITY | MONOTONIC | CONVEXITY
+
+
+def _pair_violations(order: np.ndarray, violated: np.ndarray, n: int) -> np.ndarray:
+    """
+    Rows to flag for violated adjacent pairs (order[i], order[i + 1]).
+
+    A row in more violated pairs than its partner is the outlier and takes the
+    flag alone; an isolated violated pair flags both rows.
+    """
+    count = np.zeros(n, dtype=np.int64)
+    np.add.at(count, order[:-1][violated], 1)
+    np.add.at(count, order[1:][violated], 1)
+    left, right = order[:-1][violated], order[1:][violated]
+    flagged = np.zeros(n, dtype=bool)
+    flagged[left[count[left] >= count[right]]] = True
+    flagged[right[count[right] >= count[left]]] = True
+    return flagged
+
+
+def _parity_outliers(expiration, strike, is_call, mid, calls: np.ndarray, puts: np.ndarray) -> tuple:
+    """
+    Which leg of each call/put pair is off the strike curve of its own type.
+
+    By parity C - P is linear in strike, so calls and puts share one curvature.
+    Each leg's curvature (normalized second difference against its strike
+    neighbours) is compared with the curvature of both types at the neighbouring
+    strikes; the leg further from it is the outlier. Legs without two neighbours
+    cannot be told apart, so both are reported.
+
+    Returns:
+        tuple: (call is an outlier, put is an outlier), boolean arrays aligned with `calls` / `puts`
+    """
+    n = len(strike)
+    order = np.lexsort((strike, is_call, expiration))
+    order = order[np.isfinite(mid[order])]
+    curvature = np.full(n, np.nan)
+    previous = np.full(n, -1)
+    following = np.full(n, -1)
+    if len(order) > 2:
+        left, middle, right = order[:-2], order[1:-1], order[2:]
+        same = (expiration[order[:-1]] == expiration[order[1:]]) & (is_call[order[:-1]] == is_call[order[1:]])
+        inner = same[:-1] & same[1:]
+        left, middle, right = left[inner], middle[inner], right[inner]
+        low, high = strike[middle] - strike[left], strike[right] - strike[middle]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            line = (high * mid[left] + low * mid[right]) / (low + high)
+            curvature[middle] = 2 * (line - mid[middle]) / (low * high)
+        previous[middle], following[middle] = left, right
+
+    def at(rows):
+        return np.where(rows >= 0, curvature[rows], np.nan)
+
+    neighbours = np.stack([at(previous[calls]), at(following[calls]), at(previous[puts]), at(following[puts])])
+    counts = np.isfinite(neighbours).sum(axis=0)
+    reference = np.where(counts > 0, np.nansum(neighbours, axis=0) / np.maximum(counts, 1), np.nan)
+    call_gap = np.abs(curvature[calls] - reference)
+    put_gap = np.abs(curvature[puts] - reference)
+    unknown = ~(np.isfinite(call_gap) & np.isfinite(put_gap))
+    return unknown | (call_gap >= put_gap), unknown | (put_gap >= call_gap)
+
+
+def implied_forwards(expiration, strike, is_call, mid, discount) -> dict:
+    """
+    Per-expiry forward implied by put-call parity: the median of K + (C - P) / DF over call/put pairs.
+
+    Returns:
+        dict: 'pair_call' and 'pair_put' row indices of each aligned pair, and 'forward',
+            the implied forward of each row's expiry (NaN without pairs)
+    """
+    n = len(strike)
+    keys = contract_keys(expiration, strike, is_call)
+    order = np.argsort(keys, kind="stable")
+    # Within a (expiry, strike) the put (bit 0) sorts just before the call (bit 1)
+    paired = (keys[order][1:] >> 1) == (keys[order][:-1] >> 1)
+    puts, calls = order[:-1][paired], order[1:][paired]
+    valid = np.isfinite(mid[calls]) & np.isfinite(mid[puts])
+    puts, calls = puts[valid], calls[valid]
+
+    forward = np.full(n, np.nan)
+    if len(calls):
+        pair_forward = strike[calls] + (mid[calls] - mid[puts]) / discount[calls]
+        day = expiration[calls].astype("datetime64[D]").astype(np.int64)
+        by_expiry = np.lexsort((pair_forward, day))
+        days, starts, counts = np.unique(day[by_expiry], return_index=True, return_counts=True)
+        lower = pair_forward[by_expiry][starts + (counts - 1) // 2]
+        upper = pair_forward[by_expiry][starts + counts // 2]
+        expiry_forward = 0.5 * (lower + upper)
+        row_day = expiration.astype("datetime64[D]").astype(np.int64)
+        at = np.minimum(np.searchsorted(days, row_day), len(days) - 1)
+        forward = np.where(days[at] == row_day, expiry_forward[at], np.nan)
+    return {"pair_call": calls, "pair_put": puts, "forward": forward}
+
+
+def check_chain(
+    columns: dict,
+    spot: Optional[float] = None,
+    as_of=None,
+    underlying: str = "",
+    risk_free_rate: float = 0.0398,
+    previous: Optional[dict] = None,
+    previous_spot: Optional[float] = None,
+    american: Optional[bool] = None,
+) -> dict:
+    """
+    Vectorized quote-quality checks over a whole chain.
+
+    Calls and puts are aligned by (expiry, strike) for put-call parity against the
+    expiry's implied forward; within each expiry and option type, prices must fall
+    (calls) or rise (puts) with strike and be convex in it. Neighbour checks use
+    executable prices (one side's bid against the other's ask), so only quotes that
+    admit an arbitrage fail. Bounds use the implied forward, falling back to `spot`.
+    American chains get K * (1 - DF) of parity slack for early exercise, and puts
+    are capped at the strike rather than its discounted value.
+
+    Args:
+        columns (dict): Snapshot-layout columns (services.chain_snapshot): expiration, strike, is_call,
+            bid, ask and optionally time_to_expiry
+        spot (float): Underlying price, in strike terms, for bounds where no forward is implied
+        as_of: Chain time, for time to expiry when there is no time_to_expiry column
+        underlying (str): Symbol, for its trading calendar
+        risk_free_rate (float): Discount rate
+        previous (dict): Previous snapshot's columns, for the stale-quote check
+        previous_spot (float): Spot at the previous snapshot
+        american (bool): Early-exercise chain; defaults to True for listed (NYSE calendar) underlyings
+
+    Returns:
+        dict: 'flags' (per-row bit mask, see FLAG_NAMES), 'forward' (per row) and 'report'
+    """
+    started = time.perf_counter()
+    expiration = np.asarray(columns["expiration"]).astype("datetime64[D]")
+    strike = np.asarray(columns["strike"], dtype=float)
+    is_call = np.asarray(columns["is_call"], dtype=bool)
+    bid = np.nan_to_num(np.asarray(columns["bid"], dtype=float), nan=0.0)
+    ask = np.nan_to_num(np.asarray(columns["ask"], dtype=float), nan=0.0)
+    n = len(strike)
+    if "time_to_expiry" in columns:
+        T = np.asarray(columns["time_to_expiry"], dtype=float)
+    elif as_of is not None:
+        T = calendar_for(underlying).year_fraction(expiration, as_of)
+    else:
+        T = np.zeros(n)
+    discount = np.exp(-risk_free_rate * T)
+    tol = QUALITY_TOLERANCE
+    if american is None:
+        american = calendar_for(underlying) is NYSE
+    flags = np.zeros(n, dtype=np.int16)
+
+    quoted = ask > 0
+    flags[~quoted] |= NO_QUOTE
+    flags[quoted & (bid > ask)] |= CROSSED
+    sane = quoted & (bid <= ask)
+    mid = np.where(sane, np.where(bid > 0, 0.5 * (bid + ask), ask), np.nan)
+    spread = ask - bid
+    flags[sane & (bid > 0) & (spread > np.maximum(MAX_RELATIVE_SPREAD * mid, MIN_WIDE_SPREAD))] |= WIDE
+
+    # Put-call parity against each expiry's implied forward; only the leg off its strike curve is flagged
+    two_sided = np.where(sane & (bid > 0), mid, np.nan)
+    parity = implied_forwards(expiration, strike, is_call, two_sided, discount)
+    calls, puts = parity["pair_call"], parity["pair_put"]
+    forward = parity["forward"]
+    residual = (mid[calls] - mid[puts]) - discount[calls] * (forward[calls] - strike[calls])
+    allowed = 0.5 * (spread[calls] + spread[puts]) + tol
+    if american:
+        allowed = allowed + strike[calls] * (1 - discount[calls])
+    off = np.abs(residual) > allowed
+    call_outlier, put_outlier = _parity_outliers(expiration, strike, is_call, two_sided, calls[off], puts[off])
+    flags[calls[off][call_outlier]] |= PARITY
+    flags[puts[off][put_outlier]] |= PARITY
+
+    # No-arbitrage bounds on the price the solver uses (the ask)
+    level = np.where(np.isfinite(forward), forward, np.nan if spot is None else spot / discount)
+    with np.errstate(invalid="ignore"):
+        intrinsic = discount * np.maximum(np.where(is_call, level - strike, strike - level), 0)
+        cap = np.where(is_call, discount * level, strike if american else discount * strike)
+        flags[quoted & ((ask < intrinsic - tol) | (ask > cap + tol))] |= OUT_OF_BOUNDS
+
+    # Monotonicity and convexity within (expiry, type), strikes ascending
+    order = np.lexsort((strike, is_call, expiration))
+    order = order[sane[order]]
+    low, high = order[:-1], order[1:]
+    same = (expiration[low] == expiration[high]) & (is_call[low] == is_call[high])
+    # Calls: the higher strike must not bid above the lower strike's ask; puts the reverse
+    rising = np.where(is_call[low], bid[high] - ask[low], bid[low] - ask[high]) > tol
+    flags[_pair_violations(order, same & rising, n)] |= MONOTONIC
+
+    if len(order) > 2:
+        left, middle, right = order[:-2], order[1:-1], order[2:]
+        inner = same[:-1] & same[1:]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = (strike[right] - strike[middle]) / (strike[right] - strike[left])
+        # Buying the wings and selling the middle must not pay: middle bid <= interpolated wing asks
+        flags[middle[inner & (bid[middle] > weight * ask[left] + (1 - weight) * ask[right] + tol)]] |= CONVEXITY
+
+    if previous is not None and previous_spot and spot:
+        if abs(spot / previous_spot - 1) > STALE_SPOT_MOVE:
+            keys = contract_keys(expiration, strike, is_call)
+            before = contract_keys(
+                np.asarray(previous["expiration"]).astype("datetime64[D]"),
+                np.asarray(previous["strike"], dtype=float), np.asarray(previous["is_call"], dtype=bool),
+            )
+            position = np.argsort(before)
+            at = np.minimum(np.searchsorted(before[position], keys), max(len(before) - 1, 0))
+            if len(before):
+                match = position[at]
+                found = before[match] == keys
+                unchanged = found & (np.asarray(previous["bid"], dtype=float)[match] == bid) & (np.asarray(previous["ask"], dtype=float)[match] == ask)
+                near = np.abs(np.log(strike / spot)) < STALE_MONEYNESS
+                flags[unchanged & near & quoted] |= STALE
+
+    return {"flags": flags, "forward": forward, "report": quality_report(expiration, flags, len(calls), (time.perf_counter() - started) * 1000)}
+
+
+def quality_report(expiration: np.ndarray, flags: np.ndarray, pairs: int = 0, elapsed_ms: float = 0.0) -> dict:
+    """Counts per check, flagged and droppable contracts, and the expiries they touch."""
+    n = len(flags)
+    dropped = (flags & DROP_FLAGS) != 0
+    return {
+        "contracts": n,
+        "pairs": int(pairs),
+        "flagged": int((flags != 0).sum()),
+        "dropped": int(dropped.sum()),
+        "dropped_share": round(float(dropped.mean()), 4) if n else 0.0,
+        "by_check": {name: int(((flags & bit) != 0).sum()) for bit, name in FLAG_NAMES.items()},
+        "expiries_affected": int(len(np.unique(expiration[dropped]))),
+        "check_ms": round(elapsed_ms, 3),
+    }
+
+
+def check_snapshot(snapshot: ChainSnapshot, spot: Optional[float] = None, previous: Optional[ChainSnapshot] = None, previous_spot: Optional[float] = None) -> dict:
+    """`check_chain` over a stored snapshot, at its own date."""
+    return check_chain(
+        snapshot.select(), spot, snapshot.as_of, snapshot.ticker,
+        previous=previous.select() if previous is not None else None, previous_spot=previous_spot,
+    )
+
+
+def screen_contracts(contracts: list, spot: Optional[float], as_of: datetime, drop: int = DROP_FLAGS) -> tuple:
+    """
+    Run `check_chain` over Dolthub-style contract dicts and drop the ones failing a `drop` check.
+
+    Returns:
+        tuple: (kept contracts, report)
+    """
+    if not contracts:
+        return [], quality_report(np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.int16))
+
+    def column(key):
+        return np.array([float(c[key]) if c.get(key) not in (None, "") else np.nan for c in contracts])
+
+    columns = {
+        "expiration": np.array([c["expiration"] for c in contracts], dtype="datetime64[D]"),
+        "strike": column("strike"),
+        "is_call": np.array([c["call_put"].lower() == "call" for c in contracts]),
+        "bid": column("bid"),
+        "ask": column("ask"),
+    }
+    result = check_chain(columns, spot, as_of, contracts[0].get("act_symbol", ""))
+    keep = (result["flags"] & drop) == 0
+    return [c for c, kept in zip(contracts, keep.tolist()) if kept], result["report"]
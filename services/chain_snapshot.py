@@ -0,0 +1,385 @@
+import json
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+
+from services.trading_calendar import calendar_for
+
+# Root directory for snapshots, laid out as {SNAPSHOT_DIR}/{TICKER}/{YYYY-MM-DD}.chain
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+# Per-ticker summary of stored dates, {SNAPSHOT_DIR}/{TICKER}/index.json
+INDEX_FILE = "index.json"
+
+MAGIC = b"TCCHAIN1"
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sI")
+
+# Column dtypes; only `expiration`, `strike`, `is_call`, `bid` and `ask` are required.
+COLUMN_DTYPES = {
+    "expiration": "<M8[D]",
+    "strike": "<f8",
+    "is_call": "|b1",
+    "bid": "<f8",
+    "ask": "<f8",
+    "vol": "<f8",
+    "delta": "<f8",
+    "gamma": "<f8",
+    "theta": "<f8",
+    "vega": "<f8",
+    "rho": "<f8",
+    "open_interest": "<f8",
+    "volume": "<f8",
+}
+REQUIRED_COLUMNS = ("expiration", "strike", "is_call", "bid", "ask")
+
+
+def snapshot_path(ticker: str, as_of: str, root: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(root, ticker.upper(), f"{as_of}.chain")
+
+
+def _float_column(rows: list, key: str) -> np.ndarray:
+    return np.array([float(r[key]) if r.get(key) not in (None, "") else np.nan for r in rows])
+
+
+def from_dolthub(rows: list) -> dict:
+    """Columns from Dolthub `option_chain` rows (strings, see 'options data.txt')."""
+    columns = {
+        "expiration": np.array([r["expiration"] for r in rows], dtype="datetime64[D]"),
+        "strike": _float_column(rows, "strike"),
+        "is_call": np.array([r["call_put"].lower() == "call" for r in rows]),
+        "bid": _float_column(rows, "bid"),
+        "ask": _float_column(rows, "ask"),
+    }
+    for key in ("vol", "delta", "gamma", "theta", "vega", "rho"):
+        if rows and key in rows[0]:
+            columns[key] = _float_column(rows, key)
+    return columns
+
+
+def from_market_data(data: dict) -> dict:
+    """Columns from a Market Data `options/chain` response (parallel arrays, unix-second expirations)."""
+    expiration = np.asarray(data["expiration"], dtype="int64") // 86400
+    columns = {
+        "expiration": expiration.astype("datetime64[D]"),
+        "strike": np.asarray(data["strike"], dtype=float),
+        "is_call": np.array([side.lower() == "call" for side in data["side"]]),
+        "bid": np.asarray(data["bid"], dtype=float),
+        "ask": np.asarray(data["ask"], dtype=float),
+    }
+    renames = {"iv": "vol", "delta": "delta", "gamma": "gamma", "theta": "theta", "vega": "vega", "rho": "rho",
+               "openInterest": "open_interest", "volume": "volume"}
+    for key, column in renames.items():
+        if key in data:
+            columns[column] = np.array([np.nan if v is None else v for v in data[key]], dtype=float)
+    return columns
+
+
+def from_polygon(results: list) -> dict:
+    """Columns from Polygon option snapshot results (or reference contracts, which have no quotes)."""
+    details = [r.get("details", r) for r in results]
+    quotes = [r.get("last_quote") or {} for r in results]
+    greeks = [r.get("greeks") or {} for r in results]
+    columns = {
+        "expiration": np.array([d["expiration_date"] for d in details], dtype="datetime64[D]"),
+        "strike": np.array([float(d["strike_price"]) for d in details]),
+        "is_call": np.array([d["contract_type"].lower() == "call" for d in details]),
+        "bid": _float_column(quotes, "bid"),
+        "ask": _float_column(quotes, "ask"),
+        "vol": _float_column(results, "implied_volatility"),
+        "open_interest": _float_column(results, "open_interest"),
+    }
+    for key in ("delta", "gamma", "theta", "vega"):
+        columns[key] = _float_column(greeks, key)
+    return columns
+
+
+def write_snapshot(path: str, ticker: str, as_of: str, columns: dict, source: str = "") -> str:
+    """
+    Write one (ticker, date) chain as a snapshot file.
+
+    Rows are sorted by (expiration, strike, call/put) and every column starts on
+    a 64-byte boundary, so an expiry or strike band maps to one contiguous byte
+    range per column. The file is written to a temporary name and renamed.
+
+    Args:
+        path (str): Destination file
+        ticker (str): Underlying symbol
+        as_of (str): Chain date (YYYY-MM-DD)
+        columns (dict): Column name to array, e.g. from `from_dolthub`
+        source (str): Provider name recorded in the header
+
+    Returns:
+        str: The path written
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Snapshot is missing columns: {missing}")
+    unknown = [name for name in columns if name not in COLUMN_DTYPES]
+    if unknown:
+        raise ValueError(f"Unknown snapshot columns: {unknown}")
+
+    arrays = {name: np.asarray(values).astype(COLUMN_DTYPES[name]) for name, values in columns.items()}
+    order = np.lexsort((~arrays["is_call"], arrays["strike"], arrays["expiration"]))
+    arrays = {name: np.ascontiguousarray(values[order]) for name, values in arrays.items()}
+    n_rows = len(order)
+
+    expirations = arrays["expiration"]
+    bounds = np.concatenate(([0], np.nonzero(expirations[1:] != expirations[:-1])[0] + 1, [n_rows])) if n_rows else np.array([0])
+    expiries = [[str(expirations[start]), int(start), int(stop)] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    # Offsets are relative to the data section, which itself starts on an aligned boundary.
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        layout[name] = {"dtype": values.dtype.str, "offset": offset}
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    header = {
+        "version": 1, "ticker": ticker.upper(), "as_of": as_of, "source": source,
+        "rows": n_rows, "columns": layout, "expiries": expiries,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    data_start = -(-(_PREFIX.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+    header_bytes = header_bytes.ljust(data_start - _PREFIX.size)
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChainSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Column accessors return `numpy.memmap` slices, so selecting one expiry or a
+    strike band only pages in those rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, header_size = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a chain snapshot")
+            self.header = json.loads(f.read(header_size))
+        self._data_start = _PREFIX.size + header_size
+        self._columns: dict = {}
+
+    @property
+    def ticker(self) -> str:
+        return self.header["ticker"]
+
+    @property
+    def as_of(self) -> str:
+        return self.header["as_of"]
+
+    @property
+    def rows(self) -> int:
+        return self.header["rows"]
+
+    @property
+    def expiries(self) -> list:
+        return [expiry for expiry, _, _ in self.header["expiries"]]
+
+    @property
+    def column_names(self) -> list:
+        return list(self.header["columns"])
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole column as a read-only memmap (no data is read until it is indexed)."""
+        if name not in self._columns:
+            spec = self.header["columns"][name]
+            if self.rows == 0:
+                self._columns[name] = np.empty(0, dtype=spec["dtype"])
+            else:
+                self._columns[name] = np.memmap(
+                    self.path, dtype=spec["dtype"], mode="r", offset=self._data_start + spec["offset"], shape=(self.rows,)
+                )
+        return self._columns[name]
+
+    def expiry_rows(self, expiration: str) -> slice:
+        for expiry, start, stop in self.header["expiries"]:
+            if expiry == expiration:
+                return slice(start, stop)
+        return slice(0, 0)
+
+    def row_ranges(
+        self,
+        expirations: Optional[Iterable[str]] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+    ) -> list:
+        """Contiguous row slices for the given expiries (all when omitted) and strike band."""
+        wanted = None if expirations is None else set(expirations)
+        strikes = self.column("strike")
+        ranges = []
+        for expiry, start, stop in self.header["expiries"]:
+            if wanted is not None and expiry not in wanted:
+                continue
+            # Rows within an expiry are sorted by strike, so the band is a binary search away.
+            if strike_min is not None:
+                start += int(np.searchsorted(strikes[start:stop], strike_min, side="left"))
+            if strike_max is not None:
+                stop = start + int(np.searchsorted(strikes[start:stop], strike_max, side="right"))
+            if stop > start:
+                ranges.append(slice(start, stop))
+        return ranges
+
+    def select(
+        self,
+        expirations: Optional[Iterable[str]] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> dict:
+        """
+        Columns for the selected rows.
+
+        A selection that is one contiguous range (e.g. one expiry) is returned as
+        memmap views without copying; otherwise the ranges are concatenated.
+
+        Returns:
+            dict: Column name to array
+        """
+        names = list(columns or self.column_names)
+        ranges = self.row_ranges(expirations, strike_min, strike_max)
+        if len(ranges) == 1:
+            return {name: self.column(name)[ranges[0]] for name in names}
+        if not ranges:
+            return {name: np.empty(0, dtype=self.header["columns"][name]["dtype"]) for name in names}
+        return {name: np.concatenate([self.column(name)[r] for r in ranges]) for name in names}
+
+    def to_chain(
+        self,
+        spot: float,
+        expirations: Optional[Iterable[str]] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+        underlying: Optional[str] = None,
+        price_column: str = "ask",
+    ) -> dict:
+        """
+        Columnar chain for `services.chain_analytics.analyze_chain`, as `contracts_to_arrays` builds it.
+
+        Args:
+            spot (float): Underlying price for every row
+            expirations (Iterable[str]): Expiries to include, defaults to all
+            strike_min (float): Lowest strike, inclusive
+            strike_max (float): Highest strike, inclusive
+            underlying (str): Underlying symbol, defaults to the snapshot's ticker
+            price_column (str): Column used as the option price
+
+        Returns:
+            dict: Column name to numpy array
+        """
+        selected = self.select(expirations, strike_min, strike_max, columns=("expiration", "strike", "is_call", price_column))
+        n_rows = len(selected["strike"])
+        expiration = np.asarray(selected["expiration"])
+        return {
+            "underlying": np.full(n_rows, underlying or self.ticker),
+            "expiration": expiration,
+            "spot": np.full(n_rows, float(spot)),
+            "strike": np.asarray(selected["strike"], dtype=float),
+            "time_to_expiry": calendar_for(underlying or self.ticker).year_fraction(expiration, self.as_of),
+            "price": np.nan_to_num(np.asarray(selected[price_column], dtype=float), nan=0.0),
+            "is_call": np.asarray(selected["is_call"], dtype=bool),
+        }
+
+    def to_contracts(
+        self,
+        expirations: Optional[Iterable[str]] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+    ) -> list:
+        """Selected rows as Dolthub-style contract dicts, for code that still takes lists of rows."""
+        return columns_to_contracts(self.select(expirations, strike_min, strike_max), self.ticker, self.as_of)
+
+
+def columns_to_contracts(columns: dict, ticker: str, as_of: str) -> list:
+    """Snapshot-layout columns as Dolthub-style contract dicts."""
+    extra = [name for name in columns if name not in ("expiration", "strike", "is_call")]
+    expiration = np.asarray(columns["expiration"]).astype(str)
+    call_put = np.where(np.asarray(columns["is_call"]), "Call", "Put")
+    values = {name: np.asarray(columns[name]).tolist() for name in extra}
+    strikes = np.asarray(columns["strike"]).tolist()
+    return [
+        {
+            "date": as_of, "act_symbol": ticker, "expiration": expiration[i], "strike": strikes[i],
+            "call_put": call_put[i], **{name: values[name][i] for name in extra},
+        }
+        for i in range(len(strikes))
+    ]
+
+
+def open_snapshot(ticker: str, as_of: str, root: str = SNAPSHOT_DIR) -> Optional[ChainSnapshot]:
+    """Open the snapshot for (ticker, as_of) if one has been written."""
+    path = snapshot_path(ticker, as_of, root)
+    return ChainSnapshot(path) if os.path.exists(path) else None
+
+
+def index_path(ticker: str, root: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(root, ticker.upper(), INDEX_FILE)
+
+
+def index_entry(snapshot: ChainSnapshot) -> dict:
+    """Summary of one snapshot as stored in its ticker's index."""
+    expiries = snapshot.expiries
+    return {
+        "rows": snapshot.rows, "expiries": len(expiries),
+        "first_expiry": expiries[0] if expiries else None, "last_expiry": expiries[-1] if expiries else None,
+        "source": snapshot.header.get("source", ""),
+    }
+
+
+def read_index(ticker: str, root: str = SNAPSHOT_DIR) -> dict:
+    """Date (YYYY-MM-DD) to `index_entry` for a ticker's snapshots; empty when the ticker has no index."""
+    path = index_path(ticker, root)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["dates"]
+
+
+def update_index(ticker: str, entries: dict, root: str = SNAPSHOT_DIR) -> str:
+    """Merge `entries` (date to `index_entry`) into a ticker's index, written atomically."""
+    dates = read_index(ticker, root)
+    dates.update(entries)
+    path = index_path(ticker, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"ticker": ticker.upper(), "dates": dict(sorted(dates.items()))}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def rebuild_index(ticker: str, root: str = SNAPSHOT_DIR) -> dict:
+    """Re-derive a ticker's index from the snapshot headers on disk (e.g. after API fetches wrote new days)."""
+    directory = os.path.join(root, ticker.upper())
+    if not os.path.isdir(directory):
+        return {}
+    entries = {
+        name[:-len(".chain")]: index_entry(ChainSnapshot(os.path.join(directory, name)))
+        for name in os.listdir(directory) if name.endswith(".chain")
+    }
+    path = index_path(ticker, root)
+    if os.path.exists(path):
+        os.remove(path)
+    update_index(ticker, entries, root)
+    return entries
+
+
+def snapshot_dates(ticker: str, start: Optional[str] = None, end: Optional[str] = None, root: str = SNAPSHOT_DIR) -> list:
+    """Indexed snapshot dates for a ticker within [start, end], in order."""
+    return [date for date in read_index(ticker, root) if (not start or date >= start) and (not end or date <= end)]
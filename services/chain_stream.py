@@ -0,0 +1,282 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+# Bytes read from the HTTP body per step.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Optional Dolthub columns carried into the snapshot layout (see services.chain_snapshot.COLUMN_DTYPES).
+DOLTHUB_EXTRA_COLUMNS = ("vol", "delta", "gamma", "theta", "vega", "rho")
+
+# Market Data response arrays kept, with the snapshot column each one fills; every other array is skipped.
+MARKET_DATA_COLUMNS = {
+    "expiration": "expiration", "strike": "strike", "side": "is_call", "bid": "bid", "ask": "ask",
+    "iv": "vol", "delta": "delta", "gamma": "gamma", "theta": "theta", "vega": "vega", "rho": "rho",
+    "openInterest": "open_interest", "volume": "volume",
+}
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = re.compile(r"[0-9.eE+\-]*")
+_decoder = json.JSONDecoder()
+_MISSING = object()
+
+
+def scan_json(chunks: Iterable[bytes]) -> Iterator[tuple]:
+    """
+    Incrementally scan a JSON object whose members are scalars or arrays, e.g. an HTTP body stream.
+
+    Only one array element (or scalar member) is decoded at a time, with the C
+    decoder, and the text buffer holds roughly one chunk, so memory does not grow
+    with the document.
+
+    Args:
+        chunks (Iterable[bytes]): Body chunks, e.g. `response.iter_content(STREAM_CHUNK_SIZE)`
+
+    Yields:
+        tuple: ('value', key, value) for scalar and object members, ('item', key, element)
+            for each element of an array member and ('end', key, None) when the array closes
+    """
+    chunks = iter(chunks)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = next(chunks, None)
+        eof = chunk is None
+        buffer = buffer[pos:] + utf8.decode(chunk or b"", final=eof)
+        pos = 0
+        return True
+
+    def decode():
+        nonlocal pos
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if not fill():
+                raise
+            return _MISSING
+        # A number running to the end of the buffer may continue in the next chunk ("0." + "25")
+        if not eof and _NUMBER_CHARS.fullmatch(buffer, end):
+            fill()
+            return _MISSING
+        pos = end
+        return value
+
+    state, key = "start", None
+    while state != "done":
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if not fill():
+                raise ValueError("Truncated JSON document")
+            continue
+        char = buffer[pos]
+        if state == "start":
+            if char != "{":
+                raise ValueError(f"Expected a JSON object, got {char!r}")
+            pos, state = pos + 1, "key"
+        elif state == "key":
+            if char == "}":
+                state = "done"
+            elif char == ",":
+                pos += 1
+            else:
+                value = decode()
+                if value is not _MISSING:
+                    key, state = value, "colon"
+        elif state == "colon":
+            if char != ":":
+                raise ValueError(f"Expected ':' after {key!r}")
+            pos, state = pos + 1, "value"
+        elif state == "value":
+            if char == "[":
+                pos, state = pos + 1, "array"
+            else:
+                value = decode()
+                if value is not _MISSING:
+                    state = "key"
+                    yield "value", key, value
+        elif state == "array":
+            if char == "]":
+                pos, state = pos + 1, "key"
+                yield "end", key, None
+            elif char == ",":
+                pos += 1
+            else:
+                value = decode()
+                if value is not _MISSING:
+                    yield "item", key, value
+
+
+class ColumnBuffer:
+    """Growable typed array; appends amortize to O(1) without per-value Python objects."""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value) -> None:
+        if self._size == len(self._data):
+            grown = np.empty(2 * len(self._data), dtype=self._data.dtype)
+            grown[:self._size] = self._data
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def values(self) -> np.ndarray:
+        return self._data[:self._size].copy()
+
+    def clear(self) -> None:
+        self._size = 0
+
+
+def _float(value) -> float:
+    return np.nan if value in (None, "") else float(value)
+
+
+class ExpiryColumns:
+    """
+    Typed per-expiry column buffers for contract rows that arrive sorted by expiration.
+
+    Rows outside the expiry range or strike band are dropped before they are
+    stored. `add_dolthub_row` hands back an expiry's columns (snapshot layout, see
+    services.chain_snapshot) as soon as a row from a later expiry arrives.
+    """
+
+    def __init__(
+        self,
+        expiry_from: Optional[str] = None,
+        expiry_to: Optional[str] = None,
+        strike_min: Optional[float] = None,
+        strike_max: Optional[float] = None,
+    ):
+        self.expiry_from, self.expiry_to = expiry_from, expiry_to
+        self.strike_min = -np.inf if strike_min is None else strike_min
+        self.strike_max = np.inf if strike_max is None else strike_max
+        self.expiration: Optional[str] = None
+        self.buffers = {"strike": ColumnBuffer(float), "is_call": ColumnBuffer(bool), "bid": ColumnBuffer(float), "ask": ColumnBuffer(float)}
+        self.rows_seen = self.rows_kept = 0
+
+    def add_dolthub_row(self, row: dict) -> Optional[dict]:
+        """Add one Dolthub `option_chain` row (string fields). Returns the previous expiry's columns when it completes."""
+        self.rows_seen += 1
+        expiration = row["expiration"]
+        if (self.expiry_from and expiration < self.expiry_from) or (self.expiry_to and expiration > self.expiry_to):
+            return None
+        strike = float(row["strike"])
+        if not self.strike_min <= strike <= self.strike_max:
+            return None
+
+        finished = self.flush() if expiration != self.expiration else None
+        if self.expiration is None:
+            self.expiration = expiration
+            for name in DOLTHUB_EXTRA_COLUMNS:
+                if name in row and name not in self.buffers:
+                    self.buffers[name] = ColumnBuffer(float)
+        buffers = self.buffers
+        buffers["strike"].append(strike)
+        buffers["is_call"].append(row["call_put"].lower() == "call")
+        buffers["bid"].append(_float(row.get("bid")))
+        buffers["ask"].append(_float(row.get("ask")))
+        for name in DOLTHUB_EXTRA_COLUMNS:
+            if name in buffers:
+                buffers[name].append(_float(row.get(name)))
+        self.rows_kept += 1
+        return finished
+
+    def flush(self) -> Optional[dict]:
+        """Columns of the expiry being built (None if empty), leaving the buffers ready for the next."""
+        if self.expiration is None or not len(self.buffers["strike"]):
+            return None
+        columns = {name: buffer.values() for name, buffer in self.buffers.items()}
+        columns["expiration"] = np.full(len(columns["strike"]), np.datetime64(self.expiration, "D"))
+        for buffer in self.buffers.values():
+            buffer.clear()
+        self.expiration = None
+        return columns
+
+
+def dolthub_expiries(events: Iterable[tuple], builder: ExpiryColumns, meta: Optional[dict] = None) -> Iterator[dict]:
+    """
+    Per-expiry columns from a scanned Dolthub SQL API response, as each expiry completes.
+
+    The last expiry stays in `builder` (a later page may continue it); call `builder.flush()` at the end.
+    Top-level scalars (query_execution_status, ...) are recorded in `meta`.
+    """
+    for event, key, value in events:
+        if event == "item" and key == "rows":
+            finished = builder.add_dolthub_row(value)
+            if finished is not None:
+                yield finished
+        elif event == "value" and meta is not None:
+            meta[key] = value
+
+
+def market_data_expiries(
+    events: Iterable[tuple],
+    expiry_from: Optional[str] = None,
+    expiry_to: Optional[str] = None,
+    strike_min: Optional[float] = None,
+    strike_max: Optional[float] = None,
+    meta: Optional[dict] = None,
+) -> Iterator[dict]:
+    """
+    Per-expiry columns from a scanned Market Data `options/chain` response.
+
+    The response is columnar (one array per field), so expiries can only be
+    split once every array has arrived; until then values go straight into
+    typed buffers and unused arrays (option symbols, timestamps, ...) are skipped.
+    """
+    buffers: dict = {}
+    for event, key, value in events:
+        if event == "item":
+            column = MARKET_DATA_COLUMNS.get(key)
+            if column is None:
+                continue
+            if column not in buffers:
+                buffers[column] = ColumnBuffer(np.int64 if column == "expiration" else bool if column == "is_call" else float)
+            if column == "is_call":
+                buffers[column].append(value.lower() == "call")
+            elif column == "expiration":
+                buffers[column].append(value)
+            else:
+                buffers[column].append(np.nan if value is None else value)
+        elif event == "value" and meta is not None:
+            meta[key] = value
+    if "expiration" not in buffers or not len(buffers["expiration"]):
+        return
+
+    columns = {name: buffer.values() for name, buffer in buffers.items()}
+    columns["expiration"] = (columns["expiration"] // 86400).astype("datetime64[D]")
+    keep = np.ones(len(columns["expiration"]), dtype=bool)
+    if expiry_from:
+        keep &= columns["expiration"] >= np.datetime64(expiry_from, "D")
+    if expiry_to:
+        keep &= columns["expiration"] <= np.datetime64(expiry_to, "D")
+    if strike_min is not None:
+        keep &= columns["strike"] >= strike_min
+    if strike_max is not None:
+        keep &= columns["strike"] <= strike_max
+    order = np.nonzero(keep)[0]
+    order = order[np.lexsort((columns["is_call"][order], columns["strike"][order], columns["expiration"][order]))]
+    columns = {name: values[order] for name, values in columns.items()}
+    bounds = np.concatenate(([0], np.nonzero(columns["expiration"][1:] != columns["expiration"][:-1])[0] + 1, [len(order)]))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if stop > start:
+            yield {name: values[start:stop] for name, values in columns.items()}
+
+
+def concat_expiries(expiries: Iterable[dict]) -> dict:
+    """Join per-expiry columns into one chain (empty dict when there are none)."""
+    expiries = list(expiries)
+    if not expiries:
+        return {}
+    return {name: np.concatenate([expiry[name] for expiry in expiries]) for name in expiries[0]}
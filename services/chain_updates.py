@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from services.chain_analytics import analyze_chain, contracts_to_arrays
+from services.condor_candidates import build_candidates
+from services.options_pricing import black_scholes_greeks, model_for_underlying
+
+# Spot move (relative) beyond which every contract is re-solved.
+SPOT_THRESHOLD = float(os.getenv("CHAIN_SPOT_THRESHOLD", 0.002))
+# Quote change (absolute, in option price units) below which a contract keeps its last IV and greeks.
+PRICE_TOLERANCE = float(os.getenv("CHAIN_PRICE_TOLERANCE", 0.005))
+# Time decay tolerated before a contract is re-solved at the new time to expiry.
+TIME_TOLERANCE = float(os.getenv("CHAIN_TIME_TOLERANCE_MINUTES", 30)) / (365 * 24 * 60)
+
+GREEKS = ("delta", "gamma", "vega", "theta")
+_SOLVED_COLUMNS = ("implied_volatility", *GREEKS, "solved_price", "solved_spot", "solved_time_to_expiry")
+
+
+def contract_keys(expiration: np.ndarray, strike: np.ndarray, is_call: np.ndarray) -> np.ndarray:
+    """One int64 per contract: expiry day, strike in thousandths and the call/put bit."""
+    days = expiration.astype("datetime64[D]").astype(np.int64)
+    return (days << 40) | (np.round(strike * 1000).astype(np.int64) << 1) | is_call.astype(np.int64)
+
+
+class ChainUpdater:
+    """
+    Keeps one underlying's chain solved across refreshes, re-solving only what changed.
+
+    Each refresh is matched to the previous one by contract key. A contract is
+    re-solved (IV and greeks) when it is new, its price moved more than
+    `price_tolerance` since it was last solved, its time to expiry decayed more
+    than `time_tolerance`, or spot moved more than `spot_threshold` since then;
+    a spot move past the threshold therefore re-solves the whole chain. Other
+    contracts keep their last IV and greeks. Condor candidates are re-scored
+    only when quotes on their expiry changed.
+    """
+
+    def __init__(
+        self,
+        underlying: str,
+        risk_free_rate: float = 0.0398,
+        spot_threshold: float = SPOT_THRESHOLD,
+        price_tolerance: float = PRICE_TOLERANCE,
+        time_tolerance: float = TIME_TOLERANCE,
+        model: Optional[str] = None,
+        workers: Optional[int] = None,
+    ):
+        self.underlying = underlying
+        self.risk_free_rate = risk_free_rate
+        self.spot_threshold = spot_threshold
+        self.price_tolerance = price_tolerance
+        self.time_tolerance = time_tolerance
+        self.model = model
+        self.workers = workers
+        self.rows: Optional[dict] = None
+        self.contracts: list = []
+        self.spot: Optional[float] = None
+        self.candidates: list = []
+        self.candidate_spot: Optional[float] = None
+        self.totals = {"updates": 0, "contracts": 0, "recomputed": 0}
+        self._lock = threading.Lock()
+
+    def update(self, contracts: list, spot: float, as_of: datetime) -> dict:
+        """
+        Apply a fresh chain snapshot.
+
+        Args:
+            contracts (list): Dolthub-style rows with 'strike', 'call_put', 'expiration', 'bid' and 'ask'
+            spot (float): Underlying price, in the chain's strike terms
+            as_of (datetime): Snapshot time
+
+        Returns:
+            dict: Counts of contracts, recomputed, added and removed ones, whether the whole chain
+                was re-solved and whether candidates were re-scored, and the update time
+        """
+        started = time.perf_counter()
+        with self._lock:
+            new = contracts_to_arrays(contracts, spot, as_of, self.underlying)
+            new["bid"] = np.array([float(c.get("bid") or 0) for c in contracts])
+            keys, first = np.unique(contract_keys(new["expiration"], new["strike"], new["is_call"]), return_index=True)
+            new = {name: values[first] for name, values in new.items()}
+            new["key"] = keys
+            contracts = [contracts[i] for i in first]
+            n = len(keys)
+
+            old = self.rows
+            if old is None or not len(old["key"]):
+                found = np.zeros(n, dtype=bool)
+                match = np.zeros(n, dtype=np.int64)
+                removed_keys = np.empty(0, dtype=np.int64)
+            else:
+                match = np.minimum(np.searchsorted(old["key"], keys), len(old["key"]) - 1)
+                found = old["key"][match] == keys
+                removed_keys = np.setdiff1d(old["key"], keys, assume_unique=True)
+
+            for name in _SOLVED_COLUMNS:
+                new[name] = np.where(found, old[name][match], np.nan) if old is not None and len(old["key"]) else np.full(n, np.nan)
+
+            with np.errstate(invalid="ignore"):
+                dirty = (
+                    ~found
+                    | ~(np.abs(new["price"] - new["solved_price"]) <= self.price_tolerance)
+                    | ~(np.abs(spot / new["solved_spot"] - 1) <= self.spot_threshold)
+                    | ~(np.abs(new["time_to_expiry"] - new["solved_time_to_expiry"]) <= self.time_tolerance)
+                )
+            rows = np.nonzero(dirty)[0]
+            self._solve(new, rows)
+
+            rescored = self._rescore(new, old, found, match, removed_keys, contracts, spot)
+            self.rows, self.contracts, self.spot = new, contracts, float(spot)
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.totals["updates"] += 1
+            self.totals["contracts"] += n
+            self.totals["recomputed"] += len(rows)
+            return {
+                "underlying": self.underlying, "contracts": n, "recomputed": int(len(rows)),
+                "added": int((~found).sum()), "removed": int(len(removed_keys)),
+                "full": bool(len(rows) == n), "candidates_rescored": rescored, "update_ms": round(elapsed, 3),
+            }
+
+    def _solve(self, chain: dict, rows: np.ndarray) -> None:
+        """Re-solve IV and greeks for `rows` of `chain` in place and stamp their solve inputs."""
+        if not len(rows):
+            return
+        priced = rows[(chain["price"][rows] > 0) & (chain["strike"][rows] > 0) & (chain["time_to_expiry"][rows] > 0)]
+        iv = np.full(len(chain["key"]), np.nan)
+        if len(priced):
+            subset = {name: chain[name][priced] for name in ("underlying", "expiration", "spot", "strike", "time_to_expiry", "price", "is_call")}
+            subset["row"] = priced
+            solved = analyze_chain(subset, self.risk_free_rate, self.workers, model=self.model)
+            iv[solved["row"]] = solved["implied_volatility"]
+        iv = iv[rows]
+        greeks = black_scholes_greeks(
+            chain["spot"][rows], chain["strike"][rows], chain["time_to_expiry"][rows],
+            self.risk_free_rate, np.where(np.isfinite(iv), iv, 1.0), chain["is_call"][rows],
+        )
+        chain["implied_volatility"][rows] = iv
+        for name in GREEKS:
+            chain[name][rows] = np.where(np.isfinite(iv), greeks[name], np.nan)
+        chain["solved_price"][rows] = chain["price"][rows]
+        chain["solved_spot"][rows] = chain["spot"][rows]
+        chain["solved_time_to_expiry"][rows] = chain["time_to_expiry"][rows]
+
+    def _rescore(self, new: dict, old: Optional[dict], found: np.ndarray, match: np.ndarray, removed_keys: np.ndarray, contracts: list, spot: float) -> bool:
+        """Rebuild the condor candidates if their expiry's quotes, its listed strikes or spot moved."""
+        expiration = self.candidates[0]["expiration"] if self.candidates else None
+        if expiration is not None and old is not None and abs(spot / self.candidate_spot - 1) <= self.spot_threshold:
+            day = np.datetime64(expiration, "D")
+            on_expiry = new["expiration"] == day
+            quotes_moved = ~found | (np.abs(new["bid"] - old["bid"][match]) > self.price_tolerance) | (np.abs(new["price"] - old["price"][match]) > self.price_tolerance)
+            removed = (removed_keys >> 40) == day.astype(np.int64)
+            if on_expiry.any() and not (quotes_moved & on_expiry).any() and not removed.any():
+                return False
+        self.candidates = build_candidates(contracts, spot) if contracts else []
+        self.candidate_spot = spot
+        return True
+
+    def chain(self) -> dict:
+        """Copy of the current columnar chain, sorted by contract key."""
+        with self._lock:
+            return {name: values.copy() for name, values in (self.rows or {}).items()}
+
+    def contracts_with_iv(self) -> list:
+        """Current contracts with 'implied_volatility' and greeks, as `calculate_iv_for_contracts` returns them."""
+        with self._lock:
+            if self.rows is None:
+                return []
+            solved = np.nonzero(np.isfinite(self.rows["implied_volatility"]))[0]
+            columns = {name: self.rows[name][solved].tolist() for name in ("implied_volatility", *GREEKS)}
+            return [
+                {**self.contracts[row], **{name: values[i] for name, values in columns.items()}}
+                for i, row in enumerate(solved)
+            ]
+
+    def stats(self) -> dict:
+        """Cumulative updates, contracts seen and contracts re-solved."""
+        with self._lock:
+            share = self.totals["recomputed"] / self.totals["contracts"] if self.totals["contracts"] else 0.0
+            return {**self.totals, "recomputed_share": round(share, 4), "contracts_now": len(self.contracts)}
+
+
+_updaters: dict = {}
+_updaters_lock = threading.Lock()
+
+
+def get_chain_updater(underlying: str, model: Optional[str] = None, **kwargs) -> ChainUpdater:
+    """Process-wide ChainUpdater per (underlying, pricing model), created on first use with `kwargs`."""
+    key = (underlying, model or model_for_underlying(underlying))
+    with _updaters_lock:
+        if key not in _updaters:
+            _updaters[key] = ChainUpdater(underlying, model=model, **kwargs)
+        return _updaters[key]
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, Optional
+
+import numpy as np
+from pydantic import ValidationError
+
+from models.model_strategy_request import StrategyRequest, STRATEGIES
+from services.market_data_provider import market_data, ProviderError
+from services.options_pricing import PRICING_MODELS, get_pricing_model
+from services.pricing_cache import strategy_cache, snap
+from services.rate_limiter import TokenBucket
+
+# Requests arriving within this window are priced together.
+BATCH_WINDOW = float(os.getenv("XMTP_BATCH_WINDOW_MS", 25)) / 1000
+MAX_BATCH = int(os.getenv("XMTP_MAX_BATCH", 4096))
+# Accepted-but-unpriced requests; beyond this, new requests are answered "busy" instead of queued.
+QUEUE_SIZE = int(os.getenv("XMTP_QUEUE_SIZE", 20000))
+# Per-sender allowance: sustained requests per second and burst.
+SENDER_RATE = float(os.getenv("XMTP_SENDER_RATE", 1.0))
+SENDER_BURST = float(os.getenv("XMTP_SENDER_BURST", 5))
+# Replies in flight on the network at once.
+REPLY_CONCURRENCY = int(os.getenv("XMTP_REPLY_CONCURRENCY", 256))
+
+# Same inputs as POST /execute_strategy, so both share the strategy cache.
+RISK_FREE_RATE = 0.01
+UNDERLYING = "ETH"
+
+USAGE = (
+    "Send a strategy as `long_straddle strike=3000 expiry=0.25 vol=0.6 [futures=3050] [model=binomial_lr]` "
+    "or as JSON with the /execute_strategy fields; a futures price prices with Black-76. "
+    f"Strategies: {', '.join(STRATEGIES)}."
+)
+
+_FIELD_ALIASES = {
+    "strike": "strike_price", "k": "strike_price",
+    "expiry": "time_to_expiry", "t": "time_to_expiry", "tte": "time_to_expiry",
+    "vol": "volatility", "iv": "volatility", "sigma": "volatility",
+    "model": "pricing_model",
+    "futures": "futures_price", "fut": "futures_price",
+}
+
+
+class XmtpMessage(NamedTuple):
+    conversation_id: str
+    sender: str
+    content: str
+    sent_at: float
+
+
+class XmtpTransport(ABC):
+    """Inbound message stream and outbound replies for the bot; one implementation per network."""
+
+    @abstractmethod
+    def messages(self) -> AsyncIterator[XmtpMessage]:
+        pass
+
+    @abstractmethod
+    async def send(self, conversation_id: str, content: str) -> None:
+        pass
+
+
+class LocalXmtpNetwork(XmtpTransport):
+    """
+    In-process stand-in for the XMTP network, for tests and offline load runs.
+
+    Clients `post` into the bot's inbox and `wait_reply` for answers; the bot
+    side consumes `messages()` and answers through `send`. `close` ends the stream.
+    """
+
+    def __init__(self, inbox_size: int = 0):
+        self._inbox: asyncio.Queue = asyncio.Queue(inbox_size)
+        self.replies: dict = defaultdict(list)
+        self._waiters: dict = defaultdict(list)
+
+    async def post(self, conversation_id: str, sender: str, content: str) -> None:
+        await self._inbox.put(XmtpMessage(conversation_id, sender, content, time.monotonic()))
+
+    async def close(self) -> None:
+        await self._inbox.put(None)
+
+    async def messages(self) -> AsyncIterator[XmtpMessage]:
+        while True:
+            message = await self._inbox.get()
+            if message is None:
+                return
+            yield message
+
+    async def send(self, conversation_id: str, content: str) -> None:
+        self.replies[conversation_id].append(content)
+        for waiter in self._waiters.pop(conversation_id, []):
+            if not waiter.done():
+                waiter.set_result(content)
+
+    async def wait_reply(self, conversation_id: str, timeout: Optional[float] = None) -> str:
+        """Next reply on a conversation (or the first one already received)."""
+        if self.replies[conversation_id]:
+            return self.replies[conversation_id][0]
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[conversation_id].append(waiter)
+        return await asyncio.wait_for(waiter, timeout)
+
+
+def parse_strategy_request(content: str) -> StrategyRequest:
+    """
+    Parse a chat message into a StrategyRequest.
+
+    Accepts JSON with the StrategyRequest fields, or `<strategy> key=value ...`
+    with short names (strike, expiry, vol, model).
+
+    Raises:
+        ValueError: Unparseable message, unknown strategy or pricing model, or a strike,
+            expiry or vol that is not positive
+    """
+    content = content.strip()
+    if not content:
+        raise ValueError("Empty message")
+    try:
+        if content.startswith("{"):
+            request = StrategyRequest.model_validate_json(content)
+        else:
+            words = content.split()
+            if words[0].lower() not in STRATEGIES:
+                raise ValueError(f"Unknown strategy {words[0]!r}")
+            fields = {"strategy": words[0].lower()}
+            for word in words[1:]:
+                key, _, value = word.partition("=")
+                if not value:
+                    raise ValueError(f"Expected key=value, got {word!r}")
+                key = key.lower()
+                fields[_FIELD_ALIASES.get(key, key)] = value
+            request = StrategyRequest(**fields)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, error['loc'])) or 'message'}: {error['msg']}" for error in e.errors())) from None
+    if request.strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {request.strategy!r}")
+    if request.pricing_model and request.pricing_model not in PRICING_MODELS:
+        raise ValueError(f"Unknown pricing model {request.pricing_model!r}")
+    return request
+
+
+def price_batch(requests: list, spot: float, risk_free_rate: float = RISK_FREE_RATE) -> list:
+    """
+    Price many strategy requests with one vectorized call per pricing model.
+
+    Requests that quantize to the same inputs (services.pricing_cache) are priced
+    once, and results already in the strategy cache are reused; every result
+    equals what POST /execute_strategy returns for the same request.
+
+    Returns:
+        list: One `execute_strategy` result dict per request
+    """
+    strategies = [
+        STRATEGIES[r.strategy](
+            underlying_price=spot, strike_price=r.strike_price, time_to_expiry=r.time_to_expiry,
+            risk_free_rate=risk_free_rate, volatility=r.volatility, underlying=UNDERLYING, pricing_model=r.pricing_model,
+            futures_price=r.futures_price,
+        )
+        for r in requests
+    ]
+    keys = [strategy.cache_key() for strategy in strategies]
+    results = {}
+    pending = {}
+    for key, strategy in zip(keys, strategies):
+        if key in results or key in pending:
+            continue
+        cached = strategy_cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        # Priced at the snapped inputs, like execute_cached
+        else:
+            pending[key] = type(strategy)(**{**strategy.model_dump(), **snap(strategy.pricing_inputs())})
+
+    # One row per (strategy, option type), grouped by model
+    groups: dict = defaultdict(list)
+    for key, strategy in pending.items():
+        for option_type in strategy.option_types:
+            groups[strategy.model_name()].append((key, option_type, strategy))
+    prices: dict = defaultdict(dict)
+    for model, rows in groups.items():
+        inputs = [strategy.pricing_inputs() for _, _, strategy in rows]
+        values = get_pricing_model(model)(
+            np.array([strategy.model_price(i) for i, (_, _, strategy) in zip(inputs, rows)]), np.array([i["strike_price"] for i in inputs]),
+            np.array([i["time_to_expiry"] for i in inputs]), inputs[0]["risk_free_rate"], np.array([i["volatility"] for i in inputs]),
+            np.array([option_type == "call" for _, option_type, _ in rows]),
+        )
+        for (key, option_type, _), value in zip(rows, np.atleast_1d(values).tolist()):
+            prices[key][option_type] = value
+
+    for key, strategy in pending.items():
+        results[key] = strategy.summarize(prices[key])
+        strategy_cache.put(key, results[key])
+    return [results[key] for key in keys]
+
+
+class StrategyBot:
+    """
+    Answers strategy queries from many conversations, pricing them in micro-batches.
+
+    Each message is rate-limited per sender and parsed on arrival, then queued;
+    the batch loop takes everything queued within `batch_window` (up to
+    `max_batch`), fetches spot once and prices the lot in one vectorized pass off
+    the event loop. Replies go out asynchronously with bounded concurrency.
+    When the queue is full new requests get an immediate "busy" reply, so a
+    burst degrades to fast refusals instead of unbounded latency.
+    """
+
+    def __init__(
+        self,
+        transport: XmtpTransport,
+        batch_window: float = BATCH_WINDOW,
+        max_batch: int = MAX_BATCH,
+        queue_size: int = QUEUE_SIZE,
+        sender_rate: float = SENDER_RATE,
+        sender_burst: float = SENDER_BURST,
+        spot_source: Optional[Callable[[], Awaitable[float]]] = None,
+    ):
+        self.transport = transport
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.sender_rate = sender_rate
+        self.sender_burst = sender_burst
+        self.spot_source = spot_source or (lambda: market_data.spot("ETH-USD"))
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._buckets: dict = {}
+        self._reply_slots = asyncio.Semaphore(REPLY_CONCURRENCY)
+        self._reply_tasks: set = set()
+        self.counters = dict.fromkeys(("received", "rate_limited", "invalid", "busy", "priced", "failed", "replied", "batches", "max_batch_size"), 0)
+        self._latencies: list = []
+
+    async def run(self) -> None:
+        """Serve until the transport's message stream ends, then drain queued requests and replies."""
+        batcher = asyncio.create_task(self._batch_loop())
+        try:
+            async for message in self.transport.messages():
+                self._accept(message)
+            await self._queue.join()
+        finally:
+            batcher.cancel()
+        if self._reply_tasks:
+            await asyncio.gather(*self._reply_tasks, return_exceptions=True)
+
+    # --- Intake -----------------------------------------------------------
+
+    def _accept(self, message: XmtpMessage) -> None:
+        self.counters["received"] += 1
+        now = time.monotonic()
+        bucket = self._buckets.get(message.sender)
+        if bucket is None:
+            bucket = self._buckets[message.sender] = TokenBucket(self.sender_rate, self.sender_burst)
+        if bucket.wait_time(now) > 0:
+            self.counters["rate_limited"] += 1
+            return self._reply(message, f"Rate limit: at most {self.sender_rate:g} requests per second, bursts of {self.sender_burst:g}.")
+        bucket.consume(now)
+
+        try:
+            request = parse_strategy_request(message.content)
+        except ValueError as e:
+            self.counters["invalid"] += 1
+            return self._reply(message, f"Could not read that request ({e}). {USAGE}")
+
+        try:
+            self._queue.put_nowait((message, request))
+        except asyncio.QueueFull:
+            self.counters["busy"] += 1
+            self._reply(message, "Busy pricing a burst of requests; please retry in a few seconds.")
+
+    def _prune_buckets(self) -> None:
+        """Forget senders whose allowance has fully refilled."""
+        now = time.monotonic()
+        for sender in [s for s, b in self._buckets.items() if b.wait_time(now) == 0 and b.tokens >= b.capacity]:
+            del self._buckets[sender]
+
+    # --- Batching ---------------------------------------------------------
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._process(batch)
+            except Exception as e:
+                print(f"XMTP batch of {len(batch)} failed: {e}")
+                self.counters["failed"] += len(batch)
+                for message, _ in batch:
+                    self._reply(message, "Pricing failed; please retry.")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(self._buckets) > 10 * self.max_batch:
+                self._prune_buckets()
+
+    async def _process(self, batch: list) -> None:
+        self.counters["batches"] += 1
+        self.counters["max_batch_size"] = max(self.counters["max_batch_size"], len(batch))
+        try:
+            spot = await self.spot_source()
+        except ProviderError as e:
+            self.counters["failed"] += len(batch)
+            for message, _ in batch:
+                self._reply(message, f"Market data unavailable ({e}); please retry.")
+            return
+        results = await asyncio.to_thread(price_batch, [request for _, request in batch], spot)
+        self.counters["priced"] += len(batch)
+        now = time.monotonic()
+        for (message, _), result in zip(batch, results):
+            self._latencies.append(now - message.sent_at)
+            self._reply(message, json.dumps({"underlying_price": spot, **result}))
+        del self._latencies[:-10000]
+
+    # --- Replies ----------------------------------------------------------
+
+    def _reply(self, message: XmtpMessage, content: str) -> None:
+        task = asyncio.create_task(self._send(message.conversation_id, content))
+        self._reply_tasks.add(task)
+        task.add_done_callback(self._reply_tasks.discard)
+
+    async def _send(self, conversation_id: str, content: str) -> None:
+        async with self._reply_slots:
+            try:
+                await self.transport.send(conversation_id, content)
+                self.counters["replied"] += 1
+            except Exception as e:
+                print(f"XMTP reply to {conversation_id} failed: {e}")
+
+    def stats(self) -> dict:
+        """Counters, queue depth and request-to-priced latency percentiles (seconds)."""
+        latency = {}
+        if self._latencies:
+            latency = {f"p{q}": round(float(np.percentile(self._latencies, q)), 4) for q in (50, 95, 99)}
+        return {**self.counters, "queued": self._queue.qsize(), "senders": len(self._buckets), "latency": latency}
+
+
+async def load_test(messages: int = 5000, senders: int = 2000, spot: float = 3000.0, **bot_options) -> dict:
+    """
+    Burst `messages` strategy queries from `senders` senders through a LocalXmtpNetwork.
+
+    Returns:
+        dict: Bot stats plus wall time and throughput
+    """
+    network = LocalXmtpNetwork()
+    bot = StrategyBot(network, spot_source=lambda: asyncio.sleep(0, result=spot), **bot_options)
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    serving = asyncio.create_task(bot.run())
+    for i in range(messages):
+        strategy = "long_straddle" if i % 2 else "long_put"
+        strike = 2500 + 50 * int(rng.integers(0, 20))
+        content = f"{strategy} strike={strike} expiry={rng.choice([0.05, 0.1, 0.25])} vol={rng.choice([0.5, 0.6, 0.7])}"
+        await network.post(f"conversation-{i}", f"sender-{i % senders}", content)
+    await network.close()
+    await serving
+    elapsed = time.perf_counter() - started
+    return {**bot.stats(), "seconds": round(elapsed, 3), "messages_per_second": round(messages / elapsed, 1)}
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(load_test()), indent=2))
@@ -0,0 +1,89 @@
+from typing import Optional
+
+
+def _quotes(contracts: list, expiration: str) -> dict:
+    """Index one expiry's contracts as {(call_put, strike): (bid, ask)}."""
+    quotes = {}
+    for contract in contracts:
+        if contract["expiration"] != expiration:
+            continue
+        bid = float(contract.get("bid") or 0)
+        ask = float(contract.get("ask") or 0)
+        quotes[(contract["call_put"].capitalize(), float(contract["strike"]))] = (bid, ask)
+    return quotes
+
+
+def nearest_expiration(contracts: list, as_of: Optional[str] = None) -> Optional[str]:
+    """Return the earliest expiration on or after `as_of` (any when omitted)."""
+    expirations = sorted({c["expiration"] for c in contracts if not as_of or c["expiration"] >= as_of})
+    return expirations[0] if expirations else None
+
+
+def score_condor(quotes: dict, outer_put: float, inner_put: float, inner_call: float, outer_call: float) -> Optional[dict]:
+    """
+    Price a short iron condor at the touch: sell the body at the bid, buy the wings at the ask.
+
+    Returns:
+        dict: Strikes with credit, max_loss and score (credit / max_loss), or None if a leg is unquoted
+    """
+    legs = [("Put", outer_put), ("Put", inner_put), ("Call", inner_call), ("Call", outer_call)]
+    if any(leg not in quotes for leg in legs):
+        return None
+    credit = quotes[legs[1]][0] + quotes[legs[2]][0] - quotes[legs[0]][1] - quotes[legs[3]][1]
+    max_loss = max(inner_put - outer_put, outer_call - inner_call) - credit
+    if credit <= 0 or max_loss <= 0:
+        return None
+    return {
+        "outer_put": outer_put, "inner_put": inner_put, "inner_call": inner_call, "outer_call": outer_call,
+        "credit": round(credit, 4), "max_loss": round(max_loss, 4), "score": round(credit / max_loss, 4),
+    }
+
+
+def build_candidates(
+    contracts: list,
+    spot: float,
+    expiration: Optional[str] = None,
+    body_strikes: int = 4,
+    wing_steps: tuple = (1, 2),
+    limit: int = 10,
+) -> list:
+    """
+    Enumerate short iron condors on one expiry that satisfy the analyst rules and rank them.
+
+    Inner puts are the `body_strikes` put strikes just below spot and inner
+    calls the call strikes just above it; wings sit `wing_steps` listed strikes
+    further out.
+
+    Args:
+        contracts (list): Chain rows with 'expiration', 'strike', 'call_put', 'bid' and 'ask'
+        spot (float): Underlying price
+        expiration (str): Expiry to use, defaults to the nearest one
+        body_strikes (int): Number of inner strikes to try on each side
+        wing_steps (tuple): Wing widths, in listed strikes
+        limit (int): Maximum candidates returned
+
+    Returns:
+        list: Candidate dicts (see `score_condor`) with 'expiration', best score first
+    """
+    expiration = expiration or nearest_expiration(contracts)
+    if not expiration:
+        return []
+    quotes = _quotes(contracts, expiration)
+    puts = sorted(strike for call_put, strike in quotes if call_put == "Put")
+    calls = sorted(strike for call_put, strike in quotes if call_put == "Call")
+    puts_below = [s for s in puts if s < spot][-body_strikes:]
+    calls_above = [s for s in calls if s > spot][:body_strikes]
+
+    candidates = []
+    for inner_put in puts_below:
+        for inner_call in calls_above:
+            for step in wing_steps:
+                put_index = puts.index(inner_put) - step
+                call_index = calls.index(inner_call) + step
+                if put_index < 0 or call_index >= len(calls):
+                    continue
+                candidate = score_condor(quotes, puts[put_index], inner_put, inner_call, calls[call_index])
+                if candidate:
+                    candidates.append({"expiration": expiration, **candidate})
+    candidates.sort(key=lambda c: c["score"], reverse=True)
+    return candidates[:limit]
@@ -0,0 +1,155 @@
+import re
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+_BLOCK_RE = re.compile(r"PROPOSAL(.*?)END_PROPOSAL", re.S | re.I)
+_FIELD_RE = re.compile(r"\b(outer|inner)[ _-]?(put|call)\b[^0-9\n]{0,25}?(\d+(?:\.\d+)?)", re.I)
+# Free text may mention the expiration between a field and its strike ("Inner put expiring 2019-02-15 at 165")
+_FREE_FIELD_RE = re.compile(
+    r"\b(outer|inner)[ _-]?(put|call)\b(?:[^0-9\n]|\d{4}-\d{2}-\d{2}){0,25}?(?!\d{4}-\d{2}-\d{2})(\d+(?:\.\d+)?)", re.I
+)
+_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+
+
+class CondorProposal(BaseModel):
+    expiration: str
+    outer_put: float
+    inner_put: float
+    inner_call: float
+    outer_call: float
+
+    def legs(self) -> list:
+        """Return (call_put, strike, action) for each leg of the short iron condor."""
+        return [
+            ("Put", self.outer_put, "BUY"),
+            ("Put", self.inner_put, "SELL"),
+            ("Call", self.inner_call, "SELL"),
+            ("Call", self.outer_call, "BUY"),
+        ]
+
+
+def parse_proposal(text: str) -> Optional[CondorProposal]:
+    """
+    Parse an analyst message into a CondorProposal.
+
+    Prefers the PROPOSAL ... END_PROPOSAL block requested by
+    `Prompts.proposal_format`, falling back to free text such as
+    "Inner put: 165" when the block is missing.
+
+    Returns:
+        CondorProposal: Parsed proposal, or None when any field is missing
+    """
+    if not text:
+        return None
+    block = _BLOCK_RE.search(text)
+    body = block.group(1) if block else text
+    field_re = _FIELD_RE if block else _FREE_FIELD_RE
+
+    strikes = {}
+    for side, option_type, strike in field_re.findall(body):
+        strikes.setdefault(f"{side.lower()}_{option_type.lower()}", float(strike))
+    date = _DATE_RE.search(body)
+    if not date or len(strikes) < 4:
+        return None
+    return CondorProposal(expiration=date.group(1), **strikes)
+
+
+def _nearest(strikes: list, target: float, count: int = 2) -> str:
+    """Format the `count` available strikes closest to target."""
+    closest = sorted(sorted(strikes, key=lambda s: abs(s - target))[:count])
+    return ", ".join(f"{s:.2f}" for s in closest)
+
+
+def validate_proposal(proposal: CondorProposal, contracts: list, spot: float) -> list:
+    """
+    Check a proposal against the chain and the iron condor rules in `Prompts.analyst_prompt`.
+
+    Args:
+        proposal (CondorProposal): Parsed analyst proposal
+        contracts (list): Chain rows with 'expiration', 'strike' and 'call_put'
+        spot (float): Underlying price the chain was quoted against
+
+    Returns:
+        list: Human-readable corrections; empty when the proposal is valid
+    """
+    expirations = sorted({c["expiration"] for c in contracts})
+    if proposal.expiration not in expirations:
+        return [f"Expiration {proposal.expiration} is not in the chain; available: {', '.join(expirations[:5])}"]
+
+    available = {"Call": [], "Put": []}
+    for contract in contracts:
+        if contract["expiration"] == proposal.expiration:
+            available[contract["call_put"].capitalize()].append(float(contract["strike"]))
+
+    errors = []
+    for call_put, strike, action in proposal.legs():
+        if strike not in available[call_put]:
+            errors.append(
+                f"No {call_put} at {strike:.2f} expiring {proposal.expiration} to {action}; "
+                f"nearest available: {_nearest(available[call_put], strike)}"
+            )
+
+    calls_above = [s for s in available["Call"] if s > spot]
+    puts_below = [s for s in available["Put"] if s < spot]
+    if proposal.inner_call <= spot:
+        errors.append(
+            f"Inner call {proposal.inner_call:.2f} must be above spot {spot:.2f}; "
+            f"nearest call strikes above spot: {_nearest(calls_above, spot)}"
+        )
+    if proposal.inner_put >= spot:
+        errors.append(
+            f"Inner put {proposal.inner_put:.2f} must be below spot {spot:.2f}; "
+            f"nearest put strikes below spot: {_nearest(puts_below, spot)}"
+        )
+    if proposal.inner_put == proposal.inner_call:
+        errors.append(f"Inner put and inner call cannot share the strike {proposal.inner_call:.2f}")
+    if proposal.outer_put >= proposal.inner_put:
+        errors.append(f"Outer put {proposal.outer_put:.2f} must be below inner put {proposal.inner_put:.2f}")
+    if proposal.outer_call <= proposal.inner_call:
+        errors.append(f"Outer call {proposal.outer_call:.2f} must be above inner call {proposal.inner_call:.2f}")
+    return errors
+
+
+def make_validation_reply(contracts: list, spot: float, analyst_name: str = "StockAnalyst") -> Callable:
+    """
+    Build an autogen reply function that validates the analyst's proposal in code.
+
+    Register it on the critic at `services.model_router.llm_reply_position(critic)`,
+    before the critic's model router is attached, so the critic's termination,
+    max_consecutive_auto_reply and human-input checks still run first.
+    It answers without an LLM call: precise corrections (REJECTED) when the
+    proposal breaks a rule, or APPROVED when it passes; `TurnPolicy` routes on
+    that prefix. Messages that are not analyst proposals fall through to the
+    critic's LLM.
+    """
+    def validation_reply(recipient, messages=None, sender=None, config=None):
+        if not messages or messages[-1].get("name") != analyst_name:
+            return False, None
+
+        proposal = parse_proposal(messages[-1].get("content") or "")
+        if proposal is None:
+            return True, f"REJECTED: could not read a complete proposal. Restate it exactly as:\n{proposal_block_example()}"
+
+        errors = validate_proposal(proposal, contracts, spot)
+        if errors:
+            corrections = "\n".join(f"- {error}" for error in errors)
+            return True, f"REJECTED: fix the following and resend the full proposal.\n{corrections}"
+
+        legs = "\n".join(f"{action} {call_put} {strike:.2f} exp {proposal.expiration}" for call_put, strike, action in proposal.legs())
+        return True, f"APPROVED: the proposal passes all chain and strike checks.\n{legs}"
+
+    return validation_reply
+
+
+def proposal_block_example() -> str:
+    """Return the machine-readable proposal block the analyst must emit."""
+    return (
+        "PROPOSAL\n"
+        "EXPIRATION: YYYY-MM-DD\n"
+        "OUTER_PUT: <strike>\n"
+        "INNER_PUT: <strike>\n"
+        "INNER_CALL: <strike>\n"
+        "OUTER_CALL: <strike>\n"
+        "END_PROPOSAL"
+    )
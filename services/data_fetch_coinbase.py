@@ -1,15 +1,12 @@
-import aiohttp
-from app.core.config import settings
+from services.rate_limiter import scheduler
 
 async def fetch_coinbase_price(asset_id: str) -> float:
     url = f"https://api.coinbase.com/v2/prices/{asset_id}/spot"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data = await response.json()
-            return float(data['data']['amount'])
+    response = await scheduler.arequest("coinbase", "GET", url)
+    data = response.json()
+    return float(data['data']['amount'])
 
 async def fetch_coinbase_historical_data(asset_id: str, start: str, end: str) -> dict:
     url = f"https://api.coinbase.com/v2/prices/{asset_id}/historic?start={start}&end={end}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            return await response.json()
\ No newline at end of file
+    response = await scheduler.arequest("coinbase", "GET", url)
+    return response.json()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+import requests
+
+from services.chain_stream import ExpiryColumns, dolthub_expiries, scan_json, STREAM_CHUNK_SIZE
+from services.rate_limiter import scheduler, BACKFILL
+
+DOLTHUB_URL = "https://www.dolthub.com/api/v1alpha1/post-no-preference/options/master"
+
+# Columns used by the IV / iron condor pipeline; pass `columns=` to widen the projection.
+CHAIN_COLUMNS = ("date", "act_symbol", "expiration", "strike", "call_put", "bid", "ask")
+
+# Dolthub caps a single SQL API response at 1000 rows.
+PAGE_SIZE = 1000
+
+_TICKER_RE = re.compile(r"^[A-Z0-9.\-]{1,10}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_COLUMN_RE = re.compile(r"^[a-z_]+$")
+
+_session = requests.Session()
+
+
+class DolthubError(Exception):
+    """A Dolthub SQL API page failed or the query returned an error."""
+
+
+def _quote(value: str, pattern: re.Pattern, name: str) -> str:
+    """Validate a literal against `pattern` and return it single-quoted for SQL."""
+    if not pattern.match(value):
+        raise ValueError(f"Invalid {name} for Dolthub query: {value!r}")
+    return f"'{value}'"
+
+
+def build_option_chain_query(
+    ticker: str,
+    date: str,
+    expiry_from: Optional[str] = None,
+    expiry_to: Optional[str] = None,
+    strike_min: Optional[float] = None,
+    strike_max: Optional[float] = None,
+    call_put: Optional[str] = None,
+    columns: Iterable[str] = CHAIN_COLUMNS,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> str:
+    """
+    Build a SQL query against the Dolthub `option_chain` table with all filters pushed down.
+
+    Args:
+        ticker (str): Underlying symbol (act_symbol)
+        date (str): Quote date, YYYY-MM-DD
+        expiry_from (str): Earliest expiration to include, inclusive
+        expiry_to (str): Latest expiration to include, inclusive
+        strike_min (float): Lowest strike to include, inclusive
+        strike_max (float): Highest strike to include, inclusive
+        call_put (str): 'call' or 'put'; both sides when omitted
+        columns (Iterable[str]): Columns to project
+        limit (int): Page size
+        offset (int): Page offset
+
+    Returns:
+        str: SQL query ordered by the table's primary key so pages are stable
+    """
+    columns = list(columns)
+    for column in columns:
+        if not _COLUMN_RE.match(column):
+            raise ValueError(f"Invalid column for Dolthub query: {column!r}")
+
+    conditions = [
+        f"act_symbol = {_quote(ticker.upper(), _TICKER_RE, 'ticker')}",
+        f"date = {_quote(date, _DATE_RE, 'date')}",
+    ]
+    if expiry_from:
+        conditions.append(f"expiration >= {_quote(expiry_from, _DATE_RE, 'expiry')}")
+    if expiry_to:
+        conditions.append(f"expiration <= {_quote(expiry_to, _DATE_RE, 'expiry')}")
+    if strike_min is not None:
+        conditions.append(f"strike >= {float(strike_min):.2f}")
+    if strike_max is not None:
+        conditions.append(f"strike <= {float(strike_max):.2f}")
+    if call_put:
+        side = call_put.capitalize()
+        if side not in ("Call", "Put"):
+            raise ValueError(f"call_put must be 'call' or 'put', got {call_put!r}")
+        conditions.append(f"call_put = '{side}'")
+
+    query = (
+        f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM `option_chain` "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY expiration, strike, call_put"
+    )
+    if limit is not None:
+        query += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+    return query
+
+
+def strike_band(spot: float, band: float) -> tuple:
+    """
+    Return the (strike_min, strike_max) pair covering `band` (a fraction, e.g. 0.15) around spot.
+    """
+    return spot * (1 - band), spot * (1 + band)
+
+
+def _run_query(query: str, priority: Optional[int] = None) -> Optional[list]:
+    """Execute a single query against the Dolthub SQL API (through the rate limiter) and return its rows."""
+    response = scheduler.request("dolthub", "GET", DOLTHUB_URL, params={"q": query}, priority=priority, session=_session)
+    if response.status_code != 200:
+        print(f"Error: {response.status_code} - {response.text}")
+        return None
+    data = response.json()
+    if data.get("query_execution_status") == "Error":
+        print(f"Dolthub query failed: {data.get('query_execution_message')}")
+        return None
+    return data.get("rows", [])
+
+
+def fetch_option_chain(
+    ticker: str,
+    date: str,
+    expiry_from: Optional[str] = None,
+    expiry_to: Optional[str] = None,
+    spot: Optional[float] = None,
+    band: Optional[float] = None,
+    call_put: Optional[str] = None,
+    columns: Iterable[str] = CHAIN_COLUMNS,
+    page_size: int = PAGE_SIZE,
+    priority: Optional[int] = None,
+) -> Optional[list]:
+    """
+    Fetch the option chain for one (ticker, date), paging through results larger than one response.
+
+    Args:
+        ticker (str): Underlying symbol
+        date (str): Quote date, YYYY-MM-DD
+        expiry_from (str): Earliest expiration to include
+        expiry_to (str): Latest expiration to include
+        spot (float): Spot price used to centre the strike band
+        band (float): Fractional strike band around spot, e.g. 0.15 for +/-15%
+        call_put (str): 'call' or 'put'; both sides when omitted
+        columns (Iterable[str]): Columns to project
+        page_size (int): Rows requested per page
+        priority (int): Scheduler priority (services.rate_limiter LIVE / NORMAL / BACKFILL)
+
+    Returns:
+        list: Row dicts, or None if any page failed
+    """
+    strike_min = strike_max = None
+    if spot is not None and band is not None:
+        strike_min, strike_max = strike_band(spot, band)
+
+    rows = []
+    offset = 0
+    while True:
+        query = build_option_chain_query(
+            ticker, date, expiry_from, expiry_to, strike_min, strike_max,
+            call_put, columns, limit=page_size, offset=offset,
+        )
+        page = _run_query(query, priority)
+        if page is None:
+            return None
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+def stream_option_chain(
+    ticker: str,
+    date: str,
+    expiry_from: Optional[str] = None,
+    expiry_to: Optional[str] = None,
+    spot: Optional[float] = None,
+    band: Optional[float] = None,
+    call_put: Optional[str] = None,
+    page_size: int = PAGE_SIZE,
+    priority: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Stream the option chain for one (ticker, date) as columns, one expiry at a time.
+
+    Each page's body is parsed as it downloads (services.chain_stream) straight
+    into typed column buffers, so no page is ever held as JSON or row dicts, and
+    an expiry is yielded as soon as the first row of the next one arrives.
+    Arguments are as for `fetch_option_chain`.
+
+    Yields:
+        dict: Snapshot-layout columns (services.chain_snapshot) for one expiry, in expiry order
+
+    Raises:
+        DolthubError: When a page fails or Dolthub reports a query error; expiries
+            already yielded are then only part of the chain
+    """
+    strike_min = strike_max = None
+    if spot is not None and band is not None:
+        strike_min, strike_max = strike_band(spot, band)
+    builder = ExpiryColumns(expiry_from, expiry_to, strike_min, strike_max)
+
+    offset = 0
+    while True:
+        query = build_option_chain_query(
+            ticker, date, expiry_from, expiry_to, strike_min, strike_max,
+            call_put, CHAIN_COLUMNS, limit=page_size, offset=offset,
+        )
+        response = scheduler.request("dolthub", "GET", DOLTHUB_URL, params={"q": query}, priority=priority, session=_session, stream=True)
+        with response:
+            if response.status_code != 200:
+                raise DolthubError(f"HTTP {response.status_code} - {response.text[:200]}")
+            meta = {}
+            rows_before = builder.rows_seen
+            yield from dolthub_expiries(scan_json(response.iter_content(STREAM_CHUNK_SIZE)), builder, meta)
+        if meta.get("query_execution_status") == "Error":
+            raise DolthubError(f"Dolthub query failed: {meta.get('query_execution_message')}")
+        if builder.rows_seen - rows_before < page_size:
+            break
+        offset += page_size
+
+    last = builder.flush()
+    if last is not None:
+        yield last
+
+
+def fetch_option_chains(ticker: str, dates: Iterable[str], max_workers: int = 4, priority: int = BACKFILL, **filters) -> dict:
+    """
+    Fetch option chains for several dates concurrently.
+
+    Args:
+        ticker (str): Underlying symbol
+        dates (Iterable[str]): Quote dates, YYYY-MM-DD
+        max_workers (int): Maximum concurrent requests
+        priority (int): Scheduler priority; batch fetches default to BACKFILL so live requests go first
+        **filters: Forwarded to `fetch_option_chain`
+
+    Returns:
+        dict: Mapping of date to rows (None for dates that failed)
+    """
+    dates = list(dates)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        chains = executor.map(lambda day: fetch_option_chain(ticker, day, priority=priority, **filters), dates)
+        return dict(zip(dates, chains))
@@ -0,0 +1,366 @@
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from services.chain_snapshot import (
+    ChainSnapshot, SNAPSHOT_DIR, index_entry, snapshot_path, update_index, write_snapshot,
+)
+from services.chain_stream import DOLTHUB_EXTRA_COLUMNS
+from services.chain_updates import contract_keys
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+# Bytes of dump text read per block; a resume point is always a block start plus a row count.
+INGEST_BLOCK_BYTES = int(os.getenv("INGEST_BLOCK_BYTES", 4 * 1024 * 1024))
+# Rows held in open partitions before the largest are written early (unsorted dumps).
+INGEST_MAX_OPEN_ROWS = int(os.getenv("INGEST_MAX_OPEN_ROWS", 2_000_000))
+CHECKPOINT_SECONDS = 10.0
+PROGRESS_SECONDS = 5.0
+
+# Column order of `option_chain` in the Dolthub options dataset, used when a SQL dump's INSERTs omit it.
+DOLTHUB_COLUMNS = ("date", "act_symbol", "expiration", "strike", "call_put", "bid", "ask", "vol", "delta", "gamma", "theta", "vega", "rho")
+_REQUIRED = ("date", "act_symbol", "expiration", "strike", "call_put", "bid", "ask")
+
+_INSERT = re.compile(r"INSERT\s+INTO\s+`?option_chain`?\s*(?:\(([^)]*)\))?\s*VALUES\s*\(", re.IGNORECASE)
+_CREATE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?option_chain`?\s*\(", re.IGNORECASE)
+_COLUMN_DEF = re.compile(r"^\s*`(\w+)`", re.MULTILINE)
+_TUPLE_SEPARATOR = re.compile(r"\)\s*,\s*\(")
+
+
+def _csv_blocks(f, columns: Optional[list], block_bytes: int) -> Iterator[tuple]:
+    """(offset, columns, rows, next_offset) per block of CSV lines; the header is read when `columns` is None."""
+    offset = f.tell()
+    if columns is None:
+        header = f.readline()
+        offset += len(header)
+        columns = next(csv.reader([header.decode("utf-8-sig")]))
+    while True:
+        lines = f.readlines(block_bytes)
+        if not lines:
+            return
+        size = sum(len(line) for line in lines)
+        rows = [row for row in csv.reader(io.StringIO(b"".join(lines).decode())) if row]
+        yield offset, columns, rows, offset + size
+        offset += size
+
+
+def _sql_statements(f) -> Iterator[tuple]:
+    """(offset, statement, next_offset) for each ';'-terminated statement of a SQL dump."""
+    offset, lines, start = f.tell(), [], None
+    for line in f:
+        if start is None:
+            if not line.strip():
+                offset += len(line)
+                continue
+            start = offset
+        lines.append(line)
+        offset += len(line)
+        if line.rstrip().endswith(b";"):
+            yield start, b"".join(lines).decode(), offset
+            lines, start = [], None
+
+
+def _sql_blocks(f, columns: Optional[list], block_bytes: int) -> Iterator[tuple]:
+    """(offset, columns, rows, next_offset) per `option_chain` INSERT of a SQL dump (mysqldump or `dolt dump`)."""
+    columns = columns or list(DOLTHUB_COLUMNS)
+    for offset, statement, next_offset in _sql_statements(f):
+        match = _INSERT.match(statement.lstrip())
+        if match is None:
+            create = _CREATE.match(statement.lstrip())
+            if create:
+                columns = _COLUMN_DEF.findall(statement[create.end():])
+            continue
+        if match.group(1):
+            columns = [name.strip(" `") for name in match.group(1).split(",")]
+        body = statement.lstrip()[match.end():].rstrip().rstrip(";").rstrip()
+        if body.endswith(")"):
+            body = body[:-1]
+        reader = csv.reader(_TUPLE_SEPARATOR.split(body), quotechar="'", escapechar="\\", skipinitialspace=True)
+        rows = [["" if value == "NULL" else value for value in row] for row in reader]
+        yield offset, columns, rows, next_offset
+
+
+def dump_format(path: str) -> str:
+    """'csv' or 'sql', from the extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".csv", ".sql"):
+        return extension[1:]
+    raise ValueError(f"Cannot tell the dump format of {path}; expected a .csv or .sql file")
+
+
+def _floats(values: tuple) -> np.ndarray:
+    # Object dtype: a fixed-width string array would truncate "nan" to the width of its longest value
+    values = np.array(values, dtype=object)
+    values[values == ""] = np.nan
+    return values.astype(float)
+
+
+def typed_columns(columns: list, rows: list) -> dict:
+    """Snapshot-layout columns (services.chain_snapshot) from `option_chain` rows of strings."""
+    values = dict(zip(columns, zip(*rows)))
+    typed = {
+        "expiration": np.array(values["expiration"], dtype="datetime64[D]"),
+        "strike": _floats(values["strike"]),
+        "is_call": np.char.lower(np.array(values["call_put"])) == "call",
+        "bid": _floats(values["bid"]),
+        "ask": _floats(values["ask"]),
+    }
+    for name in DOLTHUB_EXTRA_COLUMNS:
+        if name in values:
+            typed[name] = _floats(values[name])
+    return typed
+
+
+def _merge(existing: ChainSnapshot, columns: dict) -> dict:
+    """`columns` plus the contracts of `existing` they do not replace."""
+    old = existing.select(columns=[name for name in columns if name in existing.column_names])
+    if len(old) != len(columns):
+        return columns
+    merged = {name: np.concatenate([values, np.asarray(old[name])]) for name, values in columns.items()}
+    _, first = np.unique(contract_keys(merged["expiration"], merged["strike"], merged["is_call"]), return_index=True)
+    return {name: values[first] for name, values in merged.items()}
+
+
+def _write_partition(root: str, ticker: str, as_of: str, columns: list, rows: list, source: str) -> tuple:
+    """Type and write one (ticker, date) partition; rows already written by this ingest are merged, not replaced."""
+    typed = typed_columns(columns, rows)
+    path = snapshot_path(ticker, as_of, root)
+    if os.path.exists(path):
+        existing = ChainSnapshot(path)
+        if existing.header.get("source") == source:
+            typed = _merge(existing, typed)
+    write_snapshot(path, ticker, as_of, typed, source=source)
+    return ticker, as_of, index_entry(ChainSnapshot(path))
+
+
+def state_path(dump_path: str, root: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(root, "_ingest", f"{os.path.basename(dump_path)}.json")
+
+
+class _Partition:
+    __slots__ = ("rows", "position", "columns")
+
+    def __init__(self, position: tuple, columns: list):
+        self.rows: list = []
+        self.position = position
+        self.columns = columns
+
+
+def ingest_dump(
+    path: str,
+    root: str = SNAPSHOT_DIR,
+    workers: Optional[int] = None,
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    resume: bool = True,
+    block_bytes: int = INGEST_BLOCK_BYTES,
+    max_open_rows: int = INGEST_MAX_OPEN_ROWS,
+    verbose: bool = True,
+) -> dict:
+    """
+    Load a local Dolthub `option_chain` dump (CSV export or SQL dump) into per-(ticker, date) snapshots.
+
+    The dump is streamed block by block; rows are grouped by (act_symbol, date),
+    and each partition is typed and written (services.chain_snapshot.write_snapshot)
+    by a pool of `workers` processes once the stream moves past it. Dumps are in
+    primary-key order, so partitions close as soon as they end; rows of a
+    partition that shows up again later are merged into what was written.
+    Progress (byte offset plus a row count) is checkpointed with the per-ticker
+    indexes, so an interrupted ingest resumes where it stopped; rows re-read
+    after the checkpoint replace themselves rather than duplicating.
+
+    Args:
+        path (str): Dump file, `.csv` (`dolt table export option_chain`) or `.sql` (`dolt dump`)
+        root (str): Snapshot store root
+        workers (int): Writer processes, defaults to INGEST_WORKERS; <= 1 writes inline
+        tickers (Iterable[str]): Only ingest these symbols
+        start (str): First date to ingest (YYYY-MM-DD)
+        end (str): Last date to ingest (YYYY-MM-DD)
+        resume (bool): Continue from the last checkpoint of this dump, if it is unchanged
+        block_bytes (int): Dump bytes read per block
+        max_open_rows (int): Buffered rows beyond which the largest open partitions are written early
+        verbose (bool): Print progress with rows/sec
+
+    Returns:
+        dict: rows read, rows ingested, partitions written, tickers, seconds and rows_per_second
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    tickers = {ticker.upper() for ticker in tickers} if tickers else None
+    stat = os.stat(path)
+    filters = {"tickers": sorted(tickers) if tickers else None, "start": start, "end": end}
+    state_file = state_path(path, root)
+    state = None
+    if resume and os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+        if (state["size"], state["mtime_ns"], state["filters"]) != (stat.st_size, stat.st_mtime_ns, filters):
+            state = None
+    if state is None:
+        state = {
+            "source_path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "filters": filters,
+            "source": f"dolthub-dump:{os.path.basename(path)}:{stat.st_mtime_ns}",
+            "offset": 0, "skip": 0, "columns": None, "rows": 0, "partitions": 0, "complete": False,
+        }
+    if state["complete"]:
+        if verbose:
+            print(f"{path} is already ingested ({state['rows']:,} rows)")
+        return {"rows": 0, "ingested": 0, "partitions": 0, "tickers": 0, "seconds": 0.0, "rows_per_second": 0.0, "resumed": True}
+    resumed = state["offset"] > 0
+
+    blocks = _csv_blocks if dump_format(path) == "csv" else _sql_blocks
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    inflight: dict = {}
+    dirty: dict = {}
+    open_parts: dict = {}
+    counters = {"rows": 0, "ingested": 0, "partitions": 0}
+    saved = {"rows": 0, "partitions": 0}
+    seen_tickers: set = set()
+    started = last_checkpoint = last_progress = time.perf_counter()
+
+    def collect(future: Future) -> None:
+        ticker, as_of, entry = future.result()
+        dirty.setdefault(ticker, {})[as_of] = entry
+        counters["partitions"] += 1
+
+    def settle(block: bool = False) -> None:
+        """Collect finished writes; with `block`, wait until the pool has room."""
+        while inflight:
+            done = [key for key, (future, _) in inflight.items() if future.done()]
+            if not done and not (block and len(inflight) >= 4 * workers):
+                return
+            if not done:
+                wait([future for future, _ in inflight.values()], return_when=FIRST_COMPLETED)
+            for key in done:
+                collect(inflight.pop(key)[0])
+
+    def flush(key: tuple) -> None:
+        part = open_parts.pop(key)
+        ticker, as_of = key
+        args = (root, ticker, as_of, part.columns, part.rows, state["source"])
+        if executor is None:
+            future = Future()
+            future.set_result(_write_partition(*args))
+            return collect(future)
+        # A partition written again (unsorted dump) must merge with its finished first write
+        if key in inflight:
+            collect(inflight.pop(key)[0])
+        settle(block=True)
+        inflight[key] = (executor.submit(_write_partition, *args), part.position)
+
+    def checkpoint(position: tuple, complete: bool = False) -> None:
+        pending = [part.position for part in open_parts.values()] + [position for _, position in inflight.values()]
+        state["offset"], state["skip"] = min(pending + [position])
+        for ticker, entries in dirty.items():
+            update_index(ticker, entries, root)
+        dirty.clear()
+        state["rows"] += counters["rows"] - saved["rows"]
+        state["partitions"] += counters["partitions"] - saved["partitions"]
+        saved.update(rows=counters["rows"], partitions=counters["partitions"])
+        state["complete"] = complete
+        os.makedirs(os.path.dirname(state_file), exist_ok=True)
+        with open(f"{state_file}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{state_file}.tmp", state_file)
+
+    try:
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            skip = state["skip"]
+            columns, symbol_index, position = state["columns"], None, (state["offset"], 0)
+            for offset, block_columns, rows, next_offset in blocks(f, columns, block_bytes):
+                if block_columns != columns or symbol_index is None:
+                    missing = [name for name in _REQUIRED if name not in block_columns]
+                    if missing:
+                        raise ValueError(f"{path} has no {missing} columns")
+                    columns, state["columns"] = block_columns, list(block_columns)
+                    symbol_index, date_index = columns.index("act_symbol"), columns.index("date")
+                first = 0
+                if skip:
+                    first, skip = min(skip, len(rows)), max(skip - len(rows), 0)
+
+                touched = set()
+                current_key, current = None, None
+                for i in range(first, len(rows)):
+                    row = rows[i]
+                    key = (row[symbol_index], row[date_index])
+                    if key != current_key:
+                        current_key, current = key, None
+                        symbol, as_of = key[0].upper(), key[1]
+                        if (tickers is not None and symbol not in tickers) or (start and as_of < start) or (end and as_of > end):
+                            continue
+                        part_key = (symbol, as_of)
+                        part = open_parts.get(part_key)
+                        if part is None or part.columns is not columns:
+                            if part is not None:
+                                flush(part_key)
+                            part = open_parts[part_key] = _Partition((offset, i), columns)
+                        touched.add(part_key)
+                        current = part.rows
+                    if current is not None:
+                        current.append(row)
+                        counters["ingested"] += 1
+                counters["rows"] += len(rows) - first
+                position = (next_offset, 0)
+
+                # Partitions the stream has moved past are complete (for dumps in key order)
+                for key in [key for key in open_parts if key not in touched]:
+                    flush(key)
+                open_rows = sum(len(part.rows) for part in open_parts.values())
+                if open_rows > max_open_rows:
+                    for key in sorted(open_parts, key=lambda k: len(open_parts[k].rows), reverse=True)[:len(open_parts) // 2 + 1]:
+                        flush(key)
+                settle()
+
+                seen_tickers.update(ticker for ticker, _ in touched)
+                now = time.perf_counter()
+                if now - last_checkpoint > CHECKPOINT_SECONDS:
+                    checkpoint(position)
+                    last_checkpoint = now
+                if verbose and now - last_progress > PROGRESS_SECONDS:
+                    print(f"{counters['rows']:,} rows, {counters['partitions']:,} partitions, "
+                          f"{counters['rows'] / (now - started):,.0f} rows/s ({100 * next_offset / max(stat.st_size, 1):.1f}%)")
+                    last_progress = now
+
+            for key in list(open_parts):
+                flush(key)
+            while inflight:
+                key = next(iter(inflight))
+                collect(inflight.pop(key)[0])
+            checkpoint(position, complete=True)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        **counters, "tickers": len(seen_tickers), "seconds": round(elapsed, 3),
+        "rows_per_second": round(counters["rows"] / elapsed, 1) if elapsed else 0.0, "resumed": resumed,
+    }
+    if verbose:
+        print(f"Ingested {path}: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load Dolthub option_chain dumps into the local snapshot store.")
+    parser.add_argument("dumps", nargs="+", help=".csv (dolt table export) or .sql (dolt dump) files")
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--tickers", help="Comma-separated symbols to keep")
+    parser.add_argument("--start", help="First date, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last date, YYYY-MM-DD")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress")
+    args = parser.parse_args()
+    for dump in args.dumps:
+        ingest_dump(
+            dump, root=args.root, workers=args.workers, tickers=args.tickers.split(",") if args.tickers else None,
+            start=args.start, end=args.end, resume=not args.restart,
+        )
@@ -0,0 +1,326 @@
+import argparse
+import time
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.special import ndtr
+
+from services.chain_snapshot import ChainSnapshot, SNAPSHOT_DIR, open_snapshot, rebuild_index, snapshot_dates
+from services.result_store import ResultStore, get_result_store
+from services.trading_calendar import calendar_for
+
+# Rolling windows for IV rank and percentile, in stored observations (trading days).
+LOOKBACKS = (30, 90, 252)
+# Constant maturities (calendar days) of the ATM term structure.
+TENORS = (30, 60, 90, 180)
+SKEW_DELTA = 0.25
+# Observations a window needs before its rank is reported.
+MIN_HISTORY = 10
+# Expiries closer than this are too noisy to anchor the term structure.
+MIN_EXPIRY_DAYS = 2
+RISK_FREE_RATE = 0.0398
+
+# Columns of a daily summary that `screen` can filter and sort on.
+METRICS = (
+    "forward", *(f"atm_{tenor}" for tenor in TENORS), "rr25_30", "bf25_30", "term_slope",
+    *(f"{kind}_{lookback}" for lookback in LOOKBACKS for kind in ("rank", "pct")),
+)
+
+
+def _float(value) -> Optional[float]:
+    """JSON/SQL-safe float: NaN and missing become None."""
+    return float(value) if value is not None and np.isfinite(value) else None
+
+
+def _forward(strike: np.ndarray, is_call: np.ndarray, mid: np.ndarray, T: float, r: float) -> float:
+    """Put-call parity forward from the strike where call and put mids are closest (NaN without a pair)."""
+    calls, puts = is_call & (mid > 0), ~is_call & (mid > 0)
+    common, call_index, put_index = np.intersect1d(strike[calls], strike[puts], return_indices=True)
+    if not len(common):
+        return np.nan
+    difference = mid[calls][call_index] - mid[puts][put_index]
+    best = np.argmin(np.abs(difference))
+    return float(common[best] + np.exp(r * T) * difference[best])
+
+
+def _wing(delta: np.ndarray, iv: np.ndarray, target: float) -> float:
+    """IV at `target` delta, interpolated across one wing (NaN when the wing does not reach it)."""
+    if len(delta) < 2 or not delta.min() <= target <= delta.max():
+        return np.nan
+    order = np.argsort(delta)
+    return float(np.interp(target, delta[order], iv[order]))
+
+
+def expiry_metrics(strike, is_call, iv, T: float, forward: float, delta=None) -> dict:
+    """
+    ATM IV and 25-delta skew of one expiry.
+
+    ATM IV is interpolated in log-moneyness across out-of-the-money options; wing
+    deltas come from the chain when it has them, otherwise from each option's own IV.
+
+    Returns:
+        dict: atm, put25, call25, rr25 (call25 - put25) and bf25 (wing average less ATM)
+    """
+    strike, iv = np.asarray(strike, dtype=float), np.asarray(iv, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    otm = ((is_call & (strike >= forward)) | (~is_call & (strike < forward))) & np.isfinite(iv) & (iv > 0)
+    moneyness = np.log(strike[otm] / forward)
+    order = np.argsort(moneyness)
+    atm = float(np.interp(0.0, moneyness[order], iv[otm][order])) if len(order) > 1 and moneyness.min() <= 0 <= moneyness.max() else np.nan
+
+    if delta is None or not np.isfinite(delta[otm]).any():
+        sqrt_t = np.sqrt(T)
+        d1 = (np.log(forward / strike) + 0.5 * iv ** 2 * T) / (iv * sqrt_t)
+        delta = np.where(is_call, ndtr(d1), ndtr(d1) - 1)
+    delta = np.asarray(delta, dtype=float)
+    puts, calls = otm & ~is_call & np.isfinite(delta), otm & is_call & np.isfinite(delta)
+    put25, call25 = _wing(delta[puts], iv[puts], -SKEW_DELTA), _wing(delta[calls], iv[calls], SKEW_DELTA)
+    return {"atm": atm, "put25": put25, "call25": call25, "rr25": call25 - put25, "bf25": 0.5 * (call25 + put25) - atm}
+
+
+def _at_tenor(years: np.ndarray, values: np.ndarray, tenor: float, variance: bool) -> float:
+    """Value at a constant maturity: linear in total variance (or in the value itself), flat before the first expiry."""
+    valid = np.isfinite(values)
+    years, values = years[valid], values[valid]
+    if not len(years) or tenor > years[-1]:
+        return np.nan
+    if tenor <= years[0]:
+        return float(values[0])
+    if not variance:
+        return float(np.interp(tenor, years, values))
+    return float(np.sqrt(np.interp(tenor, years, values ** 2 * years) / tenor))
+
+
+def summarize_chain(
+    ticker: str,
+    as_of: str,
+    expiration,
+    strike,
+    is_call,
+    iv,
+    bid=None,
+    ask=None,
+    delta=None,
+    spot: Optional[float] = None,
+    risk_free_rate: float = RISK_FREE_RATE,
+) -> dict:
+    """
+    One day's IV summary for a chain: constant-maturity ATM IVs, 30-day skew and the per-expiry term structure.
+
+    Each expiry's forward comes from put-call parity on the quotes, falling back
+    to `spot` carried at `risk_free_rate` when calls and puts cannot be paired.
+
+    Args:
+        ticker (str): Underlying symbol
+        as_of (str): Chain date (YYYY-MM-DD)
+        expiration, strike, is_call, iv (array_like): One entry per contract
+        bid, ask (array_like): Quotes, for the parity forward
+        delta (array_like): Chain-supplied deltas, if any
+        spot (float): Underlying price, in the chain's strike terms
+
+    Returns:
+        dict: iv_daily row (services.result_store) without ranks, with 'term_structure'
+    """
+    expiration = np.asarray(expiration).astype("datetime64[D]")
+    strike, iv = np.asarray(strike, dtype=float), np.asarray(iv, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    mid = np.full(len(strike), np.nan)
+    if bid is not None and ask is not None:
+        bid, ask = np.asarray(bid, dtype=float), np.asarray(ask, dtype=float)
+        with np.errstate(invalid="ignore"):
+            mid = np.where((bid > 0) & (ask >= bid), 0.5 * (bid + ask), np.nan)
+    delta = None if delta is None else np.asarray(delta, dtype=float)
+
+    expiries, inverse = np.unique(expiration, return_inverse=True)
+    years = calendar_for(ticker).year_fraction(expiries, as_of)
+    term = []
+    for i, (expiry, T) in enumerate(zip(expiries, years)):
+        if T * 365 < MIN_EXPIRY_DAYS:
+            continue
+        rows = np.nonzero(inverse == i)[0]
+        forward = _forward(strike[rows], is_call[rows], mid[rows], T, risk_free_rate)
+        if not np.isfinite(forward) and spot:
+            forward = spot * np.exp(risk_free_rate * T)
+        if not np.isfinite(forward):
+            continue
+        metrics = expiry_metrics(strike[rows], is_call[rows], iv[rows], T, forward, None if delta is None else delta[rows])
+        term.append({"expiration": str(expiry), "days": round(float(T) * 365, 3), "forward": forward, **metrics})
+
+    term_years = np.array([row["days"] / 365 for row in term])
+    atm = np.array([row["atm"] for row in term])
+    summary = {"ticker": ticker, "as_of": as_of, "forward": term[0]["forward"] if term else None}
+    for tenor in TENORS:
+        summary[f"atm_{tenor}"] = _at_tenor(term_years, atm, tenor / 365, variance=True)
+    for name in ("rr25", "bf25"):
+        summary[f"{name}_30"] = _at_tenor(term_years, np.array([row[name] for row in term]), 30 / 365, variance=False)
+    summary["term_slope"] = summary["atm_90"] - summary["atm_30"]
+    summary = {name: _float(value) if isinstance(value, float) else value for name, value in summary.items()}
+    summary["term_structure"] = [{name: _float(v) if isinstance(v, float) else v for name, v in row.items()} for row in term]
+    return summary
+
+
+def summarize_contracts(ticker: str, as_of: str, contracts: list, spot: Optional[float] = None) -> dict:
+    """`summarize_chain` for contract dicts with 'implied_volatility', as `calculate_iv_for_contracts` or `ResultStore.get_chain` return them."""
+    def column(key):
+        return [float(c[key]) if c.get(key) not in (None, "") else np.nan for c in contracts]
+
+    return summarize_chain(
+        ticker, as_of, [c["expiration"] for c in contracts], column("strike"),
+        [c["call_put"].lower() == "call" for c in contracts], column("implied_volatility"),
+        column("bid"), column("ask"), column("delta") if contracts and "delta" in contracts[0] else None, spot,
+    )
+
+
+def summarize_snapshot(snapshot: ChainSnapshot, spot: Optional[float] = None) -> Optional[dict]:
+    """`summarize_chain` from a stored snapshot's own IV ('vol') and delta columns; None without IVs."""
+    if "vol" not in snapshot.column_names:
+        return None
+    columns = snapshot.select()
+    return summarize_chain(
+        snapshot.ticker, snapshot.as_of, columns["expiration"], columns["strike"], columns["is_call"], columns["vol"],
+        columns["bid"], columns["ask"], columns.get("delta"), spot,
+    )
+
+
+def rolling_rank(values: np.ndarray, lookback: int) -> tuple:
+    """
+    IV rank and percentile (0-100) of each observation within its trailing window.
+
+    Rank is where the value sits between the window's low and high; percentile is
+    the share of earlier observations in the window below it.
+
+    Returns:
+        tuple: (rank, percentile) arrays, NaN until the window has MIN_HISTORY observations
+    """
+    values = np.asarray(values, dtype=float)
+    windows = sliding_window_view(np.concatenate([np.full(lookback - 1, np.nan), values]), lookback)
+    finite = np.isfinite(windows)
+    low = np.where(finite, windows, np.inf).min(axis=1)
+    high = np.where(finite, windows, -np.inf).max(axis=1)
+    earlier = finite[:, :-1].sum(axis=1)
+    below = (windows[:, :-1] < values[:, None]).sum(axis=1)
+    valid = np.isfinite(values) & (finite.sum(axis=1) >= min(MIN_HISTORY, lookback))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rank = np.where(valid & (high > low), np.clip(100 * (values - low) / (high - low), 0, 100), np.nan)
+        percentile = np.where(valid & (earlier > 0), 100 * below / earlier, np.nan)
+    return rank, percentile
+
+
+def refresh_ranks(ticker: str, since: str, store: Optional[ResultStore] = None) -> int:
+    """
+    Recompute stored ranks and percentiles of `ticker` from `since` on.
+
+    Only the trailing window before `since` is read, so appending a day costs one
+    window of 30-day ATM IVs, independent of how much history is stored.
+    """
+    store = store or get_result_store()
+    start = (date.fromisoformat(since) - timedelta(days=2 * max(LOOKBACKS))).isoformat()
+    history = store.iv_days(ticker, start=start)
+    if not history:
+        return 0
+    values = np.array([np.nan if day["atm_30"] is None else day["atm_30"] for day in history])
+    first = next((i for i, day in enumerate(history) if day["as_of"] >= since), len(history))
+    ranks = {day["as_of"]: {} for day in history[first:]}
+    for lookback in LOOKBACKS:
+        rank, percentile = rolling_rank(values, lookback)
+        for i, day in enumerate(history[first:], first):
+            ranks[day["as_of"]].update({f"rank_{lookback}": _float(rank[i]), f"pct_{lookback}": _float(percentile[i])})
+    return store.save_iv_ranks(ticker, ranks)
+
+
+def record_days(days: Iterable[dict], store: Optional[ResultStore] = None) -> int:
+    """Store daily summaries and refresh ranks from each ticker's earliest new day on."""
+    store = store or get_result_store()
+    days = [day for day in days if day is not None]
+    store.save_iv_days(days)
+    earliest: dict = {}
+    for day in days:
+        earliest[day["ticker"]] = min(earliest.get(day["ticker"], day["as_of"]), day["as_of"])
+    for ticker, since in earliest.items():
+        refresh_ranks(ticker, since, store)
+    return len(days)
+
+
+def record_chain(ticker: str, as_of: str, contracts: list, spot: Optional[float] = None, store: Optional[ResultStore] = None) -> dict:
+    """Summarize a freshly solved chain into the IV history and return the day with its ranks."""
+    store = store or get_result_store()
+    record_days([summarize_contracts(ticker, as_of, contracts, spot)], store)
+    return store.iv_days(ticker, start=as_of, end=as_of, term_structure=True)[0]
+
+
+def backfill(
+    ticker: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    source: str = "snapshots",
+    root: str = SNAPSHOT_DIR,
+    store: Optional[ResultStore] = None,
+) -> dict:
+    """
+    Summarize stored chains that are not in the IV history yet, ranking them in one pass.
+
+    Args:
+        ticker (str): Underlying symbol
+        start (str): First as-of date (YYYY-MM-DD)
+        end (str): Last as-of date (YYYY-MM-DD)
+        source (str): 'snapshots' (services.chain_snapshot, e.g. from services.dolthub_ingest)
+            or 'store' (chains saved to the result store)
+        root (str): Snapshot store root
+
+    Returns:
+        dict: Days added and seconds taken
+    """
+    store = store or get_result_store()
+    started = time.perf_counter()
+    ticker = ticker.upper()
+    done = {day["as_of"] for day in store.iv_days(ticker, start, end)}
+    if source == "snapshots":
+        dates = snapshot_dates(ticker, start, end, root) or [d for d in sorted(rebuild_index(ticker, root)) if (not start or d >= start) and (not end or d <= end)]
+        days = [summarize_snapshot(open_snapshot(ticker, as_of, root)) for as_of in dates if as_of not in done]
+    elif source == "store":
+        days = [summarize_contracts(ticker, as_of, store.get_chain(ticker, as_of)) for as_of in store.chain_dates(ticker, start, end) if as_of not in done]
+    else:
+        raise ValueError(f"Unknown IV history source {source!r}")
+    added = record_days(days, store)
+    return {"ticker": ticker, "days_added": added, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def screen(
+    tickers: Optional[Iterable[str]] = None,
+    sort_by: str = "rank_252",
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    limit: Optional[int] = None,
+    descending: bool = True,
+    store: Optional[ResultStore] = None,
+) -> list:
+    """
+    Latest IV summary per ticker, filtered and sorted on one metric (e.g. rank_252, pct_90, rr25_30).
+
+    Reads only each ticker's latest precomputed row, so screening hundreds of
+    tickers does not touch their history.
+    """
+    if sort_by not in METRICS:
+        raise ValueError(f"Unknown metric {sort_by!r}; expected one of {METRICS}")
+    store = store or get_result_store()
+    rows = [row for row in store.latest_iv([t.upper() for t in tickers] if tickers is not None else None) if row.get(sort_by) is not None]
+    if min_value is not None:
+        rows = [row for row in rows if row[sort_by] >= min_value]
+    if max_value is not None:
+        rows = [row for row in rows if row[sort_by] <= max_value]
+    rows.sort(key=lambda row: row[sort_by], reverse=descending)
+    return rows[:limit] if limit else rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build IV rank/percentile history from stored chains.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--source", default="snapshots", choices=("snapshots", "store"))
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    for symbol in args.tickers:
+        print(backfill(symbol, args.start, args.end, args.source, args.root))
@@ -0,0 +1,383 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# SQLite file backing the queue; shared by the API process and every worker.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite")
+
+# Worker processes started with the API; 0 disables background execution.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+
+DEFAULT_TIMEOUT = 600.0
+DEFAULT_MAX_ATTEMPTS = 2
+# Upper bounds accepted from API callers, so one job cannot hold a worker indefinitely.
+MAX_TIMEOUT = float(os.getenv("JOB_MAX_TIMEOUT", 3600))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+RETRY_BACKOFF = 5.0
+POLL_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    timeout REAL NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (payload_hash, status);
+"""
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def run_analysis_job(payload: dict) -> dict:
+    """Job handler: data fetch -> candidates -> LLM group chat for one ticker."""
+    import agent
+
+    context = agent.build_analysis_context(payload["ticker"], payload.get("expiry", "2024-10-18"), payload.get("date", "2019-02-09"))
+    if context is None:
+        raise ValueError(f"No market or option data available for {payload['ticker']}")
+    group_chat = agent.run_group_chat(context)
+    final = group_chat.messages[-1] if group_chat.messages else {}
+    return {
+        "analysis_id": agent.save_analysis(context, group_chat),
+        "ticker": payload["ticker"],
+        "spot": context["spot"],
+        "candidates": context["candidates"],
+        "recommendation": final.get("content"),
+        "transcript": [{"agent": m.get("name"), "content": m.get("content")} for m in group_chat.messages],
+    }
+
+
+JOB_HANDLERS: dict = {
+    "analysis": run_analysis_job,
+}
+
+
+class JobQueue:
+    """Persistent job queue on a local SQLite file, safe to share across processes."""
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def payload_hash(kind: str, payload: dict) -> str:
+        return hashlib.sha256(f"{kind}:{json.dumps(payload, sort_keys=True)}".encode()).hexdigest()
+
+    def submit(self, kind: str, payload: dict, timeout: float = DEFAULT_TIMEOUT, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> tuple:
+        """
+        Enqueue a job, or return the identical job already queued or running.
+
+        Returns:
+            tuple: (job id, True if an existing job was reused)
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        digest = self.payload_hash(kind, payload)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE payload_hash = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (digest, *ACTIVE_STATUSES),
+            ).fetchone()
+            if existing:
+                conn.execute("COMMIT")
+                return existing["id"], True
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, payload_hash, status, max_attempts, timeout, created_at, available_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), digest, max_attempts, timeout, now, now),
+            )
+            conn.execute("COMMIT")
+        return job_id, False
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Atomically take the oldest runnable job, marking it running."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY available_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ? WHERE id = ?",
+                (worker, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        return {**dict(row), "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1}
+
+    def complete(self, job_id: str, result: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, finished_at = ? WHERE id = ? AND status = 'running'",
+                (json.dumps(result, default=str), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Record a failed attempt; requeue with backoff while attempts remain."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET error = ?, "
+                "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "available_at = ? + ? * attempts, "
+                "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END "
+                "WHERE id = ? AND status = 'running'",
+                (error, now, RETRY_BACKOFF, now, job_id),
+            )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job; running jobs are flagged and killed by their worker. Returns the new status."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["status"] in ACTIVE_STATUSES:
+                conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1, "
+                    "status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END, "
+                    "finished_at = CASE WHEN status = 'queued' THEN ? ELSE finished_at END WHERE id = ?",
+                    (time.time(), job_id),
+                )
+            conn.execute("COMMIT")
+            return conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()["status"]
+
+    def release(self, job_id: str) -> None:
+        """Hand a running job back to the queue without counting the attempt (its worker is shutting down)."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, worker = NULL, started_at = NULL, available_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def mark_cancelled(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue_stale(self, grace: float = 60.0) -> int:
+        """Return jobs whose worker died mid-run to the queue (or fail them when out of attempts)."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET error = 'worker lost', "
+                "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, available_at = ?, "
+                "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END "
+                "WHERE status = 'running' AND started_at + timeout + ? < ?",
+                (now, now, grace, now),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _run_handler(handler: Callable, payload: dict, conn) -> None:
+    """Child-process entry point: run one job and send ('ok', result) or ('error', traceback)."""
+    try:
+        conn.send(("ok", handler(payload)))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def _execute(queue: JobQueue, job: dict, stop=None) -> None:
+    """Run a claimed job in a child process, enforcing its timeout and cancellation.
+
+    The child never outlives this call: it is killed when `stop` is set or the worker
+    itself is interrupted, and the job goes back to the queue.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    # Not daemonic: handlers may start their own process pools (analyze_chain on large chains),
+    # which daemonic processes cannot do. The finally block below still reaps the child.
+    child = multiprocessing.Process(target=_run_handler, args=(JOB_HANDLERS[job["kind"]], job["payload"], sender), daemon=False)
+    child.start()
+    sender.close()
+    deadline = time.monotonic() + job["timeout"]
+
+    outcome = None
+    try:
+        while outcome is None:
+            if receiver.poll(POLL_INTERVAL):
+                try:
+                    outcome = receiver.recv()
+                except EOFError:
+                    outcome = ("error", f"worker process exited with code {child.exitcode}")
+            elif queue.cancel_requested(job["id"]):
+                outcome = ("cancelled", None)
+            elif stop is not None and stop.is_set():
+                outcome = ("stopped", None)
+            elif time.monotonic() > deadline:
+                outcome = ("error", f"timed out after {job['timeout']:.0f}s")
+            elif not child.is_alive() and not receiver.poll():
+                outcome = ("error", f"worker process exited with code {child.exitcode}")
+    finally:
+        if child.is_alive():
+            child.terminate()
+        child.join()
+        if outcome is None:
+            queue.release(job["id"])
+
+    status, value = outcome
+    if status == "ok":
+        queue.complete(job["id"], value)
+    elif status == "cancelled":
+        queue.mark_cancelled(job["id"])
+    elif status == "stopped":
+        queue.release(job["id"])
+    else:
+        print(f"Job {job['id']} attempt {job['attempts']} failed: {value}")
+        queue.fail(job["id"], value)
+
+
+def worker_loop(path: str, worker: str, stop) -> None:
+    """Worker process main loop: claim and run jobs until `stop` is set."""
+    # Exit through SystemExit on terminate() so a running job's child is killed too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    queue = JobQueue(path)
+    while not stop.is_set():
+        queue.requeue_stale()
+        job = queue.claim(worker)
+        if job is None:
+            stop.wait(POLL_INTERVAL)
+            continue
+        _execute(queue, job, stop)
+
+
+class WorkerPool:
+    """A fixed number of worker processes draining a JobQueue."""
+
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._stop = multiprocessing.Event()
+        self._processes: list = []
+
+    def start(self) -> None:
+        JobQueue(self.path)
+        for i in range(self.workers):
+            process = multiprocessing.Process(
+                target=worker_loop, args=(self.path, f"{os.getpid()}-{i}", self._stop), daemon=False
+            )
+            process.start()
+            self._processes.append(process)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop every worker; running jobs are killed and returned to the queue."""
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._processes = []
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide JobQueue on JOB_DB_PATH, created on first use."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
+
+
+def _parallel_chain_check(payload: dict) -> dict:
+    """Check handler: solve a synthetic chain large enough for analyze_chain to use its process pool."""
+    import numpy as np
+    from services.chain_analytics import MIN_PARALLEL_ROWS, analyze_chain
+
+    n_expiries = payload["expiries"]
+    n_rows = max(payload["rows"], MIN_PARALLEL_ROWS + n_expiries)
+    expiry = np.arange(n_rows) % n_expiries
+    chain = {
+        "underlying": np.full(n_rows, "SPY"),
+        "expiration": np.datetime64("2024-01-19") + expiry.astype("timedelta64[D]") * 7,
+        "spot": np.full(n_rows, 100.0),
+        "strike": 80.0 + (np.arange(n_rows) // n_expiries) % 40,
+        "time_to_expiry": (expiry + 1) * 7 / 365.0,
+        "price": np.full(n_rows, 5.0),
+        "is_call": np.arange(n_rows) % 2 == 0,
+    }
+    solved = analyze_chain(chain, workers=2)
+    return {"rows": n_rows, "solved": int(np.isfinite(solved["implied_volatility"]).sum())}
+
+
+if __name__ == "__main__":
+    # Job-path check: a chain above MIN_PARALLEL_ROWS must solve inside a job's child process.
+    import tempfile
+
+    JOB_HANDLERS["parallel_chain_check"] = _parallel_chain_check
+    check_queue = JobQueue(os.path.join(tempfile.mkdtemp(), "jobs.sqlite"))
+    job_id, _ = check_queue.submit("parallel_chain_check", {"rows": 30000, "expiries": 20}, timeout=300, max_attempts=1)
+    _execute(check_queue, check_queue.claim("check"))
+    job = check_queue.get(job_id)
+    print(json.dumps({"status": job["status"], "result": job["result"], "error": job["error"]}, indent=4))
+    if job["status"] != "succeeded":
+        sys.exit(1)
@@ -0,0 +1,366 @@
+import asyncio
+import os
+import time
+from abc import ABC
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.bar_series import BarSeries
+from services.chain_snapshot import from_polygon
+from services.chain_stream import concat_expiries, market_data_expiries, scan_json, STREAM_CHUNK_SIZE
+from services.data_fetch_dolthub import DolthubError, stream_option_chain
+from services.rate_limiter import scheduler
+
+load_dotenv()
+
+polygon_api_key = os.getenv("POLYGON_API_KEY")
+market_data_api_key = os.getenv("MARKET_DATA_API_KEY")
+api_key_coinapi = os.getenv("COIN_MARKET_API_KEY")
+
+KINDS = ("daily_bars", "intraday_bars", "option_chain", "spot")
+
+# Provider order per data kind; override with MARKET_DATA_PRIORITY_<KIND>="a,b,c".
+PROVIDER_PRIORITY = {
+    "daily_bars": ["polygon", "marketdata", "yahoo"],
+    "intraday_bars": ["polygon", "marketdata"],
+    "option_chain": ["dolthub", "marketdata", "polygon"],
+    "spot": ["polygon", "marketdata", "yahoo"],
+}
+
+# Crypto symbols (e.g. 'ETH-USD') use their own order.
+CRYPTO_PRIORITY = {
+    "daily_bars": ["coinapi"],
+    "intraday_bars": ["coinapi"],
+    "option_chain": [],
+    "spot": ["coinbase"],
+}
+
+# A hedge fires at the next provider once the current one has run this long without
+# answering: its observed p95 latency, or HEDGE_DEFAULT_DELAY until LATENCY_MIN_SAMPLES exist.
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", 2.0))
+LATENCY_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class ProviderError(Exception):
+    """Every provider for a request failed or returned no data."""
+
+
+class MarketDataProvider(ABC):
+    """
+    One vendor behind the common interface.
+
+    Bars are returned as `BarSeries`, option chains as the column dict used by
+    `services.chain_snapshot` (expiration, strike, is_call, bid, ask, ...), and
+    spot as a float. Kinds a vendor does not offer raise NotImplementedError.
+    """
+
+    name = ""
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        raise NotImplementedError
+
+    async def intraday_bars(self, ticker: str, date: str) -> BarSeries:
+        raise NotImplementedError
+
+    async def option_chain(self, ticker: str, date: str) -> dict:
+        raise NotImplementedError
+
+    async def spot(self, ticker: str) -> float:
+        raise NotImplementedError
+
+    async def _get_json(self, url: str, **kwargs):
+        response = await scheduler.arequest(self.name, "GET", url, **kwargs)
+        if response.status_code not in (200, 203):
+            raise ProviderError(f"{self.name}: HTTP {response.status_code} - {response.text[:200]}")
+        return response.json()
+
+
+def _bars_from_polygon(results: list) -> BarSeries:
+    if not results:
+        return BarSeries.empty()
+    return BarSeries(
+        np.array([r["t"] for r in results], dtype=np.int64) // 1000,
+        [r["o"] for r in results], [r["h"] for r in results], [r["l"] for r in results],
+        [r["c"] for r in results], [r.get("v", 0.0) for r in results],
+    )
+
+
+class PolygonProvider(MarketDataProvider):
+    name = "polygon"
+    base_url = "https://api.polygon.io"
+
+    async def _aggs(self, ticker: str, timespan: str, start: str, end: str) -> BarSeries:
+        url = f"{self.base_url}/v2/aggs/ticker/{ticker}/range/1/{timespan}/{start}/{end}"
+        data = await self._get_json(url, params={"adjusted": "true", "limit": 50000, "apiKey": polygon_api_key})
+        return _bars_from_polygon(data.get("results", []))
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        return await self._aggs(ticker, "day", start, end)
+
+    async def intraday_bars(self, ticker: str, date: str) -> BarSeries:
+        return await self._aggs(ticker, "minute", date, date)
+
+    async def option_chain(self, ticker: str, date: str) -> dict:
+        # The snapshot endpoint only serves the current chain
+        if date != datetime.now().strftime("%Y-%m-%d"):
+            raise NotImplementedError
+        data = await self._get_json(f"{self.base_url}/v3/snapshot/options/{ticker}", params={"limit": 250, "apiKey": polygon_api_key})
+        return from_polygon(data.get("results", []))
+
+    async def spot(self, ticker: str) -> float:
+        data = await self._get_json(f"{self.base_url}/v2/last/trade/{ticker}", params={"apiKey": polygon_api_key})
+        return float(data["results"]["p"])
+
+
+class MarketDataAppProvider(MarketDataProvider):
+    name = "marketdata"
+    base_url = "https://api.marketdata.app/v1"
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {market_data_api_key}"}
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        data = await self._get_json(f"{self.base_url}/stocks/candles/D/{ticker}/", params={"from": start, "to": end}, headers=self._headers())
+        return BarSeries.from_market_data(data)
+
+    async def intraday_bars(self, ticker: str, date: str) -> BarSeries:
+        data = await self._get_json(f"{self.base_url}/stocks/candles/1/{ticker}/", params={"date": date}, headers=self._headers())
+        return BarSeries.from_market_data(data)
+
+    async def option_chain(self, ticker: str, date: str) -> dict:
+        response = await scheduler.arequest(self.name, "GET", f"{self.base_url}/options/chain/{ticker}/", params={"date": date}, headers=self._headers(), stream=True)
+        if response.status_code not in (200, 203):
+            # A streamed response holds its connection until closed
+            with response:
+                raise ProviderError(f"{self.name}: HTTP {response.status_code} - {response.text[:200]}")
+        meta = {}
+
+        def parse() -> dict:
+            # Parsed as it streams into typed columns instead of response.json()
+            with response:
+                return concat_expiries(market_data_expiries(scan_json(response.iter_content(STREAM_CHUNK_SIZE)), meta=meta))
+
+        columns = await asyncio.to_thread(parse)
+        return columns if meta.get("s") == "ok" else {}
+
+    async def spot(self, ticker: str) -> float:
+        data = await self._get_json(f"{self.base_url}/stocks/quotes/{ticker}/", headers=self._headers())
+        return float(data["last"][0])
+
+
+class DolthubProvider(MarketDataProvider):
+    name = "dolthub"
+
+    async def option_chain(self, ticker: str, date: str) -> dict:
+        try:
+            # The whole chain or nothing: a failed page must not pass for a short chain
+            return await asyncio.to_thread(lambda: concat_expiries(stream_option_chain(ticker, date)))
+        except DolthubError as e:
+            raise ProviderError(f"{self.name}: {e}") from e
+
+
+class YahooProvider(MarketDataProvider):
+    name = "yahoo"
+
+    @staticmethod
+    def _history(ticker: str, **kwargs) -> BarSeries:
+        import yfinance as yf
+
+        frame = scheduler.call("yahoo", lambda: yf.Ticker(ticker).history(**kwargs))
+        if frame.empty:
+            return BarSeries.empty()
+        t = frame.index.tz_convert("UTC").asi8 // 1_000_000_000 if frame.index.tz is not None else frame.index.asi8 // 1_000_000_000
+        return BarSeries(t, frame["Open"].to_numpy(), frame["High"].to_numpy(), frame["Low"].to_numpy(), frame["Close"].to_numpy(), frame["Volume"].to_numpy())
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        # yfinance's end date is exclusive
+        end = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        return await asyncio.to_thread(self._history, ticker, start=start, end=end)
+
+    async def spot(self, ticker: str) -> float:
+        bars = await asyncio.to_thread(self._history, ticker, period="1d")
+        return bars.last_close()
+
+
+class CoinAPIProvider(MarketDataProvider):
+    name = "coinapi"
+    base_url = "https://rest.coinapi.io/v1"
+
+    async def _ohlcv(self, ticker: str, period: str, start: str, end: str) -> BarSeries:
+        symbol = f"BITSTAMP_SPOT_{ticker.split('-')[0]}_USD"
+        data = await self._get_json(
+            f"{self.base_url}/ohlcv/{symbol}/history",
+            params={"period_id": period, "time_start": f"{start}T00:00:00", "time_end": f"{end}T23:59:59", "limit": 100000},
+            headers={"X-CoinAPI-Key": api_key_coinapi},
+        )
+        if not data:
+            return BarSeries.empty()
+        t = np.array([row["time_period_start"][:19] for row in data], dtype="datetime64[s]").astype(np.int64)
+        return BarSeries(
+            t, [row["price_open"] for row in data], [row["price_high"] for row in data], [row["price_low"] for row in data],
+            [row["price_close"] for row in data], [row["volume_traded"] for row in data],
+        )
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        return await self._ohlcv(ticker, "1DAY", start, end)
+
+    async def intraday_bars(self, ticker: str, date: str) -> BarSeries:
+        return await self._ohlcv(ticker, "1MIN", date, date)
+
+
+class CoinbaseProvider(MarketDataProvider):
+    name = "coinbase"
+
+    async def spot(self, ticker: str) -> float:
+        data = await self._get_json(f"https://api.coinbase.com/v2/prices/{ticker}/spot")
+        return float(data["data"]["amount"])
+
+
+def _has_data(result) -> bool:
+    if result is None:
+        return False
+    if isinstance(result, BarSeries):
+        return len(result) > 0
+    if isinstance(result, dict):
+        return len(result.get("strike", ())) > 0
+    return True
+
+
+class MarketData:
+    """
+    Fetch market data from the first healthy provider, with failover and hedged requests.
+
+    Providers are tried in the configured order. An error or empty result moves
+    on to the next provider immediately; a provider that is still running at its
+    observed p95 latency gets a hedge request sent to the next provider, and the
+    first usable answer wins (the slower request is cancelled).
+    """
+
+    def __init__(self, providers: Optional[list] = None, priority: Optional[dict] = None, crypto_priority: Optional[dict] = None):
+        providers = providers if providers is not None else [
+            PolygonProvider(), MarketDataAppProvider(), DolthubProvider(), YahooProvider(), CoinAPIProvider(), CoinbaseProvider(),
+        ]
+        self.providers = {provider.name: provider for provider in providers}
+        self.priority = priority or {
+            kind: os.getenv(f"MARKET_DATA_PRIORITY_{kind.upper()}", ",".join(order)).split(",") for kind, order in PROVIDER_PRIORITY.items()
+        }
+        self.crypto_priority = crypto_priority or CRYPTO_PRIORITY
+        self._latency: dict = {}
+        self._stats: dict = {}
+
+    # --- Public interface -------------------------------------------------
+
+    async def daily_bars(self, ticker: str, start: str, end: str) -> BarSeries:
+        return await self.fetch("daily_bars", ticker, start, end)
+
+    async def intraday_bars(self, ticker: str, date: str) -> BarSeries:
+        return await self.fetch("intraday_bars", ticker, date)
+
+    async def option_chain(self, ticker: str, date: str) -> dict:
+        return await self.fetch("option_chain", ticker, date)
+
+    async def spot(self, ticker: str) -> float:
+        return await self.fetch("spot", ticker)
+
+    # --- Routing ----------------------------------------------------------
+
+    def providers_for(self, kind: str, ticker: str) -> list:
+        order = self.crypto_priority if "-" in ticker else self.priority
+        return [self.providers[name] for name in order.get(kind, []) if name in self.providers]
+
+    def hedge_delay(self, provider: str, kind: str) -> float:
+        samples = self._latency.get((provider, kind))
+        if not samples or len(samples) < LATENCY_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return float(np.percentile(samples, 95))
+
+    def _record(self, provider: str, kind: str, field: str, seconds: Optional[float] = None) -> None:
+        stats = self._stats.setdefault((provider, kind), {"requests": 0, "successes": 0, "errors": 0, "empty": 0, "hedges": 0, "hedge_wins": 0})
+        stats[field] += 1
+        if seconds is not None:
+            self._latency.setdefault((provider, kind), deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    async def _timed(self, provider: MarketDataProvider, kind: str, args: tuple):
+        self._record(provider.name, kind, "requests")
+        started = time.monotonic()
+        result = await getattr(provider, kind)(*args)
+        return result, time.monotonic() - started
+
+    async def fetch(self, kind: str, *args):
+        """
+        Fetch one kind of data ('daily_bars', 'intraday_bars', 'option_chain' or 'spot').
+
+        Raises:
+            ProviderError: When every configured provider failed or had no data
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown market data kind: {kind!r}")
+        candidates = self.providers_for(kind, args[0])
+        if not candidates:
+            raise ProviderError(f"No provider configured for {kind} of {args[0]}")
+
+        pending: dict = {}
+        errors = []
+        hedged = False
+        next_index = 0
+        try:
+            while True:
+                if next_index < len(candidates) and (not pending or hedged):
+                    provider = candidates[next_index]
+                    next_index += 1
+                    if hedged:
+                        self._record(provider.name, kind, "hedges")
+                    pending[asyncio.ensure_future(self._timed(provider, kind, args))] = (provider, hedged)
+                    hedged = False
+                if not pending:
+                    raise ProviderError(f"All providers failed for {kind} {args}: {'; '.join(errors)}")
+
+                # Wait for an answer, but no longer than the newest provider's p95 if another one is left to hedge to
+                newest = list(pending.values())[-1][0]
+                timeout = self.hedge_delay(newest.name, kind) if next_index < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    continue
+
+                for task in done:
+                    provider, was_hedge = pending.pop(task)
+                    try:
+                        result, seconds = task.result()
+                    except NotImplementedError:
+                        continue
+                    except Exception as e:
+                        self._record(provider.name, kind, "errors")
+                        errors.append(f"{provider.name}: {e}")
+                        print(f"Market data {kind} from {provider.name} failed: {e}")
+                        continue
+                    if not _has_data(result):
+                        self._record(provider.name, kind, "empty", seconds)
+                        errors.append(f"{provider.name}: no data")
+                        continue
+                    self._record(provider.name, kind, "successes", seconds)
+                    if was_hedge:
+                        self._record(provider.name, kind, "hedge_wins")
+                    return result
+        finally:
+            # Only withdraws these callers: a coalesced request that others are waiting on keeps running
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Per provider and kind: request/outcome counts, hedges, and p50/p95 latency in seconds."""
+        report = {}
+        for (provider, kind), stats in self._stats.items():
+            samples = self._latency.get((provider, kind))
+            latency = {"p50": round(float(np.percentile(samples, 50)), 4), "p95": round(float(np.percentile(samples, 95)), 4)} if samples else {}
+            report.setdefault(provider, {})[kind] = {**stats, **latency}
+        return report
+
+
+# Process-wide instance used by the API and pipeline.
+market_data = MarketData()
@@ -0,0 +1,148 @@
+import os
+import time
+from typing import Optional
+
+import autogen
+from dotenv import load_dotenv
+
+load_dotenv()
+
+open_ai_api_key = os.getenv("OPENAI_API_KEY")
+
+# Model per tier; override with MODEL_TIER_FAST / MODEL_TIER_STANDARD.
+MODEL_TIERS = {
+    "fast": os.getenv("MODEL_TIER_FAST", "gpt-4o-mini"),
+    "standard": os.getenv("MODEL_TIER_STANDARD", "gpt-4o"),
+}
+
+# Tier per agent role. Reasoning-heavy roles get the standard tier; summarizing and
+# speaker selection only need the fast one.
+ROLE_TIERS = {
+    "analyst": "standard",
+    "critic": "standard",
+    "planner": "fast",
+    "selector": "fast",
+    "summarizer": "fast",
+}
+
+# Per-analysis budgets; past FALLBACK_FRACTION of either, every role drops to the fast tier.
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", 60000))
+ANALYSIS_SECONDS_BUDGET = float(os.getenv("ANALYSIS_SECONDS_BUDGET", 120))
+FALLBACK_FRACTION = 0.8
+
+
+def _total_tokens(client) -> tuple:
+    """Return (prompt, completion) tokens recorded so far by an OpenAIWrapper."""
+    summary = client.total_usage_summary or {}
+    usage = [v for v in summary.values() if isinstance(v, dict)]
+    return sum(u.get("prompt_tokens", 0) for u in usage), sum(u.get("completion_tokens", 0) for u in usage)
+
+
+class AnalysisBudget:
+    """Token and wall-clock budget shared by every agent in one analysis."""
+
+    def __init__(self, max_tokens: int = ANALYSIS_TOKEN_BUDGET, max_seconds: float = ANALYSIS_SECONDS_BUDGET):
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def fraction_used(self) -> float:
+        return max(self.tokens / self.max_tokens, self.elapsed() / self.max_seconds)
+
+    def nearly_spent(self) -> bool:
+        return self.fraction_used() >= FALLBACK_FRACTION
+
+    def exhausted(self) -> bool:
+        return self.fraction_used() >= 1.0
+
+
+def llm_reply_position(agent) -> int:
+    """
+    Reply-list position just above `agent`'s built-in LLM reply.
+
+    Replies registered there still let termination checks, max_consecutive_auto_reply,
+    human input and tool/function calls run first.
+    """
+    oai_replies = (autogen.ConversableAgent.generate_oai_reply, autogen.ConversableAgent.a_generate_oai_reply)
+    reply_funcs = [entry["reply_func"] for entry in agent._reply_func_list]
+    return min((i for i, func in enumerate(reply_funcs) if func in oai_replies), default=len(reply_funcs))
+
+
+class ModelRouter:
+    """
+    Route each agent role to a model tier under a per-analysis budget.
+
+    `llm_config(role)` builds the autogen config for a role. `attach(agent, role)`
+    additionally puts a reply function in front of the agent's LLM reply that
+    downgrades to the fast tier once the budget is nearly spent and records
+    latency and token usage per role.
+    """
+
+    def __init__(self, budget: Optional[AnalysisBudget] = None, role_tiers: dict = ROLE_TIERS, stream: bool = False):
+        self.budget = budget or AnalysisBudget()
+        self.role_tiers = role_tiers
+        self.stream = stream
+        self.stats: dict = {}
+        self._clients: dict = {}
+
+    def config_list(self, model: str) -> list:
+        """Config list for a model, from OAI_CONFIG_LIST when present, else OPENAI_API_KEY."""
+        try:
+            config_list = autogen.config_list_from_json("OAI_CONFIG_LIST", filter_dict={"model": [model]})
+        except Exception:
+            config_list = []
+        return config_list or [{"model": model, "api_key": open_ai_api_key}]
+
+    def tier_for(self, role: str) -> str:
+        if self.budget.nearly_spent():
+            return "fast"
+        return self.role_tiers.get(role, "standard")
+
+    def llm_config(self, role: str, tier: Optional[str] = None) -> dict:
+        config = {"seed": 42, "config_list": self.config_list(MODEL_TIERS[tier or self.tier_for(role)])}
+        if self.stream:
+            config["stream"] = True
+        return config
+
+    def _client(self, tier: str):
+        if tier not in self._clients:
+            self._clients[tier] = autogen.OpenAIWrapper(**self.llm_config("", tier))
+        return self._clients[tier]
+
+    def attach(self, agent, role: str) -> None:
+        """Route `agent`'s LLM replies through this router under `role`."""
+        def routed_reply(recipient, messages=None, sender=None, config=None):
+            if self.budget.exhausted():
+                return True, f"Analysis budget exhausted ({self.budget.tokens} tokens, {self.budget.elapsed():.0f}s); stopping."
+            tier = self.tier_for(role)
+            client = self._client(tier)
+            prompt_before, completion_before = _total_tokens(client)
+            started = time.monotonic()
+            final, reply = recipient.generate_oai_reply(messages, sender, config=client)
+            prompt_after, completion_after = _total_tokens(client)
+            self._record(role, MODEL_TIERS[tier], time.monotonic() - started,
+                         prompt_after - prompt_before, completion_after - completion_before)
+            return final, reply
+
+        agent.register_reply([autogen.Agent, None], routed_reply, position=llm_reply_position(agent))
+
+    def _record(self, role: str, model: str, seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+        stats = self.stats.setdefault(role, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "models": set()})
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["models"].add(model)
+        self.budget.tokens += prompt_tokens + completion_tokens
+
+    def report(self) -> dict:
+        """Per-role calls, latency, tokens and models used, plus budget consumption."""
+        roles = {
+            role: {**stats, "seconds": round(stats["seconds"], 3), "models": sorted(stats["models"])}
+            for role, stats in self.stats.items()
+        }
+        return {"roles": roles, "tokens": self.budget.tokens, "elapsed_seconds": round(self.budget.elapsed(), 3)}
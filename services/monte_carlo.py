@@ -0,0 +1,188 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+import numpy as np
+
+from services.options_pricing import black_scholes_merton_vectorized
+
+# Default process count for simulations; 0 or 1 forces the serial path.
+MC_WORKERS = int(os.getenv("MC_WORKERS", os.cpu_count() or 1))
+
+# Paths simulated per chunk; bounds peak memory at roughly CHUNK_PATHS * legs floats.
+CHUNK_PATHS = 250_000
+
+
+def legs_to_arrays(legs: Iterable) -> dict:
+    """Convert OptionLeg models into per-leg arrays."""
+    legs = list(legs)
+    return {
+        "is_call": np.array([leg.option_type == 'call' for leg in legs]),
+        "strike": np.array([leg.strike for leg in legs], dtype=float),
+        "quantity": np.array([leg.quantity for leg in legs], dtype=float),
+        "premium": np.array([leg.premium for leg in legs], dtype=float),
+        "time_to_expiry": np.array([np.nan if leg.time_to_expiry is None else leg.time_to_expiry for leg in legs]),
+    }
+
+
+def _log_increment(rng, n, dt, r, sigma, jump_intensity, jump_mean, jump_std):
+    """Draw log-price increments over dt under GBM, with Merton jumps when jump_intensity > 0."""
+    compensator = jump_intensity * (np.exp(jump_mean + 0.5 * jump_std ** 2) - 1)
+    drift = (r - compensator - 0.5 * sigma ** 2) * dt
+    increment = drift + sigma * np.sqrt(dt) * rng.standard_normal(n)
+    if jump_intensity > 0:
+        jumps = rng.poisson(jump_intensity * dt, n)
+        increment += jumps * jump_mean + np.sqrt(jumps) * jump_std * rng.standard_normal(n)
+    return increment
+
+
+def simulate_chunk(
+    seed: np.random.SeedSequence,
+    n_paths: int,
+    spot: float,
+    horizon: float,
+    r: float,
+    sigma: float,
+    steps: int = 1,
+    touch_levels: tuple = (),
+    jump_intensity: float = 0.0,
+    jump_mean: float = 0.0,
+    jump_std: float = 0.0,
+) -> tuple:
+    """
+    Simulate one chunk of price paths.
+
+    Paths are stepped in place, so only the running price, minimum and
+    maximum are kept per path regardless of the number of steps.
+
+    Returns:
+        tuple: (terminal prices, touch counts per level)
+    """
+    rng = np.random.default_rng(seed)
+    dt = horizon / steps
+    log_price = np.full(n_paths, np.log(spot))
+    running_min = running_max = None
+    if touch_levels:
+        running_min = log_price.copy()
+        running_max = log_price.copy()
+
+    for _ in range(steps):
+        log_price += _log_increment(rng, n_paths, dt, r, sigma, jump_intensity, jump_mean, jump_std)
+        if touch_levels:
+            np.minimum(running_min, log_price, out=running_min)
+            np.maximum(running_max, log_price, out=running_max)
+
+    touches = np.zeros(len(touch_levels), dtype=np.int64)
+    for i, level in enumerate(touch_levels):
+        hit = running_max >= np.log(level) if level >= spot else running_min <= np.log(level)
+        touches[i] = np.count_nonzero(hit)
+    return np.exp(log_price), touches
+
+
+def evaluate_legs(terminal: np.ndarray, legs: dict, horizon: float, r: float, sigma: float) -> np.ndarray:
+    """
+    Value every leg against every simulated price and return the P&L per path.
+
+    Legs expiring at the horizon pay intrinsic value; legs with time left are
+    marked with Black-Scholes at `sigma`. Horizon values are discounted at `r`
+    before the premium (paid today) is subtracted, so P&L is in today's money.
+    """
+    remaining = legs["time_to_expiry"] - horizon
+    live = np.isfinite(remaining) & (remaining > 0)
+    sign = np.where(legs["is_call"], 1.0, -1.0)
+    values = np.maximum(sign * (terminal[:, None] - legs["strike"]), 0.0)
+    if live.any():
+        values[:, live] = black_scholes_merton_vectorized(
+            terminal[:, None], legs["strike"][live], remaining[live], r, sigma, legs["is_call"][live]
+        )
+    return (np.exp(-r * horizon) * values - legs["premium"]) @ legs["quantity"]
+
+
+def _run_chunk(seed, n_paths, spot, horizon, r, sigma, legs, steps, touch_levels, jump_params):
+    """Process-pool entry point: simulate a chunk and return its P&L and touch counts."""
+    terminal, touches = simulate_chunk(seed, n_paths, spot, horizon, r, sigma, steps, touch_levels, **jump_params)
+    return evaluate_legs(terminal, legs, horizon, r, sigma), touches
+
+
+def simulate_strategy(
+    legs: Iterable,
+    spot: float,
+    horizon: float,
+    r: float,
+    sigma: float,
+    n_paths: int = 1_000_000,
+    seed: Optional[int] = None,
+    steps: int = 1,
+    touch_levels: Iterable[float] = (),
+    confidence: float = 0.95,
+    jump_intensity: float = 0.0,
+    jump_mean: float = 0.0,
+    jump_std: float = 0.0,
+    workers: Optional[int] = None,
+    chunk_paths: int = CHUNK_PATHS,
+) -> dict:
+    """
+    Estimate the P&L distribution of a multi-leg option position by Monte Carlo.
+
+    Args:
+        legs (Iterable[OptionLeg]): Position legs
+        spot (float): Current underlying price
+        horizon (float): Evaluation horizon in years
+        r (float): Risk-free interest rate
+        sigma (float): Volatility of the underlying
+        n_paths (int): Number of simulated paths
+        seed (int): Root seed; each chunk gets an independent spawned stream
+        steps (int): Time steps per path; > 1 is needed for touch probabilities
+        touch_levels (Iterable[float]): Price levels to report touch probabilities for
+        confidence (float): VaR / CVaR confidence level
+        jump_intensity (float): Merton jumps per year; 0 disables jumps
+        jump_mean (float): Mean log jump size
+        jump_std (float): Log jump size standard deviation
+        workers (int): Process count, defaults to MC_WORKERS; <= 1 runs serially
+        chunk_paths (int): Paths per chunk
+
+    Returns:
+        dict: probability_of_profit, expected_pnl, pnl_std, var, cvar (as positive losses),
+            touch_probabilities and n_paths; P&L is discounted to today (see `evaluate_legs`)
+
+    Raises:
+        ValueError: When n_paths, steps or sigma is not positive, or horizon is negative
+    """
+    if n_paths <= 0:
+        raise ValueError(f"n_paths must be positive, got {n_paths}")
+    if steps <= 0:
+        raise ValueError(f"steps must be positive, got {steps}")
+    if horizon < 0:
+        raise ValueError(f"horizon must not be negative, got {horizon}")
+    if sigma <= 0:
+        raise ValueError(f"sigma must be positive, got {sigma}")
+    legs = legs_to_arrays(legs)
+    touch_levels = tuple(float(level) for level in touch_levels)
+    jump_params = {"jump_intensity": jump_intensity, "jump_mean": jump_mean, "jump_std": jump_std}
+    workers = MC_WORKERS if workers is None else workers
+
+    sizes = [chunk_paths] * (n_paths // chunk_paths)
+    if n_paths % chunk_paths:
+        sizes.append(n_paths % chunk_paths)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, n, spot, horizon, r, sigma, legs, steps, touch_levels, jump_params) for s, n in zip(seeds, sizes)]
+
+    if workers <= 1 or len(sizes) == 1:
+        results = [_run_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as executor:
+            results = list(executor.map(_run_chunk, *zip(*args)))
+
+    pnl = np.concatenate([chunk for chunk, _ in results])
+    touches = np.sum([counts for _, counts in results], axis=0) if touch_levels else []
+    n_tail = max(int(np.ceil((1 - confidence) * len(pnl))), 1)
+    tail = np.partition(pnl, n_tail - 1)[:n_tail]
+    return {
+        "n_paths": len(pnl),
+        "probability_of_profit": float(np.mean(pnl > 0)),
+        "expected_pnl": float(pnl.mean()),
+        "pnl_std": float(pnl.std()),
+        "var": float(-tail.max()),
+        "cvar": float(-tail.mean()),
+        "touch_probabilities": {level: float(count) / len(pnl) for level, count in zip(touch_levels, touches)},
+    }
@@ -1,5 +1,6 @@
 import numpy as np
 from scipy.stats import norm
+from scipy.special import ndtr
 
 def black_scholes_merton(S, K, T, r, sigma, option_type='call'):
     """
@@ -25,3 +26,300 @@ def black_scholes_merton(S, K, T, r, sigma, option_type='call'):
         price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
 
     return price
+
+
+def black_scholes_merton_vectorized(S, K, T, r, sigma, is_call):
+    """
+    Price an array of European options in one pass.
+
+    Args:
+        S (array_like): Underlying prices
+        K (array_like): Strike prices
+        T (array_like): Times to maturity (in years)
+        r (array_like): Risk-free interest rates
+        sigma (array_like): Volatilities
+        is_call (array_like): True for calls, False for puts
+
+    Returns:
+        np.ndarray: Option prices
+    """
+    S, K, T, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, sigma))
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    discounted_k = K * np.exp(-r * T)
+    call = S * ndtr(d1) - discounted_k * ndtr(d2)
+    put = discounted_k * ndtr(-d2) - S * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_volatility_vectorized(price, S, K, T, r, is_call, low=1e-3, high=5.0, tol=1e-6, max_iter=60, model=None):
+    """
+    Solve implied volatility for an array of options at once.
+
+    Uses Newton steps safeguarded by a per-option bisection bracket, so every
+    contract converges or is reported as NaN without raising.
+
+    Args:
+        price (array_like): Observed option prices
+        S (array_like): Underlying prices
+        K (array_like): Strike prices
+        T (array_like): Times to maturity (in years)
+        r (float): Risk-free interest rate
+        is_call (array_like): True for calls, False for puts
+        low (float): Lower volatility bound
+        high (float): Upper volatility bound
+        tol (float): Price tolerance
+        max_iter (int): Maximum iterations
+        model (str): Pricing model name from PRICING_MODELS, defaults to Black-Scholes
+
+    Returns:
+        np.ndarray: Implied volatilities, NaN where the price is outside the bracket
+    """
+    if model not in (None, "black_scholes"):
+        return _implied_volatility_model(get_pricing_model(model), price, S, K, T, r, is_call, low, high, tol)
+
+    price, S, K, T, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, S, K, T)), np.asarray(is_call, dtype=bool)
+    )
+    shape = price.shape
+    price, S, K, T, is_call = (a.ravel() for a in (price, S, K, T, is_call))
+
+    valid = (price > 0) & (S > 0) & (K > 0) & (T > 0)
+    T = np.where(valid, T, 1.0)
+    lo = np.full(price.shape, low)
+    hi = np.full(price.shape, high)
+    valid &= black_scholes_merton_vectorized(S, K, T, r, lo, is_call) <= price
+    valid &= black_scholes_merton_vectorized(S, K, T, r, hi, is_call) >= price
+
+    sigma = np.full(price.shape, 0.3)
+    idx = np.nonzero(valid)[0]
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        s, k, t, sig = S[idx], K[idx], T[idx], sigma[idx]
+        diff = black_scholes_merton_vectorized(s, k, t, r, sig, is_call[idx]) - price[idx]
+        sqrt_t = np.sqrt(t)
+        d1 = (np.log(s / k) + (r + 0.5 * sig ** 2) * t) / (sig * sqrt_t)
+        vega = s * sqrt_t * np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+
+        lo[idx] = np.where(diff < 0, sig, lo[idx])
+        hi[idx] = np.where(diff > 0, sig, hi[idx])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = sig - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo[idx]) | (step >= hi[idx])
+        sigma[idx] = np.where(bisect, 0.5 * (lo[idx] + hi[idx]), step)
+        idx = idx[~(np.abs(diff) < tol)]
+
+    return np.where(valid, sigma, np.nan).reshape(shape)
+
+
+def black_76(F, K, T, r, sigma, is_call):
+    """
+    Price an array of European options on futures using the Black-76 model.
+
+    Args:
+        F (array_like): Futures (forward) prices
+        K (array_like): Strike prices
+        T (array_like): Times to maturity (in years)
+        r (array_like): Risk-free interest rates
+        sigma (array_like): Volatilities
+        is_call (array_like): True for calls, False for puts
+
+    Returns:
+        np.ndarray: Option prices
+    """
+    F, K, T, sigma = (np.asarray(x, dtype=float) for x in (F, K, T, sigma))
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(F / K) + 0.5 * sigma ** 2 * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    discount = np.exp(-r * T)
+    call = discount * (F * ndtr(d1) - K * ndtr(d2))
+    put = discount * (K * ndtr(-d2) - F * ndtr(-d1))
+    return np.where(is_call, call, put)
+
+
+def black_scholes_greeks(S, K, T, r, sigma, is_call, carry=None):
+    """
+    Prices and first-order greeks for arrays of European options (generalized Black-Scholes).
+
+    Args:
+        S (array_like): Underlying prices
+        K (array_like): Strike prices
+        T (array_like): Times to maturity (in years); expired options get intrinsic value and zero greeks
+        r (array_like): Risk-free interest rates
+        sigma (array_like): Volatilities
+        is_call (array_like): True for calls, False for puts
+        carry (array_like): Cost of carry b; r (the default) is Black-Scholes, 0 is Black-76
+
+    Returns:
+        dict: 'price', 'delta', 'gamma', 'vega' (per 1.00 vol) and 'theta' (per year) arrays
+    """
+    S, K, T, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, sigma))
+    r = np.asarray(r, dtype=float)
+    b = r if carry is None else np.asarray(carry, dtype=float)
+    live = T > 0
+    t = np.where(live, T, 1.0)
+    vol = np.where(live, sigma, 1.0)
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(S / K) + (b + 0.5 * vol ** 2) * t) / (vol * sqrt_t)
+    d2 = d1 - vol * sqrt_t
+    carry_discount = np.exp((b - r) * t)
+    discount = np.exp(-r * t)
+    pdf = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+    sign = np.where(is_call, 1.0, -1.0)
+
+    price = sign * (S * carry_discount * ndtr(sign * d1) - K * discount * ndtr(sign * d2))
+    delta = sign * carry_discount * ndtr(sign * d1)
+    gamma = carry_discount * pdf / (S * vol * sqrt_t)
+    vega = S * carry_discount * pdf * sqrt_t
+    theta = (-S * carry_discount * pdf * vol / (2 * sqrt_t)
+             - sign * (b - r) * S * carry_discount * ndtr(sign * d1)
+             - sign * r * K * discount * ndtr(sign * d2))
+
+    intrinsic = np.maximum(sign * (S - K), 0.0)
+    zero = np.zeros_like(price)
+    return {
+        "price": np.where(live, price, intrinsic),
+        "delta": np.where(live, delta, np.where(intrinsic > 0, sign, 0.0)),
+        "gamma": np.where(live, gamma, zero),
+        "vega": np.where(live, vega, zero),
+        "theta": np.where(live, theta, zero),
+    }
+
+
+def _peizer_pratt(z, n):
+    """Peizer-Pratt method 2 inversion used by the Leisen-Reimer tree."""
+    return 0.5 + np.sign(z) * np.sqrt(0.25 - 0.25 * np.exp(-(z / (n + 1 / 3 + 0.1 / (n + 1))) ** 2 * (n + 1 / 6)))
+
+
+def binomial_price(S, K, T, r, sigma, is_call, steps=101, method="lr", american=True):
+    """
+    Price an array of options on a recombining binomial tree.
+
+    Every contract gets its own tree parameters, and each backward step
+    updates all contracts' nodes in one array operation.
+
+    Args:
+        S (array_like): Underlying prices
+        K (array_like): Strike prices
+        T (array_like): Times to maturity (in years)
+        r (float): Risk-free interest rate
+        sigma (array_like): Volatilities
+        is_call (array_like): True for calls, False for puts
+        steps (int): Tree steps; rounded up to odd for Leisen-Reimer
+        method (str): 'crr' (Cox-Ross-Rubinstein) or 'lr' (Leisen-Reimer)
+        american (bool): Allow early exercise
+
+    Returns:
+        np.ndarray: Option prices
+    """
+    S, K, T, sigma, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S, K, T, sigma)), np.asarray(is_call, dtype=bool)
+    )
+    shape = S.shape
+    S, K, T, sigma, is_call = (a.ravel()[:, None] for a in (S, K, T, sigma, is_call))
+    if method == "lr" and steps % 2 == 0:
+        steps += 1
+
+    dt = T / steps
+    growth = np.exp(r * dt)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "crr":
+            up = np.exp(sigma * np.sqrt(dt))
+            down = 1 / up
+            p = (growth - down) / (up - down)
+            # CRR breaks down when sigma * sqrt(dt) < r * dt; report those contracts as NaN.
+            p = np.where((p >= 0) & (p <= 1), p, np.nan)
+        elif method == "lr":
+            sqrt_t = np.sqrt(T)
+            d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+            d2 = d1 - sigma * sqrt_t
+            p = _peizer_pratt(d2, steps)
+            up = growth * _peizer_pratt(d1, steps) / p
+            down = (growth - p * up) / (1 - p)
+        else:
+            raise ValueError(f"Unknown binomial method: {method!r}")
+
+    sign = np.where(is_call, 1.0, -1.0)
+    discount = 1 / growth
+    j = np.arange(steps + 1)
+    nodes = S * up ** j * down ** (steps - j)
+    values = np.maximum(sign * (nodes - K), 0.0)
+    for _ in range(steps):
+        values = discount * (p * values[:, 1:] + (1 - p) * values[:, :-1])
+        if american:
+            nodes = nodes[:, :-1] / down
+            np.maximum(values, sign * (nodes - K), out=values)
+    return values[:, 0].reshape(shape)
+
+
+def _implied_volatility_model(pricer, price, S, K, T, r, is_call, low, high, tol, max_iter=20, bump=1e-4):
+    """
+    Solve implied volatility under an arbitrary vectorized pricer.
+
+    Seeds from the Black-Scholes solution and refines with finite-difference
+    Newton steps inside a bisection bracket, so only a handful of full
+    pricer evaluations (e.g. lattices) are needed.
+    """
+    price, S, K, T, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, S, K, T)), np.asarray(is_call, dtype=bool)
+    )
+    shape = price.shape
+    price, S, K, T, is_call = (a.ravel() for a in (price, S, K, T, is_call))
+
+    valid = (price > 0) & (S > 0) & (K > 0) & (T > 0)
+    T = np.where(valid, T, 1.0)
+    lo = np.full(price.shape, low)
+    hi = np.full(price.shape, high)
+    # Lattices can degenerate at the lower bound; NaN there means "no lower-bound violation".
+    valid &= ~(pricer(S, K, T, r, lo, is_call) > price)
+    valid &= pricer(S, K, T, r, hi, is_call) >= price
+
+    seed = implied_volatility_vectorized(price, S, K, T, r, is_call, low, high)
+    sigma = np.where(np.isfinite(seed), seed, 0.3)
+    idx = np.nonzero(valid)[0]
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        s, k, t, c, sig = S[idx], K[idx], T[idx], is_call[idx], sigma[idx]
+        diff = pricer(s, k, t, r, sig, c) - price[idx]
+        vega = (pricer(s, k, t, r, sig + bump, c) - price[idx] - diff) / bump
+
+        lo[idx] = np.where(diff < 0, sig, lo[idx])
+        hi[idx] = np.where(diff > 0, sig, hi[idx])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = sig - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo[idx]) | (step >= hi[idx])
+        sigma[idx] = np.where(bisect, 0.5 * (lo[idx] + hi[idx]), step)
+        idx = idx[~(np.abs(diff) < tol)]
+
+    return np.where(valid, sigma, np.nan).reshape(shape)
+
+
+# Pricing model registry: every entry takes (S, K, T, r, sigma, is_call) and returns prices.
+# S is spot, except for "black_76", which prices futures-settled options from the futures price.
+PRICING_MODELS = {
+    "black_scholes": black_scholes_merton_vectorized,
+    "black_76": black_76,
+    "binomial_crr": lambda S, K, T, r, sigma, is_call: binomial_price(S, K, T, r, sigma, is_call, method="crr"),
+    "binomial_lr": lambda S, K, T, r, sigma, is_call: binomial_price(S, K, T, r, sigma, is_call, method="lr"),
+}
+
+# Per-underlying overrides of DEFAULT_MODEL, e.g. {"SPY": "binomial_lr"} to price listed equity
+# options as American. Empty: every underlying prices with Black-Scholes unless a caller opts in.
+# Strategies price with "black_76" when given a futures price (models/model_base.OptionsStrategy).
+UNDERLYING_MODELS = {}
+DEFAULT_MODEL = "black_scholes"
+
+
+def get_pricing_model(name):
+    """Look up a pricing function in PRICING_MODELS by name."""
+    if name not in PRICING_MODELS:
+        raise ValueError(f"Unknown pricing model {name!r}; expected one of {sorted(PRICING_MODELS)}")
+    return PRICING_MODELS[name]
+
+
+def model_for_underlying(underlying):
+    """Return the pricing model name configured for an underlying symbol."""
+    return UNDERLYING_MODELS.get(underlying.upper().split("-")[0], DEFAULT_MODEL)
@@ -0,0 +1,267 @@
+import threading
+import time
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from models.model_option_leg import OptionLeg
+from services.options_pricing import black_scholes_greeks
+
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+GREEKS = ("delta", "gamma", "vega", "theta")
+RISK_FIELDS = ("value", "pnl", *GREEKS)
+
+_LEG_COLUMNS = {
+    "strike": float, "expiry": float, "is_call": bool, "quantity": float,
+    "premium": float, "multiplier": float, "volatility": float, "strategy": np.int32,
+}
+
+
+class _Block:
+    """Open legs on one underlying, as parallel arrays, plus their last valuation."""
+
+    def __init__(self, underlying: str, spot: float, risk_free_rate: float):
+        self.underlying = underlying
+        self.spot = spot
+        self.risk_free_rate = risk_free_rate
+        self.legs = {name: np.empty(0, dtype=dtype) for name, dtype in _LEG_COLUMNS.items()}
+        self.per_leg = {name: np.empty(0) for name in RISK_FIELDS}
+        self.totals = dict.fromkeys(RISK_FIELDS, 0.0)
+        self.by_strategy: dict = {}
+        self.updated = None
+
+    def __len__(self) -> int:
+        return len(self.legs["strike"])
+
+    def append(self, columns: dict) -> None:
+        self.legs = {name: np.concatenate([self.legs[name], np.asarray(columns[name], dtype=dtype)]) for name, dtype in _LEG_COLUMNS.items()}
+
+    def keep(self, mask: np.ndarray) -> None:
+        self.legs = {name: values[mask] for name, values in self.legs.items()}
+
+    def revalue(self, now: float, n_strategies: int) -> None:
+        """Reprice every leg of this underlying and rebuild its aggregates."""
+        legs = self.legs
+        T = np.maximum(legs["expiry"] - now, 0.0) / SECONDS_PER_YEAR
+        greeks = black_scholes_greeks(self.spot, legs["strike"], T, self.risk_free_rate, legs["volatility"], legs["is_call"])
+        size = legs["quantity"] * legs["multiplier"]
+        self.per_leg = {
+            "value": greeks["price"] * size,
+            "pnl": (greeks["price"] - legs["premium"]) * size,
+            **{name: greeks[name] * size for name in GREEKS},
+        }
+        self.totals = {name: float(values.sum()) for name, values in self.per_leg.items()}
+        sums = {name: np.bincount(legs["strategy"], weights=values, minlength=n_strategies) for name, values in self.per_leg.items()}
+        present = np.unique(legs["strategy"])
+        self.by_strategy = {int(code): {name: float(sums[name][code]) for name in RISK_FIELDS} for code in present}
+        self.updated = now
+
+
+class PositionBook:
+    """
+    Open option legs across underlyings with incrementally maintained risk.
+
+    Legs live in one array block per underlying. A price or vol update for an
+    underlying revalues only that block (one vectorized greeks pass) and
+    replaces its contribution to the per-strategy and total aggregates; the
+    other underlyings keep their last valuation.
+    """
+
+    def __init__(self, risk_free_rate: float = 0.0398):
+        self.risk_free_rate = risk_free_rate
+        self._blocks: dict = {}
+        self._strategies: list = []
+        self._strategy_codes: dict = {}
+        self._lock = threading.Lock()
+        self.last_update_ms: dict = {}
+
+    def _strategy_code(self, name: str) -> int:
+        if name not in self._strategy_codes:
+            self._strategy_codes[name] = len(self._strategies)
+            self._strategies.append(name)
+        return self._strategy_codes[name]
+
+    # --- Positions --------------------------------------------------------
+
+    def add_strategy(
+        self,
+        name: str,
+        legs: Iterable[OptionLeg],
+        volatility,
+        spot: Union[float, dict, None] = None,
+        opened_at: Optional[float] = None,
+        multiplier: float = 1.0,
+    ) -> int:
+        """
+        Add a strategy's legs to the book.
+
+        Args:
+            name (str): Strategy name; adding to an existing name extends it
+            legs (Iterable[OptionLeg]): Legs with time_to_expiry set; premium is the entry price
+            volatility (float or list): Volatility for every leg, or one per leg
+            spot (float or dict): Underlying price, or prices keyed by underlying; required
+                for each underlying not yet in the book (a single float prices at most one)
+            opened_at (float): Unix time the legs were opened, defaults to now
+            multiplier (float): Contract multiplier (e.g. 100 for listed equity options)
+
+        Returns:
+            int: Number of legs added
+
+        Raises:
+            ValueError: On a leg without time_to_expiry, a non-positive volatility or spot, or a
+                new underlying without a price; the book is left unchanged
+        """
+        legs = list(legs)
+        if any(leg.time_to_expiry is None for leg in legs):
+            raise ValueError("Every leg needs a time_to_expiry")
+        opened_at = time.time() if opened_at is None else opened_at
+        vols = np.broadcast_to(np.asarray(volatility, dtype=float), (len(legs),))
+        # NaN greeks from one bad leg would poison its underlying's totals and the whole book's
+        if not np.all(vols > 0):
+            raise ValueError("Volatility must be positive")
+        spots = {underlying.upper(): price for underlying, price in spot.items()} if isinstance(spot, dict) else None
+        given = list(spots.values()) if spots is not None else [] if spot is None else [spot]
+        if not all(price is not None and price > 0 for price in given):
+            raise ValueError("Spot must be positive")
+        by_underlying: dict = {}
+        for leg, vol in zip(legs, vols):
+            by_underlying.setdefault(leg.underlying.upper(), []).append((leg, vol))
+        with self._lock:
+            # Check every underlying has a price before touching the book, so a failed add leaves it unchanged
+            new = [underlying for underlying in by_underlying if underlying not in self._blocks]
+            if spots is None and spot is not None and len(new) > 1:
+                raise ValueError(f"One spot cannot price {', '.join(new)}; pass spot per underlying")
+            new_spots = {}
+            for underlying in new:
+                price = spots.get(underlying) if spots is not None else spot
+                if price is None:
+                    raise ValueError(f"No price for {underlying}; pass spot")
+                new_spots[underlying] = float(price)
+            code = self._strategy_code(name)
+            for underlying, rows in by_underlying.items():
+                block = self._blocks.get(underlying)
+                if block is None:
+                    block = self._blocks[underlying] = _Block(underlying, new_spots[underlying], self.risk_free_rate)
+                block.append({
+                    "strike": [leg.strike for leg, _ in rows],
+                    "expiry": [opened_at + leg.time_to_expiry * SECONDS_PER_YEAR for leg, _ in rows],
+                    "is_call": [leg.option_type == "call" for leg, _ in rows],
+                    "quantity": [leg.quantity for leg, _ in rows],
+                    "premium": [leg.premium for leg, _ in rows],
+                    "multiplier": [multiplier] * len(rows),
+                    "volatility": [vol for _, vol in rows],
+                    "strategy": [code] * len(rows),
+                })
+                block.revalue(time.time(), len(self._strategies))
+        return len(legs)
+
+    def remove_strategy(self, name: str) -> int:
+        """Close every leg of a strategy. Returns the number of legs removed."""
+        with self._lock:
+            code = self._strategy_codes.get(name)
+            if code is None:
+                return 0
+            removed = 0
+            for underlying in list(self._blocks):
+                block = self._blocks[underlying]
+                mask = block.legs["strategy"] != code
+                removed += int((~mask).sum())
+                block.keep(mask)
+                if len(block) == 0:
+                    del self._blocks[underlying]
+                else:
+                    block.revalue(time.time(), len(self._strategies))
+            return removed
+
+    # --- Market updates ---------------------------------------------------
+
+    def on_tick(self, underlying: str, spot: Optional[float] = None, volatility=None, vol_shift: float = 0.0, now: Optional[float] = None) -> dict:
+        """
+        Apply a price and/or vol update to one underlying and revalue only its legs.
+
+        Args:
+            underlying (str): Underlying symbol
+            spot (float): New underlying price
+            volatility (float or array): New vol for every leg (or one per leg in book order)
+            vol_shift (float): Parallel shift added to the legs' current vols
+            now (float): Valuation time (unix seconds), defaults to now
+
+        Returns:
+            dict: The underlying's updated totals, with the update time in milliseconds
+
+        Raises:
+            KeyError: When the book holds nothing on `underlying`
+            ValueError: On a non-positive spot or volatility
+        """
+        if spot is not None and not spot > 0:
+            raise ValueError("Spot must be positive")
+        if volatility is not None and not np.all(np.asarray(volatility, dtype=float) > 0):
+            raise ValueError("Volatility must be positive")
+        started = time.perf_counter()
+        with self._lock:
+            block = self._blocks.get(underlying.upper())
+            if block is None:
+                raise KeyError(f"No positions on {underlying}")
+            if spot is not None:
+                block.spot = float(spot)
+            if volatility is not None:
+                block.legs["volatility"] = np.broadcast_to(np.asarray(volatility, dtype=float), (len(block),)).copy()
+            if vol_shift:
+                block.legs["volatility"] = np.maximum(block.legs["volatility"] + vol_shift, 1e-4)
+            block.revalue(time.time() if now is None else now, len(self._strategies))
+            elapsed = (time.perf_counter() - started) * 1000
+            self.last_update_ms[block.underlying] = round(elapsed, 3)
+            return {"underlying": block.underlying, "spot": block.spot, "legs": len(block), **block.totals, "update_ms": round(elapsed, 3)}
+
+    # --- Risk -------------------------------------------------------------
+
+    def underlying_risk(self, underlying: str) -> dict:
+        with self._lock:
+            block = self._blocks.get(underlying.upper())
+            if block is None:
+                raise KeyError(f"No positions on {underlying}")
+            return {"underlying": block.underlying, "spot": block.spot, "legs": len(block), **block.totals,
+                    "valued_at": block.updated, "update_ms": self.last_update_ms.get(block.underlying)}
+
+    def strategy_risk(self) -> dict:
+        """Risk per strategy, summed over the underlyings it holds."""
+        with self._lock:
+            totals: dict = {}
+            for block in self._blocks.values():
+                for code, risk in block.by_strategy.items():
+                    strategy = totals.setdefault(self._strategies[code], dict.fromkeys(RISK_FIELDS, 0.0))
+                    for name, value in risk.items():
+                        strategy[name] += value
+            return totals
+
+    def risk(self) -> dict:
+        """Total, per-underlying and per-strategy value, P&L and greeks from the latest valuations."""
+        with self._lock:
+            underlyings = {
+                name: {"spot": block.spot, "legs": len(block), **block.totals, "valued_at": block.updated}
+                for name, block in self._blocks.items()
+            }
+        total = {name: sum(u[name] for u in underlyings.values()) for name in RISK_FIELDS}
+        total["legs"] = sum(u["legs"] for u in underlyings.values())
+        return {"total": total, "underlyings": underlyings, "strategies": self.strategy_risk()}
+
+    def scenario_legs(self, now: Optional[float] = None) -> dict:
+        """Every open leg as flat arrays for services.scenario_engine, at each underlying's latest spot."""
+        now = time.time() if now is None else now
+        with self._lock:
+            blocks = list(self._blocks.values())
+            columns = {
+                "spot": [np.full(len(b), b.spot) for b in blocks],
+                "strike": [b.legs["strike"] for b in blocks],
+                "time_to_expiry": [np.maximum(b.legs["expiry"] - now, 0.0) / SECONDS_PER_YEAR for b in blocks],
+                "size": [b.legs["quantity"] * b.legs["multiplier"] for b in blocks],
+                "volatility": [b.legs["volatility"] for b in blocks],
+                "sign": [np.where(b.legs["is_call"], 1.0, -1.0) for b in blocks],
+                "carry": [np.full(len(b), b.risk_free_rate) for b in blocks],
+                "rate": [np.full(len(b), b.risk_free_rate) for b in blocks],
+            }
+        return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in columns.items()}
+
+
+# Process-wide book served by the API.
+position_book = PositionBook()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# Quantization ticks: price in cents, volatility and rates in basis points, time in minutes (in years).
+PRICE_TICK = float(os.getenv("PRICING_PRICE_TICK", 0.01))
+VOL_TICK = float(os.getenv("PRICING_VOL_TICK", 0.0001))
+RATE_TICK = float(os.getenv("PRICING_RATE_TICK", 0.0001))
+TIME_TICK = float(os.getenv("PRICING_TIME_TICK", 1 / (365 * 24 * 60)))
+
+PRICING_CACHE_SIZE = int(os.getenv("PRICING_CACHE_SIZE", 10000))
+PRICING_CACHE_TTL = float(os.getenv("PRICING_CACHE_TTL", 60))
+
+_MISSING = object()
+
+
+def quantize(value: float, tick: float) -> int:
+    """Index of the tick nearest `value`; equal indexes share a cache entry."""
+    return int(round(float(value) / tick))
+
+
+class QuantizedCache:
+    """
+    Thread-safe LRU cache with a time-to-live, for pure pricing results.
+
+    Callers build keys from quantized inputs, so requests that differ by less
+    than a tick share one entry.
+    """
+
+    def __init__(self, maxsize: int = PRICING_CACHE_SIZE, ttl: float = PRICING_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires, value = entry
+            if expires < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries), "maxsize": self.maxsize, "ttl_seconds": self.ttl,
+                "hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions, "expirations": self.expirations,
+            }
+
+
+def pricing_key(
+    kind: str,
+    underlying_price: float,
+    strike_price: float,
+    time_to_expiry: float,
+    risk_free_rate: float,
+    volatility: float,
+    futures_price: Optional[float] = None,
+    *extra: Hashable,
+) -> tuple:
+    """Cache key for a pricing input set, quantized to the configured ticks."""
+    return (
+        kind,
+        quantize(underlying_price, PRICE_TICK),
+        quantize(strike_price, PRICE_TICK),
+        quantize(time_to_expiry, TIME_TICK),
+        quantize(risk_free_rate, RATE_TICK),
+        quantize(volatility, VOL_TICK),
+        None if futures_price is None else quantize(futures_price, PRICE_TICK),
+        *extra,
+    )
+
+
+def snap(values: dict) -> dict:
+    """Round pricing inputs onto their ticks so a cached result is exactly the result for its key."""
+    ticks = {"underlying_price": PRICE_TICK, "strike_price": PRICE_TICK, "time_to_expiry": TIME_TICK,
+             "risk_free_rate": RATE_TICK, "volatility": VOL_TICK, "futures_price": PRICE_TICK}
+    return {
+        name: quantize(value, ticks[name]) * ticks[name] if name in ticks and value is not None else value
+        for name, value in values.items()
+    }
+
+
+def etag_for(key: Hashable) -> str:
+    """Strong ETag for a cache key; results are pure functions of their key."""
+    return '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+
+
+# Per-leg option prices and whole-strategy results.
+option_price_cache = QuantizedCache()
+strategy_cache = QuantizedCache()
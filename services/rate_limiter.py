@@ -0,0 +1,442 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Hashable, Optional
+
+import requests
+
+# Request priorities; lower runs first.
+LIVE = 0
+NORMAL = 5
+BACKFILL = 10
+
+# Default quotas as (requests, per seconds, burst). The burst is how many calls may go out
+# back to back before the rest are paced at the refill rate; per-minute and daily quotas
+# get a real burst so an interactive session is not spaced out over the whole window.
+# Override with RATE_LIMIT_<PROVIDER> (or RATE_LIMIT_<PROVIDER>_<ENDPOINT>) = "requests/seconds[/burst]".
+DEFAULT_LIMITS = {
+    "polygon": (5, 60, 5),
+    "alphavantage": (5, 60, 5),
+    "marketdata": (50, 60, 5),
+    "coinapi": (100, 86400, 10),
+    "coinbase": (10, 1, 5),
+    "dolthub": (5, 1, 2),
+    "yahoo": (2, 1, 2),
+}
+
+# Processes spending each quota independently: the API process plus the job workers. Every
+# process has its own scheduler, so each gets this share of a quota (rate and burst).
+# Set RATE_LIMIT_PROCESSES=1 for a standalone script.
+RATE_LIMIT_PROCESSES = int(os.getenv("RATE_LIMIT_PROCESSES", int(os.getenv("JOB_WORKERS", 2)) + 1))
+
+# Longest a LIVE or NORMAL call may be expected to queue before it fails with
+# RateLimitExceeded instead of parking its caller; BACKFILL calls queue without a limit.
+MAX_QUEUE_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))
+
+# Threads executing dispatched requests across all providers.
+RATE_LIMIT_WORKERS = int(os.getenv("RATE_LIMIT_WORKERS", 16))
+
+# Times a request answered with HTTP 429 is put back in the queue before the 429 is returned.
+MAX_THROTTLE_RETRIES = 3
+
+
+class RateLimitExceeded(Exception):
+    """A call would have queued longer than its maximum wait under the provider's quota."""
+
+
+def _parse_limit(value: str) -> tuple:
+    parts = [float(p) for p in value.split("/")]
+    return parts[0], parts[1], parts[2] if len(parts) > 2 else 1
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float, tokens: int = 1) -> float:
+        """Seconds until `tokens` tokens are available (0 when they are available now)."""
+        self._refill(now)
+        refill = max(tokens - self.tokens, 0.0) / self.rate
+        if now < self.blocked_until:
+            return max(self.blocked_until - now, refill)
+        return refill
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds: float, now: float) -> None:
+        """Stop issuing tokens for `seconds` after the provider pushed back."""
+        self.tokens = 0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class _Entry:
+    __slots__ = ("key", "coalesce_key", "fn", "future", "priority", "submitted", "max_wait", "attempts", "dispatched", "waiters", "token")
+
+    def __init__(self, key: str, coalesce_key: Optional[Hashable], fn: Callable, priority: int, max_wait: float):
+        self.key = key
+        self.coalesce_key = coalesce_key
+        self.fn = fn
+        self.future: Future = Future()
+        self.priority = priority
+        self.submitted = time.monotonic()
+        self.max_wait = max_wait
+        self.attempts = 0
+        self.dispatched = False
+        self.waiters = 1
+        self.token = None
+
+
+class RateLimitScheduler:
+    """
+    Central scheduler for outbound data-provider calls.
+
+    Each provider (or provider:endpoint) has a token bucket and a priority
+    queue. A dispatcher thread releases the highest-priority waiting call as
+    soon as its bucket has a token, so callers never exceed a quota and a live
+    request overtakes queued backfill. Identical calls submitted while one is
+    queued or running share its result. Responses with status 429 block the
+    bucket for the Retry-After period and the call is queued again. A call that
+    would wait longer than its maximum wait fails with RateLimitExceeded.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[dict] = None,
+        workers: int = RATE_LIMIT_WORKERS,
+        processes: int = RATE_LIMIT_PROCESSES,
+        max_wait: float = MAX_QUEUE_WAIT,
+    ):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.processes = max(processes, 1)
+        self.max_wait = max_wait
+        self._buckets: dict = {}
+        self._queues: dict = {}
+        self._in_flight: dict = {}
+        self._stats: dict = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rate-limited")
+        self._local = threading.local()
+        self._dispatcher: Optional[threading.Thread] = None
+
+    # --- Configuration ----------------------------------------------------
+
+    def _limit_for(self, key: str) -> tuple:
+        env = os.getenv(f"RATE_LIMIT_{key.upper().replace(':', '_').replace('-', '_')}")
+        if env:
+            return _parse_limit(env)
+        if key in self.limits:
+            return self.limits[key]
+        provider = key.split(":")[0]
+        env = os.getenv(f"RATE_LIMIT_{provider.upper()}")
+        if env:
+            return _parse_limit(env)
+        if provider not in self.limits:
+            raise ValueError(f"No rate limit configured for provider {provider!r}")
+        return self.limits[provider]
+
+    def _key(self, provider: str, endpoint: Optional[str]) -> str:
+        """Bucket key: 'provider:endpoint' when that endpoint has its own limit, else the provider."""
+        if not endpoint:
+            return provider
+        key = f"{provider}:{endpoint}"
+        if key in self.limits or os.getenv(f"RATE_LIMIT_{provider.upper()}_{endpoint.upper().replace('-', '_')}"):
+            return key
+        return provider
+
+    def _bucket(self, key: str) -> TokenBucket:
+        if key not in self._buckets:
+            requests_allowed, seconds, burst = self._limit_for(key)
+            self._buckets[key] = TokenBucket(requests_allowed / seconds / self.processes, burst / self.processes)
+            self._queues[key] = []
+            self._stats[key] = {"submitted": 0, "coalesced": 0, "dispatched": 0, "throttled": 0, "rejected": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        return self._buckets[key]
+
+    @contextmanager
+    def priority(self, priority: int):
+        """Default priority for calls submitted from this thread inside the block."""
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    # --- Submission -------------------------------------------------------
+
+    def submit(
+        self,
+        provider: str,
+        fn: Callable,
+        endpoint: Optional[str] = None,
+        priority: Optional[int] = None,
+        coalesce_key: Optional[Hashable] = None,
+        max_wait: Optional[float] = None,
+    ) -> Future:
+        """
+        Queue `fn()` under a provider's quota.
+
+        Args:
+            provider (str): Provider name, a key of the configured limits
+            fn (Callable): Zero-argument call performing the request
+            endpoint (str): Optional endpoint with its own bucket (configured as 'provider:endpoint')
+            priority (int): LIVE, NORMAL or BACKFILL; defaults to the thread's `priority()` block, else NORMAL
+            coalesce_key (Hashable): Calls with equal keys share one in-flight request
+            max_wait (float): Longest the call may queue, in seconds; defaults to the
+                scheduler's max_wait, or no limit for BACKFILL
+
+        Returns:
+            Future: Resolves to fn's return value, or fails with RateLimitExceeded when the
+                call would queue longer than max_wait. Each caller gets its own future, so
+                cancelling it only withdraws that caller; the call is dropped once no
+                caller is left waiting and it has not been dispatched yet
+        """
+        if priority is None:
+            priority = getattr(self._local, "priority", None)
+        if priority is None:
+            priority = NORMAL
+        if max_wait is None:
+            max_wait = self.max_wait if priority < BACKFILL else float("inf")
+        key = self._key(provider, endpoint)
+        with self._condition:
+            self._bucket(key)
+            self._stats[key]["submitted"] += 1
+            existing = self._in_flight.get((key, coalesce_key)) if coalesce_key is not None else None
+            if existing is not None:
+                existing.waiters += 1
+                self._stats[key]["coalesced"] += 1
+                if priority < existing.priority and not existing.dispatched:
+                    existing.priority = priority
+                    self._push(existing)
+                    self._condition.notify()
+                return self._waiter(existing)
+
+            entry = _Entry(key, coalesce_key, fn, priority, max_wait)
+            expected = self._expected_wait(entry, time.monotonic())
+            if expected > max_wait:
+                # Fail now rather than parking the caller until the quota refills
+                self._stats[key]["rejected"] += 1
+                entry.future.set_exception(RateLimitExceeded(
+                    f"{key}: next slot in {expected:.0f}s exceeds the {max_wait:.0f}s maximum wait"
+                ))
+                return self._waiter(entry)
+            if coalesce_key is not None:
+                self._in_flight[(key, coalesce_key)] = entry
+                entry.future.add_done_callback(lambda _: self._forget(entry))
+            self._push(entry)
+            self._ensure_dispatcher()
+            self._condition.notify()
+            return self._waiter(entry)
+
+    def call(self, provider: str, fn: Callable, **kwargs):
+        """Blocking `submit(...).result()`."""
+        return self.submit(provider, fn, **kwargs).result()
+
+    def submit_request(
+        self,
+        provider: str,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        priority: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue an HTTP request; identical (non-streamed) GETs in flight are coalesced.
+
+        Extra keyword arguments go to `requests.Session.request`.
+
+        Returns:
+            Future: Resolves to the `requests.Response`
+        """
+        session = session or _session
+        coalesce_key = None
+        # A streamed body can only be read once, so streamed GETs are never shared
+        if method.upper() == "GET" and not kwargs.get("stream"):
+            coalesce_key = (url, repr(sorted((kwargs.get("params") or {}).items())), repr(sorted((kwargs.get("headers") or {}).items())))
+        fn = lambda: session.request(method, url, **kwargs)
+        return self.submit(provider, fn, endpoint=endpoint, priority=priority, coalesce_key=coalesce_key)
+
+    def request(self, provider: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Blocking `submit_request`."""
+        return self.submit_request(provider, method, url, **kwargs).result()
+
+    async def arequest(self, provider: str, method: str, url: str, **kwargs) -> requests.Response:
+        """`request` for async callers; waits on the scheduler without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit_request(provider, method, url, **kwargs))
+
+    def _waiter(self, entry: _Entry) -> Future:
+        """A caller's own future, resolved from the entry's shared one."""
+        future = Future()
+
+        def relay(shared: Future) -> None:
+            # False when this caller already cancelled; otherwise the future can no longer be cancelled
+            if shared.cancelled() or not future.set_running_or_notify_cancel():
+                return
+            if shared.exception() is not None:
+                future.set_exception(shared.exception())
+            else:
+                future.set_result(shared.result())
+
+        def withdraw(own: Future) -> None:
+            if own.cancelled():
+                self._release(entry)
+
+        future.add_done_callback(withdraw)
+        entry.future.add_done_callback(relay)
+        return future
+
+    def _release(self, entry: _Entry) -> None:
+        """Drop a cancelled caller; an undispatched call nobody waits for any more is cancelled."""
+        with self._condition:
+            entry.waiters -= 1
+            if entry.waiters <= 0 and not entry.dispatched:
+                entry.future.cancel()
+
+    def _push(self, entry: _Entry) -> None:
+        """Queue `entry` at its current priority; any earlier heap item for it becomes stale."""
+        entry.token = next(self._sequence)
+        heapq.heappush(self._queues[entry.key], (entry.priority, entry.token, entry))
+
+    def _expected_wait(self, entry: _Entry, now: float) -> float:
+        """Seconds until `entry` would be dispatched, behind the queued calls of equal or higher priority."""
+        ahead = sum(1 for item in self._queues[entry.key] if not self._stale(item) and item[0] <= entry.priority)
+        return self._buckets[entry.key].wait_time(now, tokens=ahead + 1)
+
+    def _expire(self, queue: list, now: float) -> None:
+        """Fail queued calls that have waited past their maximum wait (e.g. overtaken by live calls)."""
+        for item in queue:
+            entry = item[2]
+            if not self._stale(item) and now - entry.submitted > entry.max_wait:
+                self._stats[entry.key]["rejected"] += 1
+                entry.future.set_exception(RateLimitExceeded(f"{entry.key}: queued longer than the {entry.max_wait:.0f}s maximum wait"))
+
+    @staticmethod
+    def _stale(item: tuple) -> bool:
+        _, token, entry = item
+        return entry.dispatched or token != entry.token or entry.future.done()
+
+    def _forget(self, entry: _Entry) -> None:
+        with self._condition:
+            if self._in_flight.get((entry.key, entry.coalesce_key)) is entry:
+                del self._in_flight[(entry.key, entry.coalesce_key)]
+
+    # --- Dispatch ---------------------------------------------------------
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="rate-limit-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self) -> None:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                timeout = None
+                for key, queue in self._queues.items():
+                    while queue and self._stale(queue[0]):
+                        heapq.heappop(queue)
+                    if not queue:
+                        continue
+                    wait = self._buckets[key].wait_time(now)
+                    if wait > 0:
+                        self._expire(queue, now)
+                        deadlines = [item[2].submitted + item[2].max_wait - now for item in queue if not self._stale(item)]
+                        wait = min([wait, *deadlines])
+                        timeout = wait if timeout is None else min(timeout, wait)
+                        continue
+                    _, _, entry = heapq.heappop(queue)
+                    self._buckets[key].consume(now)
+                    self._dispatch(entry, now)
+                    timeout = 0
+                if timeout != 0:
+                    self._condition.wait(timeout)
+
+    def _dispatch(self, entry: _Entry, now: float) -> None:
+        entry.dispatched = True
+        entry.attempts += 1
+        stats = self._stats[entry.key]
+        waited = now - entry.submitted
+        stats["dispatched"] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        self._executor.submit(self._run, entry)
+
+    def _run(self, entry: _Entry) -> None:
+        try:
+            result = entry.fn()
+        except Exception as e:
+            entry.future.set_exception(e)
+            return
+        if getattr(result, "status_code", None) == 429 and entry.attempts <= MAX_THROTTLE_RETRIES:
+            self._requeue_throttled(entry, result)
+            return
+        entry.future.set_result(result)
+
+    def _requeue_throttled(self, entry: _Entry, response) -> None:
+        try:
+            retry_after = float(response.headers.get("Retry-After", 0))
+        except (TypeError, ValueError):
+            retry_after = 0.0
+        with self._condition:
+            bucket = self._buckets[entry.key]
+            retry_after = retry_after or 1 / bucket.rate
+            print(f"{entry.key} returned 429; pausing {retry_after:.1f}s and retrying (attempt {entry.attempts})")
+            self._stats[entry.key]["throttled"] += 1
+            bucket.block(retry_after, time.monotonic())
+            entry.dispatched = False
+            if entry.waiters <= 0:
+                entry.future.cancel()
+                return
+            if retry_after > entry.max_wait:
+                self._stats[entry.key]["rejected"] += 1
+                entry.future.set_exception(RateLimitExceeded(
+                    f"{entry.key}: provider asked to retry in {retry_after:.0f}s, beyond the {entry.max_wait:.0f}s maximum wait"
+                ))
+                return
+            entry.submitted = time.monotonic()
+            self._push(entry)
+            self._condition.notify()
+
+    # --- Reporting --------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Per provider/endpoint: queue depth, in-flight calls, counts and average/max queue wait."""
+        with self._condition:
+            report = {}
+            for key, stats in self._stats.items():
+                depth = sum(1 for item in self._queues[key] if not self._stale(item))
+                report[key] = {
+                    **stats,
+                    "queue_depth": depth,
+                    "in_flight": sum(1 for (k, _), entry in self._in_flight.items() if k == key and entry.dispatched),
+                    "avg_wait_seconds": round(stats["wait_seconds"] / stats["dispatched"], 3) if stats["dispatched"] else 0.0,
+                    "wait_seconds": round(stats["wait_seconds"], 3),
+                    "max_wait_seconds": round(stats["max_wait_seconds"], 3),
+                }
+            return report
+
+
+_session = requests.Session()
+
+# Process-wide scheduler shared by every fetcher.
+scheduler = RateLimitScheduler()
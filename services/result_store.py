@@ -0,0 +1,408 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+# SQLite file holding computed chains and finished analyses.
+RESULT_DB_PATH = os.getenv("RESULT_DB_PATH", "data/results.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chain_iv (
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    expiration TEXT NOT NULL,
+    strike REAL NOT NULL,
+    call_put TEXT NOT NULL,
+    bid REAL,
+    ask REAL,
+    implied_volatility REAL,
+    delta REAL,
+    gamma REAL,
+    vega REAL,
+    theta REAL,
+    PRIMARY KEY (ticker, as_of, expiration, strike, call_put)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chain_iv_strike ON chain_iv (ticker, strike, call_put, as_of);
+
+CREATE TABLE IF NOT EXISTS chain_inputs (
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    digest TEXT,
+    PRIMARY KEY (ticker, as_of)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS iv_daily (
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    forward REAL,
+    atm_30 REAL, atm_60 REAL, atm_90 REAL, atm_180 REAL,
+    rr25_30 REAL, bf25_30 REAL, term_slope REAL,
+    rank_30 REAL, pct_30 REAL, rank_90 REAL, pct_90 REAL, rank_252 REAL, pct_252 REAL,
+    term_structure TEXT,
+    PRIMARY KEY (ticker, as_of)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS iv_latest (
+    ticker TEXT PRIMARY KEY,
+    as_of TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    expiry TEXT,
+    spot REAL,
+    context TEXT,
+    recommendation TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_ticker ON analyses (ticker, as_of, expiry);
+
+CREATE TABLE IF NOT EXISTS candidates (
+    analysis_id TEXT NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    expiration TEXT NOT NULL,
+    outer_put REAL, inner_put REAL, inner_call REAL, outer_call REAL,
+    credit REAL, max_loss REAL, score REAL,
+    PRIMARY KEY (analysis_id, rank)
+);
+CREATE INDEX IF NOT EXISTS candidates_ticker ON candidates (ticker, as_of, expiration);
+
+CREATE TABLE IF NOT EXISTS transcripts (
+    analysis_id TEXT NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    agent TEXT,
+    content TEXT,
+    PRIMARY KEY (analysis_id, seq)
+);
+"""
+
+_GREEK_COLUMNS = ("delta", "gamma", "vega", "theta")
+_CHAIN_COLUMNS = ("expiration", "strike", "call_put", "bid", "ask", "implied_volatility", *_GREEK_COLUMNS)
+_IV_COLUMNS = (
+    "forward", "atm_30", "atm_60", "atm_90", "atm_180", "rr25_30", "bf25_30", "term_slope",
+    "rank_30", "pct_30", "rank_90", "pct_90", "rank_252", "pct_252",
+)
+_IV_RANK_COLUMNS = _IV_COLUMNS[8:]
+_CANDIDATE_COLUMNS = ("expiration", "outer_put", "inner_put", "inner_call", "outer_call", "credit", "max_loss", "score")
+
+
+def _date_range(column: str, start: Optional[str], end: Optional[str]) -> tuple:
+    """SQL fragment and params restricting `column` to [start, end]; ISO dates compare as text."""
+    clauses, params = [], []
+    if start:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        clauses.append(f"{column} <= ?")
+        params.append(end)
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+def chain_rows(ticker: str, as_of: str, contracts: list) -> list:
+    """Solved contracts reduced to the rows `ResultStore.get_chain` returns, in the same order."""
+    rows = [
+        {
+            "date": as_of, "act_symbol": ticker, "expiration": str(c["expiration"]), "strike": float(c["strike"]),
+            "call_put": c["call_put"].capitalize(), "bid": float(c.get("bid") or 0), "ask": float(c.get("ask") or 0),
+            **{name: c.get(name) for name in ("implied_volatility", *_GREEK_COLUMNS)},
+        }
+        for c in contracts
+    ]
+    rows.sort(key=lambda row: (row["expiration"], row["strike"], row["call_put"]))
+    return rows
+
+
+class ResultStore:
+    """
+    Persistent store of chain IVs, candidate spreads, transcripts and recommendations.
+
+    Rows are keyed and indexed by ticker, as-of date and expiry so reporting and
+    re-analysis read back previous results instead of recomputing them.
+    """
+
+    def __init__(self, path: str = RESULT_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Stores created before greeks were kept
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(chain_iv)")}
+            for name in _GREEK_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE chain_iv ADD COLUMN {name} REAL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Chains -----------------------------------------------------------
+
+    @staticmethod
+    def _insert_chain(conn: sqlite3.Connection, ticker: str, as_of: str, contracts: list, inputs: Optional[str] = None) -> int:
+        conn.execute("DELETE FROM chain_iv WHERE ticker = ? AND as_of = ?", (ticker, as_of))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO chain_iv (ticker, as_of, {', '.join(_CHAIN_COLUMNS)}) VALUES ({', '.join('?' * (len(_CHAIN_COLUMNS) + 2))})",
+            (
+                (ticker, as_of, str(c["expiration"]), float(c["strike"]), c["call_put"].capitalize(),
+                 float(c.get("bid") or 0), float(c.get("ask") or 0), c.get("implied_volatility"),
+                 *(c.get(name) for name in _GREEK_COLUMNS))
+                for c in contracts
+            ),
+        )
+        conn.execute("INSERT OR REPLACE INTO chain_inputs (ticker, as_of, digest) VALUES (?, ?, ?)", (ticker, as_of, inputs))
+        return len(contracts)
+
+    def save_chain(self, ticker: str, as_of: str, contracts: list, inputs: Optional[str] = None) -> int:
+        """
+        Replace the stored chain for (ticker, as_of) with solved `contracts`.
+
+        `inputs` is a digest of the quotes and spot the chain was solved from; see `chain_inputs`.
+        """
+        with self._connect() as conn:
+            return self._insert_chain(conn, ticker, as_of, contracts, inputs)
+
+    def chain_inputs(self, ticker: str, as_of: str) -> Optional[str]:
+        """Digest of the inputs the stored (ticker, as_of) chain was solved from, if recorded."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT digest FROM chain_inputs WHERE ticker = ? AND as_of = ?", (ticker, as_of)).fetchone()
+        return row["digest"] if row else None
+
+    def save_chains(self, chains: Iterable[tuple]) -> int:
+        """Bulk version of `save_chain` for batch runs: one transaction for all (ticker, as_of, contracts)."""
+        with self._connect() as conn:
+            return sum(self._insert_chain(conn, ticker, as_of, contracts) for ticker, as_of, contracts in chains)
+
+    def get_chain(self, ticker: str, as_of: str, expiration: Optional[str] = None) -> list:
+        """Stored chain for (ticker, as_of), optionally one expiry, as `chain_rows` dicts."""
+        query = f"SELECT {', '.join(_CHAIN_COLUMNS)} FROM chain_iv WHERE ticker = ? AND as_of = ?"
+        params = [ticker, as_of]
+        if expiration:
+            query += " AND expiration = ?"
+            params.append(expiration)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY expiration, strike, call_put", params).fetchall()
+        return [{"date": as_of, "act_symbol": ticker, **dict(row)} for row in rows]
+
+    def iv_history(
+        self,
+        ticker: str,
+        strike: float,
+        call_put: Optional[str] = None,
+        expiration: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> list:
+        """
+        Implied volatility of one strike across stored as-of dates.
+
+        Args:
+            ticker (str): Underlying symbol
+            strike (float): Strike price
+            call_put (str): 'Call' or 'Put'; both when omitted
+            expiration (str): Restrict to one expiry
+            start (str): First as-of date (YYYY-MM-DD), inclusive
+            end (str): Last as-of date (YYYY-MM-DD), inclusive
+
+        Returns:
+            list: Dicts with as_of, expiration, call_put and implied_volatility, oldest first
+        """
+        query = "SELECT as_of, expiration, call_put, implied_volatility FROM chain_iv WHERE ticker = ? AND strike = ?"
+        params = [ticker, float(strike)]
+        if call_put:
+            query += " AND call_put = ?"
+            params.append(call_put.capitalize())
+        if expiration:
+            query += " AND expiration = ?"
+            params.append(expiration)
+        clause, range_params = _date_range("as_of", start, end)
+        with self._connect() as conn:
+            rows = conn.execute(query + clause + " ORDER BY as_of, expiration", params + range_params).fetchall()
+        return [dict(row) for row in rows]
+
+    def chain_dates(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> list:
+        """As-of dates with a stored chain for a ticker, oldest first."""
+        clause, params = _date_range("as_of", start, end)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT DISTINCT as_of FROM chain_iv WHERE ticker = ?{clause} ORDER BY as_of", [ticker, *params]).fetchall()
+        return [row["as_of"] for row in rows]
+
+    # --- IV history -------------------------------------------------------
+
+    def save_iv_days(self, days: Iterable[dict]) -> int:
+        """
+        Upsert daily IV summaries (services.iv_analytics) and advance each ticker's latest day.
+
+        Args:
+            days (Iterable[dict]): 'ticker', 'as_of', any of the iv_daily metric columns and
+                'term_structure' (list of per-expiry dicts)
+        """
+        days = list(days)
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO iv_daily (ticker, as_of, {', '.join(_IV_COLUMNS)}, term_structure) "
+                f"VALUES (?, ?{', ?' * len(_IV_COLUMNS)}, ?)",
+                (
+                    (day["ticker"], day["as_of"], *(day.get(c) for c in _IV_COLUMNS), json.dumps(day.get("term_structure") or []))
+                    for day in days
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO iv_latest (ticker, as_of) VALUES (?, ?) "
+                "ON CONFLICT (ticker) DO UPDATE SET as_of = excluded.as_of WHERE excluded.as_of > iv_latest.as_of",
+                ((day["ticker"], day["as_of"]) for day in days),
+            )
+        return len(days)
+
+    def save_iv_ranks(self, ticker: str, ranks: dict) -> int:
+        """Set the rank and percentile columns of stored days, given as {as_of: {column: value}}."""
+        with self._connect() as conn:
+            conn.executemany(
+                f"UPDATE iv_daily SET {', '.join(f'{c} = ?' for c in _IV_RANK_COLUMNS)} WHERE ticker = ? AND as_of = ?",
+                ((*(values.get(c) for c in _IV_RANK_COLUMNS), ticker, as_of) for as_of, values in ranks.items()),
+            )
+        return len(ranks)
+
+    @staticmethod
+    def _iv_day(row: sqlite3.Row, term_structure: bool) -> dict:
+        day = dict(row)
+        if term_structure:
+            day["term_structure"] = json.loads(day["term_structure"] or "[]")
+        else:
+            day.pop("term_structure", None)
+        return day
+
+    def iv_days(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None, term_structure: bool = False) -> list:
+        """Daily IV summaries for a ticker within [start, end], oldest first."""
+        clause, params = _date_range("as_of", start, end)
+        columns = f"ticker, as_of, {', '.join(_IV_COLUMNS)}" + (", term_structure" if term_structure else "")
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {columns} FROM iv_daily WHERE ticker = ?{clause} ORDER BY as_of", [ticker, *params]).fetchall()
+        return [self._iv_day(row, term_structure) for row in rows]
+
+    def latest_iv(self, tickers: Optional[Iterable[str]] = None, term_structure: bool = False) -> list:
+        """Each ticker's most recent IV summary (all tickers when omitted), read through iv_latest without scanning history."""
+        query = f"SELECT d.ticker, d.as_of, {', '.join('d.' + c for c in _IV_COLUMNS)}" + (", d.term_structure" if term_structure else "")
+        query += " FROM iv_latest l JOIN iv_daily d ON d.ticker = l.ticker AND d.as_of = l.as_of"
+        params: list = []
+        if tickers is not None:
+            params = list(tickers)
+            if not params:
+                return []
+            query += f" WHERE l.ticker IN ({', '.join('?' * len(params))})"
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY d.ticker", params).fetchall()
+        return [self._iv_day(row, term_structure) for row in rows]
+
+    # --- Analyses ---------------------------------------------------------
+
+    @staticmethod
+    def _insert_analysis(conn: sqlite3.Connection, analysis: dict) -> str:
+        analysis_id = analysis.get("id") or uuid.uuid4().hex
+        ticker, as_of = analysis["ticker"], analysis["as_of"]
+        conn.execute(
+            "INSERT INTO analyses (id, ticker, as_of, expiry, spot, context, recommendation, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (analysis_id, ticker, as_of, analysis.get("expiry"), analysis.get("spot"),
+             analysis.get("context"), analysis.get("recommendation"), time.time()),
+        )
+        conn.executemany(
+            f"INSERT INTO candidates (analysis_id, rank, ticker, as_of, {', '.join(_CANDIDATE_COLUMNS)}) "
+            f"VALUES (?, ?, ?, ?{', ?' * len(_CANDIDATE_COLUMNS)})",
+            (
+                (analysis_id, rank, ticker, as_of, *(candidate.get(c) for c in _CANDIDATE_COLUMNS))
+                for rank, candidate in enumerate(analysis.get("candidates") or [])
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO transcripts (analysis_id, seq, agent, content) VALUES (?, ?, ?, ?)",
+            (
+                (analysis_id, seq, message.get("agent") or message.get("name"), message.get("content"))
+                for seq, message in enumerate(analysis.get("transcript") or [])
+            ),
+        )
+        return analysis_id
+
+    def save_analysis(self, analysis: dict) -> str:
+        """
+        Store one finished analysis.
+
+        Args:
+            analysis (dict): 'ticker' and 'as_of', plus optional 'expiry', 'spot', 'context',
+                'recommendation', 'candidates' and 'transcript' (messages with 'name' or 'agent' and 'content')
+
+        Returns:
+            str: The analysis id
+        """
+        with self._connect() as conn:
+            return self._insert_analysis(conn, analysis)
+
+    def save_analyses(self, analyses: Iterable[dict]) -> list:
+        """Bulk version of `save_analysis`: one transaction for the whole batch."""
+        with self._connect() as conn:
+            return [self._insert_analysis(conn, analysis) for analysis in analyses]
+
+    def recommendations(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None, expiry: Optional[str] = None) -> list:
+        """Stored recommendations for a ticker, optionally within an as-of date range or for one expiry, oldest first."""
+        query = "SELECT id, ticker, as_of, expiry, spot, recommendation, created_at FROM analyses WHERE ticker = ?"
+        params = [ticker]
+        if expiry:
+            query += " AND expiry = ?"
+            params.append(expiry)
+        clause, range_params = _date_range("as_of", start, end)
+        with self._connect() as conn:
+            rows = conn.execute(query + clause + " ORDER BY as_of, created_at", params + range_params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_analysis(self, ticker: str, as_of: str, expiry: Optional[str] = None) -> Optional[dict]:
+        """Most recent stored analysis for (ticker, as_of[, expiry]) with its candidates and transcript."""
+        query = "SELECT * FROM analyses WHERE ticker = ? AND as_of = ?"
+        params = [ticker, as_of]
+        if expiry:
+            query += " AND expiry = ?"
+            params.append(expiry)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return {**dict(row), "candidates": self.candidates(row["id"]), "transcript": self.transcript(row["id"])}
+
+    def candidates(self, analysis_id: str) -> list:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_CANDIDATE_COLUMNS)} FROM candidates WHERE analysis_id = ? ORDER BY rank", (analysis_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def transcript(self, analysis_id: str) -> list:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT agent, content FROM transcripts WHERE analysis_id = ? ORDER BY seq", (analysis_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: Optional[ResultStore] = None
+
+
+def get_result_store() -> ResultStore:
+    """Process-wide ResultStore on RESULT_DB_PATH, created on first use."""
+    global _store
+    if _store is None:
+        _store = ResultStore()
+    return _store
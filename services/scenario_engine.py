@@ -0,0 +1,236 @@
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+from scipy.special import ndtr
+
+from services.bar_series import BarSeries
+
+# Upper bound on (spot shocks x vol shocks x legs) priced in one block, to cap peak memory.
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+DEFAULT_SPOT_SHOCKS = np.linspace(-0.25, 0.25, 51)
+DEFAULT_VOL_SHOCKS = np.linspace(-0.10, 0.10, 21)
+DEFAULT_DAYS = np.array([0, 1, 2, 5, 10, 20, 30])
+
+
+def scenario_legs(
+    spot,
+    strike,
+    time_to_expiry,
+    is_call,
+    size,
+    volatility,
+    risk_free_rate: float = 0.0398,
+    carry: Optional[float] = None,
+) -> dict:
+    """
+    Per-leg arrays for the scenario engine.
+
+    Args:
+        spot (array_like): Underlying price of each leg
+        strike (array_like): Strikes
+        time_to_expiry (array_like): Years to expiry
+        is_call (array_like): True for calls
+        size (array_like): Signed quantity times contract multiplier
+        volatility (array_like): Current vol of each leg
+        risk_free_rate (float): Risk-free rate
+        carry (float): Cost of carry; defaults to risk_free_rate, 0 when `spot` is a futures price (Black-76)
+
+    Returns:
+        dict: Column name to array
+    """
+    n = len(np.atleast_1d(strike))
+    columns = {
+        "spot": spot, "strike": strike, "time_to_expiry": time_to_expiry,
+        "size": size, "volatility": volatility,
+    }
+    legs = {name: np.broadcast_to(np.asarray(values, dtype=float), (n,)).copy() for name, values in columns.items()}
+    legs["sign"] = np.where(np.broadcast_to(np.asarray(is_call, dtype=bool), (n,)), 1.0, -1.0)
+    legs["carry"] = np.full(n, risk_free_rate if carry is None else carry)
+    legs["rate"] = np.full(n, risk_free_rate)
+    return legs
+
+
+def legs_from_strategy(strategy) -> dict:
+    """Scenario legs for an OptionsStrategy (models/), at its own spot (or futures price) and volatility."""
+    legs = strategy.legs()
+    futures = strategy.model_name() == "black_76"
+    return scenario_legs(
+        strategy.futures_price if futures else strategy.underlying_price,
+        [leg.strike for leg in legs],
+        [leg.time_to_expiry if leg.time_to_expiry is not None else strategy.time_to_expiry for leg in legs],
+        [leg.option_type == "call" for leg in legs],
+        [leg.quantity for leg in legs],
+        strategy.volatility,
+        strategy.risk_free_rate,
+        carry=0.0 if futures else None,
+    )
+
+
+def legs_from_book(book, now: Optional[float] = None) -> dict:
+    """Scenario legs for every open leg of a PositionBook, at its latest prices and vols."""
+    return book.scenario_legs(now)
+
+
+def _value(legs: dict, rows: slice, spot_factor: np.ndarray, vol_shift: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    Value of legs[rows] for every (spot factor, vol shift, elapsed days) scenario; shape (spot, vol, days).
+
+    Terms that depend on fewer axes (log-moneyness, discount factors, sigma * sqrt(t)) are computed
+    once at their own shape and broadcast, so only the two normal CDFs run over the full block.
+    """
+    K, size, sign = legs["strike"][rows], legs["size"][rows], legs["sign"][rows]
+    r, b = legs["rate"][rows], legs["carry"][rows]
+    S = legs["spot"][rows] * spot_factor[:, None, None]                       # (spot, 1, legs)
+    log_moneyness = np.log(S / K)
+    sigma = np.maximum(legs["volatility"][rows] + vol_shift, 1e-4)[None]       # (1, vol, legs)
+    intrinsic = np.maximum(sign * (S - K), 0.0) @ size                         # (spot, 1)
+    values = np.empty((len(spot_factor), sigma.shape[1], len(days)))
+    for k, day in enumerate(days):
+        T = legs["time_to_expiry"][rows] - day / 365.0
+        live = T > 0
+        if not live.any():
+            values[:, :, k] = intrinsic
+            continue
+        t = T[live]
+        vol_t = sigma[..., live] * np.sqrt(t)
+        d1 = (log_moneyness[..., live] + b[live] * t) / vol_t + 0.5 * vol_t
+        d2 = d1 - vol_t
+        s = sign[live]
+        price = s * (S[..., live] * np.exp((b[live] - r[live]) * t) * ndtr(s * d1) - K[live] * np.exp(-r[live] * t) * ndtr(s * d2))
+        values[:, :, k] = price @ size[live]
+        if not live.all():
+            values[:, :, k] += np.maximum(sign[~live] * (S[..., ~live] - K[~live]), 0.0) @ size[~live]
+    return values
+
+
+def _check_shocks(spot_shocks: np.ndarray, vol_shocks: np.ndarray, days: np.ndarray) -> None:
+    """Reject shocks that would price at a non-positive spot, before now, or with NaN inputs."""
+    if not (np.all(np.isfinite(spot_shocks)) and np.all(np.isfinite(vol_shocks)) and np.all(np.isfinite(days))):
+        raise ValueError("Shocks and days must be finite")
+    if np.any(spot_shocks <= -1):
+        raise ValueError("Spot shocks must be above -1 (a 100% fall)")
+    if np.any(days < 0):
+        raise ValueError("Days must be non-negative")
+
+
+def _base_value(legs: dict) -> float:
+    if not len(legs["strike"]):
+        return 0.0
+    return float(_value(legs, slice(None), np.ones(1), np.zeros((1, len(legs["strike"]))), np.zeros(1)).sum())
+
+
+def pnl_cube(
+    legs: dict,
+    spot_shocks: Iterable[float] = DEFAULT_SPOT_SHOCKS,
+    vol_shocks: Iterable[float] = DEFAULT_VOL_SHOCKS,
+    days: Iterable[float] = DEFAULT_DAYS,
+    skew_shocks: Optional[Iterable[float]] = None,
+    worst: int = 10,
+) -> dict:
+    """
+    Reprice every leg over a (spot shock x vol shock x time step) grid.
+
+    Args:
+        legs (dict): From `scenario_legs`, `legs_from_strategy` or `legs_from_book`
+        spot_shocks (Iterable[float]): Relative spot moves, e.g. -0.1 for -10%, applied to every underlying
+        vol_shocks (Iterable[float]): Parallel vol shifts in vol points, e.g. 0.05
+        days (Iterable[float]): Calendar days elapsed
+        skew_shocks (Iterable[float]): Per vol shock, extra shift per unit of log(strike / spot);
+            negative values raise downside vols more (a steepening put skew)
+        worst (int): Number of worst scenarios returned
+
+    Returns:
+        dict: 'pnl' cube of shape (spot, vol, days) relative to the current value, the axes,
+            'base_value', 'worst' scenarios and 'elapsed_ms'
+
+    Raises:
+        ValueError: On a spot shock at or below -1, negative days or non-finite shocks
+    """
+    started = time.perf_counter()
+    spot_shocks = np.asarray(list(spot_shocks), dtype=float)
+    vol_shocks = np.asarray(list(vol_shocks), dtype=float)
+    days = np.asarray(list(days), dtype=float)
+    skew = np.zeros_like(vol_shocks) if skew_shocks is None else np.asarray(list(skew_shocks), dtype=float)
+    if skew.shape != vol_shocks.shape:
+        raise ValueError("skew_shocks needs one entry per vol shock")
+    _check_shocks(spot_shocks, np.concatenate([vol_shocks, skew]), days)
+
+    n_legs = len(legs["strike"])
+    base_value = _base_value(legs)
+    cube = np.zeros((len(spot_shocks), len(vol_shocks), len(days)))
+    spot_factor = 1.0 + spot_shocks
+    moneyness = np.log(legs["strike"] / legs["spot"])
+
+    # Legs are priced in blocks so the (spot, vol, legs) temporaries stay bounded
+    block = max(1, MAX_BLOCK_ELEMENTS // max(len(spot_shocks) * len(vol_shocks), 1))
+    for start in range(0, n_legs, block):
+        rows = slice(start, min(start + block, n_legs))
+        vol_shift = vol_shocks[:, None] + skew[:, None] * moneyness[rows][None, :]
+        cube += _value(legs, rows, spot_factor, vol_shift, days)
+    cube -= base_value
+
+    order = np.argsort(cube, axis=None)[:worst]
+    worst_scenarios = [
+        {"spot_shock": float(spot_shocks[i]), "vol_shock": float(vol_shocks[j]), "skew_shock": float(skew[j]),
+         "days": float(days[k]), "pnl": float(cube[i, j, k])}
+        for i, j, k in zip(*np.unravel_index(order, cube.shape))
+    ]
+    return {
+        "spot_shocks": spot_shocks, "vol_shocks": vol_shocks, "skew_shocks": skew, "days": days,
+        "pnl": cube, "base_value": base_value, "worst": worst_scenarios,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def historical_shocks(bars: BarSeries, horizon_days: int = 1, count: int = 10) -> list:
+    """
+    The largest `horizon_days` moves in a price history, as relative spot shocks.
+
+    Args:
+        bars (BarSeries): Daily bars, e.g. from services.market_data_provider
+        horizon_days (int): Bars per move
+        count (int): Number of moves returned, largest absolute move first
+
+    Returns:
+        list: Shocks for `shock_set_pnl`: 'name' (end date of the move), 'spot' (relative move), 'vol' and 'days'
+    """
+    close = bars.close
+    if len(close) <= horizon_days:
+        return []
+    moves = close[horizon_days:] / close[:-horizon_days] - 1.0
+    order = np.argsort(-np.abs(moves))[:count]
+    dates = bars.dates[horizon_days:]
+    return [{"name": str(dates[i]), "spot": float(moves[i]), "vol": 0.0, "days": float(horizon_days)} for i in order]
+
+
+def shock_set_pnl(legs: dict, shocks: Iterable[dict]) -> list:
+    """
+    P&L under each of a list of named shocks, worst first.
+
+    Args:
+        legs (dict): Scenario legs
+        shocks (Iterable[dict]): Each with 'name', 'spot' (relative move) and optional 'vol' and 'days'
+
+    Returns:
+        list: The shocks with their 'pnl' added, sorted ascending by P&L
+
+    Raises:
+        ValueError: On a spot shock at or below -1, negative days or non-finite shocks
+    """
+    shocks = list(shocks)
+    if not shocks:
+        return []
+    _check_shocks(
+        np.array([shock["spot"] for shock in shocks], dtype=float),
+        np.array([shock.get("vol", 0.0) for shock in shocks], dtype=float),
+        np.array([shock.get("days", 0.0) for shock in shocks], dtype=float),
+    )
+    n_legs = len(legs["strike"])
+    base_value = _base_value(legs)
+    results = []
+    for shock in shocks:
+        value = _value(legs, slice(None), np.array([1.0 + shock["spot"]]), np.full((1, n_legs), shock.get("vol", 0.0)), np.array([shock.get("days", 0.0)]))
+        results.append({**shock, "pnl": float(value.sum()) - base_value})
+    return sorted(results, key=lambda result: result["pnl"])
@@ -0,0 +1,92 @@
+from typing import Callable, Optional
+
+# Default iron condor flow: the analyst proposes, the critic reviews, the analyst revises
+# until the proposal is approved (or revisions run out), then the planner summarizes.
+# Each entry maps the last speaker to {outcome of its message: next speaker}; None ends the chat.
+DEFAULT_TRANSITIONS = {
+    "user_proxy": {"default": "StockAnalyst"},
+    "StockAnalyst": {"default": "Critic"},
+    "Critic": {"approved": "Planner", "exhausted": "Planner", "default": "StockAnalyst"},
+    "Planner": {"default": None},
+}
+
+
+def classify_message(message: dict) -> str:
+    """Classify a chat message as 'approved', 'rejected' or 'default' from the critic's verdict prefix."""
+    content = (message.get("content") or "").lstrip()
+    if content.startswith("APPROVED"):
+        return "approved"
+    if content.startswith("REJECTED"):
+        return "rejected"
+    return "default"
+
+
+class TurnPolicy:
+    """
+    Deterministic speaker selection for an autogen GroupChat.
+
+    Pass `policy.select_speaker` as the GroupChat's `speaker_selection_method`
+    to replace the manager's per-round LLM selector call with a table lookup.
+    """
+
+    def __init__(
+        self,
+        transitions: dict = DEFAULT_TRANSITIONS,
+        classify: Callable[[dict], str] = classify_message,
+        reviewer: str = "Critic",
+        max_revisions: int = 3,
+    ):
+        self.transitions = transitions
+        self.classify = classify
+        self.reviewer = reviewer
+        self.max_revisions = max_revisions
+
+    def next_speaker_name(self, last_speaker_name: str, messages: list) -> Optional[str]:
+        """Return the next speaker's name for the conversation so far, or None to terminate."""
+        rule = self.transitions.get(last_speaker_name)
+        if not rule:
+            return None
+
+        outcome = self.classify(messages[-1]) if messages else "default"
+        if last_speaker_name == self.reviewer and outcome == "rejected":
+            rejections = sum(1 for m in messages if m.get("name") == self.reviewer and self.classify(m) == "rejected")
+            if rejections >= self.max_revisions:
+                outcome = "exhausted"
+        return rule.get(outcome, rule.get("default"))
+
+    def select_speaker(self, last_speaker, groupchat):
+        """autogen speaker_selection_method callable."""
+        name = self.next_speaker_name(last_speaker.name, groupchat.messages)
+        if name is None:
+            return None
+        return groupchat.agent_by_name(name)
+
+    def allowed_transitions(self, agents: list) -> dict:
+        """Express the table as autogen `allowed_or_disallowed_speaker_transitions` for graph checks."""
+        by_name = {agent.name: agent for agent in agents}
+        return {
+            by_name[source]: [by_name[target] for target in set(rule.values()) if target]
+            for source, rule in self.transitions.items() if source in by_name
+        }
+
+
+def llm_call_report(messages: list, llm_agents: set, rule_based: bool) -> dict:
+    """
+    Count LLM requests made during a group chat.
+
+    Agent calls are messages from LLM-backed agents, excluding the critic's
+    code-generated APPROVED / REJECTED verdicts. The default 'auto' selector
+    makes one extra call per speaker selection; rule-based selection makes none.
+    """
+    agent_calls = sum(
+        1 for m in messages[1:]
+        if m.get("name") in llm_agents and classify_message(m) == "default"
+    )
+    selections = max(len(messages) - 1, 0)
+    selector_calls = 0 if rule_based else selections
+    return {
+        "agent_llm_calls": agent_calls,
+        "selector_llm_calls": selector_calls,
+        "total_llm_calls": agent_calls + selector_calls,
+        "auto_selector_total": agent_calls + selections,
+    }
@@ -0,0 +1,312 @@
+from datetime import date, datetime, timedelta
+from typing import Optional, Union
+
+import numpy as np
+import pytz
+
+SECONDS_PER_DAY = 24 * 3600
+SECONDS_PER_YEAR = 365.0 * SECONDS_PER_DAY
+
+# Years covered by the precomputed session tables.
+FIRST_YEAR, LAST_YEAR = 1990, 2050
+
+# One-off NYSE closures that no rule produces.
+NYSE_SPECIAL_CLOSURES = [
+    "1994-04-27", "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14", "2004-06-11", "2007-01-02",
+    "2012-10-29", "2012-10-30", "2018-12-05", "2025-01-09",
+]
+
+CRYPTO_UNDERLYINGS = {"ETH", "BTC", "SOL"}
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th `weekday` (Monday=0) of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_sessions(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> tuple:
+    """
+    NYSE full-day holidays and 1pm early closes between two years, from the exchange's rules.
+
+    Returns:
+        tuple: (holidays, half_days) as sorted datetime64[D] arrays
+    """
+    holidays, half_days = set(), set()
+    for year in range(first_year, last_year + 1):
+        new_year = date(year, 1, 1)
+        # A Saturday New Year's Day is not observed on the preceding Friday
+        if new_year.weekday() != 5:
+            holidays.add(_observed(new_year))
+        if year >= 1998:
+            holidays.add(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+        holidays.add(_nth_weekday(year, 2, 0, 3))  # Washington's Birthday
+        holidays.add(_easter(year) - timedelta(days=2))  # Good Friday
+        holidays.add(_nth_weekday(year, 5, 0, -1))  # Memorial Day
+        if year >= 2022:
+            holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+        holidays.add(_observed(date(year, 7, 4)))
+        holidays.add(_nth_weekday(year, 9, 0, 1))  # Labor Day
+        thanksgiving = _nth_weekday(year, 11, 3, 4)
+        holidays.add(thanksgiving)
+        holidays.add(_observed(date(year, 12, 25)))
+
+        half_days.add(thanksgiving + timedelta(days=1))
+        if date(year, 7, 4).weekday() in (1, 2, 3, 4):
+            half_days.add(date(year, 7, 3))
+        if date(year, 12, 25).weekday() in (1, 2, 3, 4):
+            half_days.add(date(year, 12, 24))
+    holidays.update(date.fromisoformat(day) for day in NYSE_SPECIAL_CLOSURES)
+    half_days -= holidays
+    as_days = lambda days: np.array(sorted(days), dtype="datetime64[D]")
+    return as_days(holidays), as_days(half_days)
+
+
+def _us_eastern_dst(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> tuple:
+    """Local dates on which US daylight saving time starts and ends, one entry per year."""
+    starts, ends = [], []
+    for year in range(first_year, last_year + 1):
+        if year >= 2007:
+            starts.append(_nth_weekday(year, 3, 6, 2))
+            ends.append(_nth_weekday(year, 11, 6, 1))
+        else:
+            starts.append(_nth_weekday(year, 4, 6, 1))
+            ends.append(_nth_weekday(year, 10, 6, -1))
+    return np.array(starts, dtype="datetime64[D]"), np.array(ends, dtype="datetime64[D]")
+
+
+def to_days(dates) -> np.ndarray:
+    """Dates (ISO strings, dates, datetimes or datetime64) as a datetime64[D] array, parsed in one pass."""
+    values = np.asarray(dates)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[D]")
+    if values.dtype == object and values.size and isinstance(values.flat[0], datetime):
+        values = np.array([value.date() for value in values.flat]).reshape(values.shape)
+    return values.astype("datetime64[D]")
+
+
+def to_instant(moment: DateLike) -> np.datetime64:
+    """A point in time as UTC datetime64[s]; naive datetimes and strings are taken as UTC."""
+    if isinstance(moment, datetime) and moment.tzinfo is not None:
+        moment = moment.astimezone(pytz.utc).replace(tzinfo=None)
+    return np.datetime64(moment, "s")
+
+
+class TradingCalendar:
+    """
+    Exchange sessions as precomputed day tables, with vectorized date arithmetic.
+
+    Holidays and half days are sorted datetime64[D] arrays handed to numpy's
+    business-day functions, so converting a whole chain's expiries to year
+    fractions or rolling a year of weekly expiries never touches per-row datetimes.
+    Session times are local; the UTC offset comes from a per-year DST table.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        open_time: str = "09:30",
+        close_time: str = "16:00",
+        early_close_time: str = "13:00",
+        expiry_time: Optional[str] = None,
+        holidays: Optional[np.ndarray] = None,
+        half_days: Optional[np.ndarray] = None,
+        weekmask: str = "1111100",
+        timezone: str = "US/Eastern",
+        sessions_per_year: float = 252.0,
+    ):
+        minutes = lambda hhmm: int(hhmm[:2]) * 60 + int(hhmm[3:5])
+        self.name = name
+        self.open_minute = minutes(open_time)
+        self.close_minute = minutes(close_time)
+        self.early_close_minute = minutes(early_close_time)
+        self.expiry_minute = minutes(expiry_time or close_time)
+        self.holidays = np.empty(0, dtype="datetime64[D]") if holidays is None else holidays
+        self.half_days = np.empty(0, dtype="datetime64[D]") if half_days is None else half_days
+        self.weekmask = weekmask
+        self.timezone = timezone
+        self.sessions_per_year = sessions_per_year
+        self.continuous = weekmask == "1111111" and not len(self.holidays)
+        self._busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+        self._dst_start, self._dst_end = _us_eastern_dst() if timezone == "US/Eastern" else (None, None)
+
+    # --- Sessions ---------------------------------------------------------
+
+    def is_session(self, dates) -> np.ndarray:
+        return np.is_busday(to_days(dates), busdaycal=self._busdaycal)
+
+    def is_half_day(self, dates) -> np.ndarray:
+        return np.isin(to_days(dates), self.half_days)
+
+    def sessions_between(self, start, end) -> np.ndarray:
+        """Number of sessions in [start, end), vectorized over either argument."""
+        return np.busday_count(to_days(start), to_days(end), busdaycal=self._busdaycal)
+
+    def roll_forward(self, dates) -> np.ndarray:
+        """The first session on or after each date."""
+        return np.busday_offset(to_days(dates), 0, roll="forward", busdaycal=self._busdaycal)
+
+    def roll_backward(self, dates) -> np.ndarray:
+        """The last session on or before each date."""
+        return np.busday_offset(to_days(dates), 0, roll="backward", busdaycal=self._busdaycal)
+
+    def next_session(self, dates) -> np.ndarray:
+        """The first session strictly after each date."""
+        return np.busday_offset(to_days(dates), 1, roll="backward", busdaycal=self._busdaycal)
+
+    # --- Times ------------------------------------------------------------
+
+    def utc_offset_seconds(self, dates) -> np.ndarray:
+        """Local-minus-UTC offset in seconds for each local date."""
+        days = to_days(dates)
+        if self._dst_start is None:
+            return np.zeros(days.shape, dtype=np.int64)
+        year = days.astype("datetime64[Y]").astype(np.int64) + 1970 - FIRST_YEAR
+        year = np.clip(year, 0, len(self._dst_start) - 1)
+        dst = (days >= self._dst_start[year]) & (days < self._dst_end[year])
+        return np.where(dst, -4 * 3600, -5 * 3600)
+
+    def local_time(self, dates, minute) -> np.ndarray:
+        """UTC datetime64[s] instants of a local clock time (minutes past midnight) on each date."""
+        days = to_days(dates)
+        local = days.astype("datetime64[s]") + (np.asarray(minute, dtype=np.int64) * 60).astype("timedelta64[s]")
+        return local - self.utc_offset_seconds(days).astype("timedelta64[s]")
+
+    def close_minute_on(self, dates) -> np.ndarray:
+        return np.where(self.is_half_day(dates), self.early_close_minute, self.close_minute)
+
+    def expiry_instant(self, expiries) -> np.ndarray:
+        """UTC instants at which options expiring on each date stop trading."""
+        days = to_days(expiries)
+        minute = np.minimum(self.expiry_minute, self.close_minute_on(days))
+        return self.local_time(days, minute)
+
+    def entry_time(self, dates, at: str = "11:00") -> np.ndarray:
+        """UTC instants of local time `at` on the first session on or after each date."""
+        return self.local_time(self.roll_forward(dates), int(at[:2]) * 60 + int(at[3:5]))
+
+    # --- Expiries ---------------------------------------------------------
+
+    def weekly_expiry(self, dates, weekday: int = 4) -> np.ndarray:
+        """
+        The weekly expiry of each date's week: that week's `weekday` (Friday by default),
+        moved to the previous session when it is a holiday.
+        """
+        days = to_days(dates)
+        monday = days - ((days.astype(np.int64) - 4) % 7).astype("timedelta64[D]")  # 1970-01-05 was a Monday
+        return self.roll_backward(monday + np.timedelta64(weekday, "D"))
+
+    def next_expiry(self, as_of: DateLike, weekday: int = 4) -> np.datetime64:
+        """The first weekly expiry that has not yet expired at `as_of`."""
+        moment = to_instant(as_of)
+        expiry = self.weekly_expiry(moment.astype("datetime64[D]"), weekday)
+        if self.expiry_instant(expiry) <= moment:
+            expiry = self.weekly_expiry(moment.astype("datetime64[D]") + 7, weekday)
+        return expiry
+
+    def weekly_expiries(self, start: DateLike, end: DateLike, weekday: int = 4) -> np.ndarray:
+        """Every weekly expiry in [start, end], for backtests over many weeks."""
+        weeks = np.arange(to_days(start), to_days(end) + 1, 7, dtype="datetime64[D]")
+        expiries = np.unique(self.weekly_expiry(np.append(weeks, to_days(end)), weekday))
+        return expiries[(expiries >= to_days(start)) & (expiries <= to_days(end))]
+
+    def weekly_setup(self, as_of: Optional[DateLike] = None, weeks_back: int = 0, at: str = "11:00") -> tuple:
+        """
+        Entry and expiry of a Monday-entry, same-week-expiry trade.
+
+        The entry is `at` local time on the first session of the week `weeks_back`
+        weeks before `as_of`; the expiry is that week's weekly expiry.
+
+        Returns:
+            tuple: (entry time as a UTC ISO string, expiry date, entry date)
+        """
+        day = to_days(as_of if as_of is not None else datetime.now(pytz.utc)) - 7 * weeks_back
+        monday = day - ((day.astype(np.int64) - 4) % 7)
+        entry_day = self.roll_forward(monday)
+        entry = self.local_time(entry_day, int(at[:2]) * 60 + int(at[3:5]))
+        return str(entry) + "Z", str(self.weekly_expiry(monday)), str(entry_day)
+
+    # --- Year fractions ---------------------------------------------------
+
+    def year_fraction(self, expiries, as_of: DateLike, convention: str = "calendar") -> np.ndarray:
+        """
+        Time from `as_of` to each expiry, in years, vectorized over the expiries.
+
+        Args:
+            expiries (array_like): Expiry dates (ISO strings, dates or datetime64)
+            as_of (DateLike): Valuation time; naive values are UTC, plain dates mean midnight UTC
+            convention (str): 'calendar' (seconds / 365 days) or 'trading' (sessions
+                remaining / sessions_per_year, counting partial sessions by hours)
+
+        Returns:
+            np.ndarray: Year fractions, zero for expired contracts
+        """
+        moment = to_instant(as_of)
+        expiry_at = self.expiry_instant(expiries)
+        if convention == "calendar" or self.continuous:
+            return np.maximum((expiry_at - moment).astype(np.int64), 0) / SECONDS_PER_YEAR
+        if convention != "trading":
+            raise ValueError(f"Unknown convention {convention!r}")
+
+        today = moment.astype("datetime64[D]")
+        days = to_days(expiries)
+        full_length = (self.close_minute - self.open_minute) * 60.0
+
+        def session_fraction(day, start, stop):
+            """Share of a full session between two instants on `day` (zero on non-sessions)."""
+            opens = self.local_time(day, self.open_minute)
+            seconds = (np.minimum(stop, self.local_time(day, self.close_minute_on(day))) - np.maximum(start, opens)).astype(np.int64)
+            return np.where(self.is_session(day), np.clip(seconds, 0, None) / full_length, 0.0)
+
+        # Whole sessions strictly between today and the expiry day, less the shortfall of half days among them
+        between = np.maximum(self.sessions_between(today + 1, days), 0).astype(float)
+        lo, hi = np.searchsorted(self.half_days, today + 1), np.searchsorted(self.half_days, days)
+        between -= np.maximum(hi - lo, 0) * (1 - (self.early_close_minute - self.open_minute) * 60.0 / full_length)
+
+        rest_of_today = session_fraction(today, moment, expiry_at)
+        on_expiry_day = session_fraction(days, np.full(days.shape, moment), expiry_at)
+        sessions = np.where(days > today, rest_of_today + between + on_expiry_day, rest_of_today)
+        return np.where(expiry_at > moment, sessions, 0.0) / self.sessions_per_year
+
+
+_nyse_holidays, _nyse_half_days = nyse_sessions()
+NYSE = TradingCalendar("NYSE", holidays=_nyse_holidays, half_days=_nyse_half_days)
+# Deribit-style crypto options trade around the clock and expire at 08:00 UTC.
+CRYPTO = TradingCalendar(
+    "CRYPTO", open_time="00:00", close_time="24:00", early_close_time="24:00", expiry_time="08:00",
+    weekmask="1111111", timezone="UTC", sessions_per_year=365.0,
+)
+
+
+def calendar_for(underlying: str) -> TradingCalendar:
+    """Crypto calendar for crypto symbols (and pairs like ETH-USD), NYSE otherwise."""
+    symbol = (underlying or "").upper()
+    return CRYPTO if "-" in symbol or symbol in CRYPTO_UNDERLYINGS else NYSE
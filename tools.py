@@ -5,6 +5,7 @@ from scipy.stats import norm
 from datetime import datetime, timedelta
 import yfinance as yf
 import pandas as pd
+from services.rate_limiter import scheduler
 
 
 def get_option_expiration_dates(symbol):
@@ -18,7 +19,7 @@ def get_option_expiration_dates(symbol):
     List of option expiration dates
     """
     ticker = yf.Ticker(symbol)  # Retrieving ticker data
-    expirations = ticker.options  # Retrieving option expiration dates
+    expirations = scheduler.call("yahoo", lambda: ticker.options)  # Retrieving option expiration dates
     return expirations
 
 def calculate_implied_volatility(S, K, T, r, price, option_type):
@@ -114,7 +115,7 @@ def calculate_historical_volatility(symbol, start_date, end_date):
     Historical volatility
     """
     stock = yf.Ticker(symbol)  # Retrieving stock data
-    historical_data = stock.history(start=start_date, end=end_date)  # Retrieving historical data
+    historical_data = scheduler.call("yahoo", lambda: stock.history(start=start_date, end=end_date))  # Retrieving historical data
 
     # Check if historical data is empty
     if historical_data.empty:
@@ -147,14 +148,14 @@ def fetch_option_info(ticker, expiry_date, risk_free_rate):
         raise ValueError("The specified expiration date has already passed.")
 
     # Retrieving option chain data
-    option_chain = stock.option_chain(expiry_date.strftime('%Y-%m-%d'))
+    option_chain = scheduler.call("yahoo", lambda: stock.option_chain(expiry_date.strftime('%Y-%m-%d')))
     if option_chain.calls.empty:
         raise ValueError("No call option available for the given ticker and expiry date.")
 
     # Assuming you're interested in the first available call option
     option = option_chain.calls.iloc[0]
     # Get the most recent stock price
-    historical_data = stock.history(period='1d')
+    historical_data = scheduler.call("yahoo", lambda: stock.history(period='1d'))
     if historical_data.empty:
         raise ValueError(f"No historical data found for {ticker}.")
 